@@ -1,25 +1,123 @@
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Request, render_template, request, jsonify, session, Response, stream_with_context, send_file, g
+import io
 import json
 from flask_cors import CORS
-from files.missing_skills import generate_missing_skills, retrieve_skills, send_text_to_llm, extract_ordered_text_pdf
-from files.interview_prep import generate_interview_questions
+from files.features import FORM_FIELDS, handlers
+from files.streaming import stream_completion
+from files.jobs import JobQueue, QueueFull
+from files.session_store import SessionStore
+from files.prompt_budget import token_usage
+from files.metrics import metrics, span, start_trace, finish_trace, get_trace
 import os
+import tempfile
+import time
 import uuid
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from flask_session import Session
 
 
 
 
 
+UPLOAD_FOLDER = 'uploads'
+BULK_RESULTS_FOLDER = os.path.join('cache', 'bulk')
+# Whole-request caps; an upload's leaves room for the form fields on top
+# of files.pdf_extract.PDF_MAX_BYTES. Werkzeug answers 413 from
+# Content-Length, or as soon as a chunked body passes the limit.
+MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(11 * 1024 * 1024)))
+BULK_MAX_CONTENT_LENGTH = int(os.getenv('BULK_MAX_CONTENT_LENGTH', str(512 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_BYTES', str(512 * 1024)))
+
+
+class SpoolingRequest(Request):
+    """
+    Uploads in bodies up to UPLOAD_SPOOL_BYTES stay in memory; larger ones
+    are written to a named temporary file in UPLOAD_FOLDER as they arrive,
+    so the PDF parser and its worker processes read them by path. Werkzeug
+    closes (and so deletes) the file when the request ends.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_BYTES:
+            return io.BytesIO()
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        return tempfile.NamedTemporaryFile(suffix='.upload', dir=UPLOAD_FOLDER)
+
+
 app = Flask(__name__)
 app.secret_key = 'super_secret_key_2025'  # Required for session usage
-# CORS(app, supports_credentials=True)
-app.config['SESSION_TYPE'] = 'filesystem'
-Session(app)
+app.request_class = SpoolingRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 CORS(app, supports_credentials=True)
 
+job_queue = JobQueue()
+session_store = SessionStore()
+if os.getenv('PRELOAD_FEATURES', 'false').lower() == 'true':
+    # For servers that load the app once and fork workers from it.
+    handlers.warm()
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    # Opt-in per-request trace: ?trace=1 or an `X-Trace: 1` header.
+    if request.args.get('trace') == '1' or request.headers.get('X-Trace') == '1':
+        g.trace = start_trace(f"{request.method} {request.path}")
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Streaming responses are timed up to their first byte.
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.observe('http_request_seconds', time.perf_counter() - g.request_start,
+                    route=route, method=request.method, status=response.status_code)
+    trace = g.pop('trace', None)
+    if trace is not None:
+        finish_trace(trace)
+        response.headers['X-Trace-Id'] = trace.id
+    return response
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({'error': f'Request body larger than {request.max_content_length} bytes'}), 413
+
+
+def session_owner():
+    """
+    Per-browser id kept in the signed session cookie. Resume data lives in
+    session_store, so the cookie stays a few bytes however much is uploaded.
+    """
+    if 'owner_id' not in session:
+        session['owner_id'] = uuid.uuid4().hex
+    return session['owner_id']
+
+
+def store_resume_session(record, form_data):
+    """
+    Save an extracted upload and return its session_id. A file this
+    browser already uploaded reuses its existing session_id.
+    """
+    return session_store.create(session_owner(), record["text"], form_data,
+                                record["pages"], record["sha256"])
+
+
+def load_resume_session(session_id):
+    """Load only the requested upload, or None if unknown or expired."""
+    if not session_id:
+        return None
+    return session_store.get(session_id, session_owner())
+
+
+def extract_uploaded_resume(path):
+    """Background-job entry point: extract a spooled upload, then delete it."""
+    try:
+        record, _ = handlers['extract_with_cache'](path)
+        return record
+    finally:
+        os.remove(path)
+
 @app.route('/upload_resume', methods=['POST'])
 def upload_resume():
 
@@ -32,13 +130,14 @@ def upload_resume():
             return "No file uploaded", 400
 
         try:
-            resume_text = extract_ordered_text_pdf(resume_file)
+            # Identical bytes are served from the upload cache without parsing.
+            record, deduplicated = handlers['extract_with_cache'](resume_file.stream)
+        except handlers['pdf_rejected'] as e:
+            return jsonify({"error": str(e)}), e.status
         except Exception as e:
             app.logger.error(f"Error extracting text from PDF: {e}")
             return jsonify({"error": f"PDF extraction failed: {str(e)}"}), 500
 
-        session["resume_text"] = resume_text
-
         form_data = None
         if form_data_raw:
             try:
@@ -48,18 +147,17 @@ def upload_resume():
                 return jsonify({"error": "Invalid form_data"}), 400
 
         # ✅ Generate a unique session_id
-        session_id = str(uuid.uuid4())
-        session[session_id] = {
-            "resume_text": resume_text,
-            "form_data": form_data
-        }
+        session_id = store_resume_session(record, form_data)
 
         # ✅ Return session_id so frontend can use it later
         return jsonify({
             "message": "Resume uploaded successfully",
-            "session_id": session_id
+            "session_id": session_id,
+            "deduplicated": deduplicated
         })
 
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         app.logger.error(f"Upload Resume Error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -73,14 +171,23 @@ def index():
 
 
 
+def compute_feature(feature_type, resume_text, form_data, pipeline_mode=None):
+    """
+    Run one feature for an uploaded resume and return (payload, status).
+    Shared by the blocking route and background jobs. Features are
+    declared in files.features; `pipeline_mode` picks how resume skills
+    are extracted (see files.missing_skills).
+    """
+    return handlers.run(feature_type, resume_text, form_data, pipeline_mode)
+
+
 @app.route('/analyze_feature', methods=['POST'])
 def analyze_feature():
     try:
         data = request.get_json()
         session_id = data.get('session_id')
         app.logger.info(f"Incoming session_id: {session_id}")
-        app.logger.info(f"Current session contents: {dict(session)}")
-        session_data = session.get(session_id)
+        session_data = load_resume_session(session_id)
         if not session_data or "resume_text" not in session_data:
             app.logger.error(f"Session data not found for session_id: {session_id}")
             return jsonify({'error': 'No resume uploaded'}), 400
@@ -89,103 +196,292 @@ def analyze_feature():
         form_data = data.get('form_data')
         # Use form_data from session if not provided in request
         if not form_data:
-            form_data = session_data.get('form_data', {})
-
-        job_title = form_data.get('jobTitle') if form_data else None
-        experience_level = form_data.get('experience') if form_data else None
-        job_description = form_data.get('jobDescription') if form_data else None
-        location = form_data.get('location') if form_data else None
+            form_data = session_data.get('form_data') or {}
 
         resume_text = session_data.get('resume_text')
 
         if not resume_text:
             return jsonify({'error': 'No resume uploaded'}), 400
-        
 
+        payload, status = compute_feature(feature_type, resume_text, form_data,
+                                          data.get('pipeline_mode'))
+        with span('serialize'):
+            response = jsonify(payload)
+        return response, status
 
+    except Exception as e:
+        app.logger.error(f"Error analyzing feature: {str(e)}")
+        return jsonify({'error': 'Analysis failed'}), 500
+    
 
-        # Now analyze based on feature type
-        if feature_type == 'analysis':
-            return jsonify({
-                'ats_score': 87,
-                'strengths': ['Python', 'Machine Learning', 'Teamwork'],
-                'improvements': [
-                    {'area': 'Leadership', 'score': 60, 'description': 'Lead more projects.'},
-                    {'area': 'Cloud', 'score': 50, 'description': 'Get certified in AWS.'}
-                ],
-                'summary': 'Strong technical background with room for leadership growth.'
-            })
+@app.route('/analyze_feature/stream', methods=['POST'])
+def analyze_feature_stream():
+    """
+    Streaming variant of /analyze_feature: pushes model tokens as
+    Server-Sent Events and finishes with a structured `result` event.
+    """
+    data = request.get_json() or {}
+    session_id = data.get('session_id')
+    session_data = load_resume_session(session_id)
+    if not session_data or not session_data.get('resume_text'):
+        app.logger.error(f"Session data not found for session_id: {session_id}")
+        return jsonify({'error': 'No resume uploaded'}), 400
+
+    feature_type = data.get('feature_type')
+    form_data = data.get('form_data') or session_data.get('form_data') or {}
+    job_title = form_data.get('jobTitle')
+    job_description = form_data.get('jobDescription')
+    resume_text = session_data['resume_text']
+    pipeline_mode = data.get('pipeline_mode')
+
+    # The same stage inputs and outputs the blocking handlers use, so the
+    # streamed result matches /analyze_feature's payload.
+    r = {key: form_data.get(field) for key, field in FORM_FIELDS.items()}
+    r.update(resume_text=resume_text, pipeline_mode=pipeline_mode)
+    feature = handlers.feature(feature_type)
+
+    def events():
+        if feature_type == 'skills':
+            # Same branches as missing_skills_stage: the embedding match or
+            # role knowledge base answer without streaming, an unknown role
+            # is learned first, and only a model comparison streams.
+            r['skills'] = handlers['stage:skills'](r)
+            skills = r['skills']['text']
+            missing = {}
+
+            def local_answer():
+                found = handlers['missing_skills_without_model'](r)
+                if found is None:
+                    known = handlers['known_missing_skills'](job_title, skills)
+                    found = known and {'raw': known, 'llm_calls': 1}
+                if not found:
+                    return None
+                missing.update(found)
+                return found['raw'] or json.dumps(found['by_category'])
+
+            yield from stream_completion(handlers['missing_skills_messages'](job_title, skills),
+                                         handlers['skills_model'],
+                                         handlers['compare_missing_skills'], (job_title, skills),
+                                         finalize=lambda text: handlers['skills_feature_payload'](
+                                             dict(r, missing_skills=missing or {'raw': text, 'llm_calls': 1},
+                                                  timings={}), feature)[0],
+                                         local_fn=local_answer)
+        elif feature_type == 'analysis':
+            # Scored locally; only the optional prose explanation streams.
+            r['ats'] = handlers['stage:ats'](r)
+            payload, _ = handlers['analysis_payload'](dict(r, explain=False), feature)
+            explain = handlers['form_flag'](r['explain'])
+            yield from stream_completion(handlers['ats_score_messages'](resume_text, job_description or job_title)
+                                         if explain else None,
+                                         handlers['ats_model'],
+                                         finalize=lambda text: dict(payload, summary=text) if explain else payload,
+                                         local_fn=None if explain else lambda: payload['summary'])
+        elif feature_type == 'interview':
+            r['skills'] = handlers['stage:skills'](r)
+            skills = ', '.join(r['skills']['list'])
+            yield from stream_completion(handlers['interview_questions_messages'](job_title, skills),
+                                         handlers['interview_model'],
+                                         handlers['generate_interview_questions'], (job_title, skills),
+                                         finalize=lambda text: handlers['interview_payload'](
+                                             dict(r, interview_questions=text), feature)[0])
+        elif feature_type == 'project_ideas':
+            r['skills'] = handlers['stage:skills'](r)
+            cache_args = (job_title, job_description, r['skills']['list'])
+            yield from stream_completion(handlers['project_ideas_messages'](*cache_args),
+                                         handlers['project_ideas_model'],
+                                         handlers['generate_project_ideas'], cache_args,
+                                         finalize=lambda text: handlers['project_ideas_payload'](
+                                             dict(r, project_ideas=text), feature)[0])
 
-        elif feature_type == 'skills':
-            # ✅ Use actual resume path from session
+    if feature_type not in ('skills', 'analysis', 'interview', 'project_ideas'):
+        return jsonify({'error': 'Streaming not supported for this feature type'}), 400
 
-            structured_text = send_text_to_llm(resume_text)
-            skills = retrieve_skills(structured_text)
-            missing_skills = generate_missing_skills(job_title, skills)
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
-            return jsonify(missing_skills)
+@app.route('/upload_stats', methods=['GET'])
+def upload_stats():
+    """Upload dedupe counters (hit rate, bytes saved)."""
+    return jsonify(handlers['upload_stats']())
 
-        elif feature_type == 'interview':
-            return jsonify({
-                'questions': [
-                    {
-                        'question': 'Tell me about yourself.',
-                        'difficulty': 'Easy',
-                        'category': 'General',
-                        'tips': 'Focus on your strengths.'
-                    },
-                    {
-                        'question': 'How do you handle conflict?',
-                        'difficulty': 'Medium',
-                        'category': 'Behavioral',
-                        'tips': 'Give a real example.'
-                    }
-                ],
-                'preparation_tips': ['Research the company.', 'Practice common questions.']
-            })
-
-        elif feature_type == 'live_job_feed':
-            return jsonify({
-                'matches': [
-                    {
-                        'title': 'Data Scientist',
-                        'company': 'TechCorp',
-                        'location': 'Remote',
-                        'salary_range': '$100k-$120k',
-                        'job_type': 'Full-time',
-                        'remote_option': True,
-                        'match_score': 92,
-                        'description': 'Work on ML models.',
-                        'key_requirements': ['Python', 'ML'],
-                        'missing_requirements': ['AWS']
-                    }
-                ],
-                'market_insights': {
-                    'average_salary': '$110k',
-                    'job_growth': '12%',
-                    'top_skills_demand': ['Python', 'ML'],
-                    'trending_technologies': ['AI', 'Cloud']
-                }
-            })
 
-        elif feature_type == 'project_ideas':
-            return jsonify({
-                'ideas': ['Resume Analyzer App', 'Job Matching Platform', 'AI Interview Coach']
-            })
+@app.route('/semantic_cache_stats', methods=['GET'])
+def semantic_cache_stats():
+    """Near-duplicate cache hit rate and best-similarity distribution per stage."""
+    return jsonify(handlers['semantic_cache_stats']())
+
+
+@app.route('/features', methods=['GET'])
+def list_features():
+    """Declared features: inputs, stages, cache policy, timeout and schema."""
+    return jsonify(handlers.features())
+
+
+@app.route('/token_usage', methods=['GET'])
+def token_usage_stats():
+    """Prompt compaction savings and tokens in/out per backend and model."""
+    return jsonify(token_usage.stats())
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Latency histograms, token, cache and error counters (Prometheus text format)."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/traces/<trace_id>', methods=['GET'])
+def trace_detail(trace_id):
+    """Spans of a traced request; its id comes back in the X-Trace-Id header."""
+    trace = get_trace(trace_id)
+    if not trace:
+        return jsonify({'error': 'Unknown or expired trace'}), 404
+    return jsonify(trace)
+
+
+@app.route('/jobs/upload_resume', methods=['POST'])
+def submit_upload_job():
+    """Queue PDF extraction for an upload and return its job id at once."""
+    resume_file = request.files.get('resume_file')
+    if not resume_file:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    form_data = None
+    form_data_raw = request.form.get('form_data')
+    if form_data_raw:
+        try:
+            form_data = json.loads(form_data_raw)
+        except Exception as e:
+            app.logger.error(f"Invalid form_data: {form_data_raw} | Error: {e}")
+            return jsonify({'error': 'Invalid form_data'}), 400
+
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.pdf', dir=UPLOAD_FOLDER)
+    with os.fdopen(fd, 'wb') as out:
+        resume_file.save(out)
+
+    try:
+        job_id = job_queue.submit('upload', extract_uploaded_resume, path, meta={'form_data': form_data},
+                                  cleanup=(path,))
+    except QueueFull as e:
+        os.remove(path)
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+
+@app.route('/jobs/analyze_feature', methods=['POST'])
+def submit_feature_job():
+    """Queue one feature analysis and return its job id at once."""
+    data = request.get_json() or {}
+    session_data = load_resume_session(data.get('session_id'))
+    if not session_data or not session_data.get('resume_text'):
+        return jsonify({'error': 'No resume uploaded'}), 400
+
+    feature_type = data.get('feature_type')
+    form_data = data.get('form_data') or session_data.get('form_data') or {}
+    try:
+        job_id = job_queue.submit('feature', compute_feature, feature_type,
+                                  session_data['resume_text'], form_data, data.get('pipeline_mode'),
+                                  meta={'feature_type': feature_type})
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    if not job_queue.cancel(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify({'job_id': job_id, 'status': 'cancelled'})
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    if job.status in ('queued', 'running'):
+        return jsonify(job.to_dict()), 202
+    if job.status != 'finished':
+        return jsonify(job.to_dict()), 409
+
+    if job.kind == 'upload':
+        # Sessions are owned by the polling client's cookie, so the record
+        # is stored here rather than in the worker.
+        if 'session_id' not in job.meta:
+            job.meta['session_id'] = store_resume_session(job.result, job.meta.get('form_data'))
+        return jsonify({
+            "message": "Resume uploaded successfully",
+            "session_id": job.meta['session_id']
+        })
+
+    if job.kind == 'bulk':
+        return jsonify(job.result)
 
-        elif feature_type == 'keyword_optimizer':
-            return jsonify({
-                'keywords': ['machine learning', 'python', 'data analysis', 'cloud']
-            })
+    payload, status = job.result
+    return jsonify(payload), status
 
-        else:
-            return jsonify({'error': 'Unknown feature type'}), 400
 
+def run_bulk_upload(archive_path, targets, out_path, use_llm):
+    """Background-job entry point for /bulk_analyze."""
+    try:
+        return handlers['run_bulk'](archive_path, targets, out_path, use_llm=use_llm)
+    finally:
+        os.remove(archive_path)
+
+
+@app.route('/bulk_analyze', methods=['POST'])
+def submit_bulk_job():
+    """
+    Queue a bulk analysis: a ZIP of PDFs in `resumes_zip` plus `targets`,
+    a JSON list of {"role", "job_description"}. Poll /jobs/<id>; rows are
+    downloadable from /bulk_analyze/<id>/results as they finish.
+    """
+    request.max_content_length = BULK_MAX_CONTENT_LENGTH
+    archive = request.files.get('resumes_zip')
+    if not archive:
+        return jsonify({'error': 'No ZIP file uploaded'}), 400
+    try:
+        targets = json.loads(request.form.get('targets') or '[]')
+        targets = [{'role': t['role'], 'job_description': t.get('job_description') or ''} for t in targets]
     except Exception as e:
-        app.logger.error(f"Error analyzing feature: {str(e)}")
-        return jsonify({'error': 'Analysis failed'}), 500
-    
+        app.logger.error(f"Invalid targets: {e}")
+        return jsonify({'error': 'Invalid targets'}), 400
+    if not targets:
+        return jsonify({'error': 'At least one target role is required'}), 400
+
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(BULK_RESULTS_FOLDER, exist_ok=True)
+    fd, archive_path = tempfile.mkstemp(suffix='.zip', dir=UPLOAD_FOLDER)
+    with os.fdopen(fd, 'wb') as out:
+        archive.save(out)
+    out_path = os.path.join(BULK_RESULTS_FOLDER, f"{uuid.uuid4().hex}.jsonl")
+    use_llm = request.form.get('use_llm', 'true').lower() != 'false'
+
+    try:
+        job_id = job_queue.submit('bulk', run_bulk_upload, archive_path, targets, out_path, use_llm,
+                                  meta={'output': out_path}, cleanup=(archive_path,))
+    except QueueFull as e:
+        os.remove(archive_path)
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+
+@app.route('/bulk_analyze/<job_id>/results', methods=['GET'])
+def bulk_results(job_id):
+    job = job_queue.get(job_id)
+    if not job or job.kind != 'bulk' or not os.path.exists(job.meta['output']):
+        return jsonify({'error': 'No results for this job'}), 404
+    return send_file(os.path.abspath(job.meta['output']), mimetype='application/x-ndjson')
+
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+ASGI entry point: the app.py contract on an event loop.
+
+`/`, `/upload_resume` and `/analyze_feature` are async handlers here. A
+request waiting on the model holds a coroutine rather than a thread:
+model-backed stages await the backends' async clients
+(handlers.arun), PDF parsing runs in a worker process, and the local
+stages, job-feed searches and SQLite stores run on a bounded thread pool
+off the loop. One process can therefore hold hundreds of analyses in
+flight; the LLM backend's own concurrency limit still applies.
+
+Every other route (streaming, jobs, bulk, stats, /metrics) is the Flask
+app, mounted as WSGI. The session cookie is Flask's too, so a browser
+keeps its uploads whichever server answers.
+
+Run from the repository root:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from flask import render_template
+from flask.sessions import SecureCookieSessionInterface
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from starlette.routing import Mount, Route
+
+from app import MAX_CONTENT_LENGTH, app as flask_app, session_store
+from files.features import handlers
+from files.metrics import finish_trace, metrics, span, start_trace
+
+
+# Threads for the work that stays blocking: local stages, builders, job
+# providers, session reads and writes, upload hashing.
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "64"))
+
+logger = logging.getLogger("asgi")
+_cookies = SecureCookieSessionInterface().get_signing_serializer(flask_app)
+_cookie_name = flask_app.config["SESSION_COOKIE_NAME"]
+_cookie_max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+
+
+def session_owner(request):
+    """
+    (owner_id, cookie value to set or None) from Flask's signed session
+    cookie, creating the owner the way app.session_owner does.
+    """
+    try:
+        data = _cookies.loads(request.cookies[_cookie_name], max_age=_cookie_max_age)
+    except Exception:
+        data = {}
+    if 'owner_id' in data:
+        return data['owner_id'], None
+    data['owner_id'] = uuid.uuid4().hex
+    return data['owner_id'], _cookies.dumps(data)
+
+
+def route(path, methods=('GET',), max_body_size=None):
+    """
+    Starlette route with app.py's request metrics and opt-in trace, and
+    the session cookie set on the response when the handler created one.
+    Handlers take (request, owner_id).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def endpoint(request):
+            start = time.perf_counter()
+            trace = None
+            if request.query_params.get('trace') == '1' or request.headers.get('X-Trace') == '1':
+                trace = start_trace(f"{request.method} {path}")
+            owner, cookie = session_owner(request)
+            response = await fn(request, owner)
+            if cookie:
+                response.set_cookie(_cookie_name, cookie, httponly=True, path='/')
+            metrics.observe('http_request_seconds', time.perf_counter() - start,
+                            route=path, method=request.method, status=response.status_code)
+            if trace is not None:
+                finish_trace(trace)
+                response.headers['X-Trace-Id'] = trace.id
+            return response
+        return Route(path, endpoint, methods=list(methods), max_body_size=max_body_size)
+    return decorator
+
+
+@functools.lru_cache(maxsize=1)
+def index_html():
+    with flask_app.test_request_context('/'):
+        return render_template('index.html')
+
+
+@route('/')
+async def index(request, owner):
+    """Serve the main chat interface."""
+    return HTMLResponse(index_html())
+
+
+@route('/upload_resume', methods=('POST',), max_body_size=MAX_CONTENT_LENGTH)
+async def upload_resume(request, owner):
+    try:
+        # Files over 1 MB are spooled to disk while the body streams in.
+        async with request.form(max_files=1) as form:
+            resume_file = form.get('resume_file')
+            form_data_raw = form.get('form_data')
+            if not resume_file or isinstance(resume_file, str):
+                logger.error("No file uploaded")
+                return PlainTextResponse("No file uploaded", 400)
+
+            try:
+                # Identical bytes are served from the upload cache without parsing.
+                record, deduplicated = await handlers['aextract_with_cache'](resume_file.file)
+            except handlers['pdf_rejected'] as e:
+                return JSONResponse({"error": str(e)}, e.status)
+            except Exception as e:
+                logger.error(f"Error extracting text from PDF: {e}")
+                return JSONResponse({"error": f"PDF extraction failed: {str(e)}"}, 500)
+
+        form_data = None
+        if form_data_raw:
+            try:
+                form_data = json.loads(form_data_raw)
+            except Exception as e:
+                logger.error(f"Invalid form_data: {form_data_raw} | Error: {e}")
+                return JSONResponse({"error": "Invalid form_data"}, 400)
+
+        session_id = await asyncio.to_thread(session_store.create, owner, record["text"], form_data,
+                                             record["pages"], record["sha256"])
+        return JSONResponse({
+            "message": "Resume uploaded successfully",
+            "session_id": session_id,
+            "deduplicated": deduplicated
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Upload Resume Error: {e}")
+        return JSONResponse({"error": str(e)}, 500)
+
+
+@route('/analyze_feature', methods=('POST',))
+async def analyze_feature(request, owner):
+    try:
+        data = await request.json()
+        session_id = data.get('session_id')
+        session_data = await asyncio.to_thread(session_store.get, session_id, owner) if session_id else None
+        if not session_data or not session_data.get('resume_text'):
+            logger.error(f"Session data not found for session_id: {session_id}")
+            return JSONResponse({'error': 'No resume uploaded'}, 400)
+
+        form_data = data.get('form_data') or session_data.get('form_data') or {}
+        payload, status = await handlers.arun(data.get('feature_type'), session_data['resume_text'], form_data,
+                                              data.get('pipeline_mode'))
+        with span('serialize'):
+            return JSONResponse(payload, status)
+
+    except Exception as e:
+        logger.error(f"Error analyzing feature: {str(e)}")
+        return JSONResponse({'error': 'Analysis failed'}, 500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # asyncio.to_thread uses the default executor, sized for the cores
+    # otherwise (5 threads on one core).
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix="asgi"))
+    yield
+
+
+app = Starlette(
+    routes=[index, upload_resume, analyze_feature, Mount('/', app=WSGIMiddleware(flask_app))],
+    middleware=[Middleware(CORSMiddleware, allow_origin_regex='.*', allow_credentials=True,
+                           allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
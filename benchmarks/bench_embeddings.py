@@ -0,0 +1,62 @@
+"""
+Build and search timings for the local embedding index.
+
+Run from the repository root:
+    python -m benchmarks.bench_embeddings [--rows 100000] [--queries 100] [-k 10]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from files.embeddings import EmbeddingIndex, embed
+from files.skill_terms import alias_map
+
+
+def synthetic_jobs(rows, seed=0):
+    rng = random.Random(seed)
+    skills = sorted(set(alias_map()))
+    words = "senior junior lead engineer developer analyst remote hybrid team build design".split()
+    return [
+        " ".join(rng.sample(words, 3) + rng.sample(skills, 12))
+        for _ in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    texts = synthetic_jobs(args.rows)
+    queries = synthetic_jobs(args.queries, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs")
+        start = time.perf_counter()
+        index = EmbeddingIndex.build([str(i) for i in range(len(texts))], texts, path=path)
+        build = time.perf_counter() - start
+        size = os.path.getsize(path + ".npy") / 1024 / 1024
+        print(f"build   rows={len(index)} dim={index.vectors.shape[1]} "
+              f"{build:.2f} s ({len(index) / build:,.0f} rows/s) matrix={size:.0f} MiB")
+
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search([query], args.k)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"search  single query k={args.k} median={statistics.median(timings):.2f} ms "
+              f"max={max(timings):.2f} ms")
+
+        start = time.perf_counter()
+        index.search(embed(queries), args.k)
+        batch = (time.perf_counter() - start) * 1000
+        print(f"search  batch of {len(queries)} {batch:.2f} ms ({batch / len(queries):.2f} ms/query)")
+        del index
+
+
+if __name__ == "__main__":
+    main()
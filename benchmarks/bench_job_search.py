@@ -0,0 +1,86 @@
+"""
+Query latency of the job search index at scale.
+
+Run from the repository root (the store is built once and reused):
+    python -m benchmarks.bench_job_search [--postings 500000] [--db /tmp/bench_jobs.sqlite3]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from files.job_index import JobSearchIndex
+from files.job_listings import JobRecord
+from files.job_store import JobStore
+from files.skill_terms import skill_vocabulary
+
+
+ROLES = ["Data Scientist", "ML Engineer", "Backend Developer", "Frontend Developer", "Data Analyst",
+         "DevOps Engineer", "Software Engineer", "Cloud Architect", "QA Engineer", "Product Analyst"]
+CITIES = ["Bengaluru", "Hyderabad", "Pune", "Remote", "Chennai", "Mumbai", "Delhi", "London", "Berlin"]
+TYPES = ["Full-time", "Contract", "Part-time", "Internship"]
+
+
+def fill(store, count, batch=5000, seed=0):
+    rng = random.Random(seed)
+    skills = sorted(skill_vocabulary())
+    start = time.perf_counter()
+    for offset in range(0, count, batch):
+        records = []
+        for i in range(offset, min(offset + batch, count)):
+            role = rng.choice(ROLES)
+            required = rng.sample(skills, 6)
+            city = rng.choice(CITIES)
+            records.append(JobRecord(
+                "bench", f"{rng.choice(['Junior', 'Senior', 'Lead', ''])} {role} {i}".strip(), f"Company {i % 5000}",
+                city, f"We are hiring a {role}. Requirements: {', '.join(required)}. "
+                      f"You will work with a small team shipping {rng.choice(skills)} services.",
+                f"https://jobs.example.com/{i}", job_type=rng.choice(TYPES),
+            ))
+        store.save_query("bench", str(offset), records)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--postings", type=int, default=500000)
+    parser.add_argument("--db", default="/tmp/bench_jobs.sqlite3")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    store = JobStore(args.db, retention=10 ** 9)
+    existing = store.stats()["jobs"] if os.path.exists(args.db) else 0
+    if existing < args.postings:
+        seconds = fill(store, args.postings - existing, seed=existing)
+        print(f"indexed {args.postings - existing} postings in {seconds:.1f} s")
+    print(f"store: {store.stats()['jobs']} postings, {os.path.getsize(args.db) / 1024 / 1024:.0f} MiB")
+
+    index = JobSearchIndex(store)
+    start = time.perf_counter()
+    index.search(["python"], limit=1)
+    print(f"index loaded in {time.perf_counter() - start:.2f} s")
+
+    rng = random.Random(1)
+    skills = sorted(skill_vocabulary())
+    cases = {
+        "skills only": {},
+        "skills + role": {"role": "data scientist"},
+        "skills + location": {"location": "Pune"},
+        "skills + remote + type": {"remote": True, "job_type": "Contract"},
+        "page 5": {"offset": 80},
+    }
+    for name, kwargs in cases.items():
+        timings = []
+        for _ in range(args.queries):
+            resume = rng.sample(skills, 20)
+            start = time.perf_counter()
+            result = index.search(resume, limit=20, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"{name:<24} p50={statistics.median(timings):6.1f} ms  "
+              f"p95={timings[int(len(timings) * 0.95) - 1]:6.1f} ms  hits/page={len(result['jobs'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+End-to-end load benchmark against fake LLM and job servers, fully offline.
+
+Starts benchmarks.fake_llm_server and benchmarks.fake_job_server, runs
+the app in a child process pointed at them, then drives /upload_resume
+and /analyze_feature for every declared feature type at each concurrency
+level. Reports p50/p95/p99 latency per endpoint, throughput and the app's
+resident memory, and saves everything as JSON; `--compare` prints the
+change against an earlier run and exits non-zero on a p95 regression.
+
+Each request uses its own job title so results are not served from the
+LLM cache; pass `--warm` to measure the cached path instead. `--server`
+picks the threaded Flask server (app.py) or the ASGI one (asgi.py under
+uvicorn); run both and `--compare` them for the throughput difference.
+
+Run from the repository root:
+    python -m benchmarks.bench_load [--server flask|asgi] [--backend hf] [--concurrency 1,4,16] [--rounds 8]
+        [--latency 0.5] [--token-rate 50] [--out cache/bench_load.json] [--compare old.json]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import fake_job_server, fake_llm_server
+
+
+ROLES = ["Data Scientist", "ML Engineer", "Backend Developer", "Data Analyst"]
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def memory_mb(pid):
+    """(current, peak) resident set size of `pid` in MiB; Linux only."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None, None
+    return tuple(round(int(fields[k].split()[0]) / 1024, 1) for k in ("VmRSS", "VmHWM"))
+
+
+def serve_app(port, server="flask"):
+    """Child process: the app behind a threaded WSGI server, or asgi.py behind uvicorn."""
+    if server == "asgi":
+        import uvicorn
+        return uvicorn.run("asgi:app", host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    make_server("127.0.0.1", port, app, threaded=True, request_handler=QuietHandler).serve_forever()
+
+
+def wait_ready(session, base, timeout=60):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            session.get(f"{base}/features", timeout=2).raise_for_status()
+            return
+        except Exception:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def run_user(base, features, resume, job_title, pipeline_mode):
+    """One simulated user: upload, then every feature. Returns [(endpoint, seconds, ok)]."""
+    import requests
+
+    timings = []
+    with requests.Session() as session:
+        start = time.perf_counter()
+        response = session.post(f"{base}/upload_resume", files={"resume_file": ("Resume.pdf", resume)},
+                                 data={"form_data": json.dumps({"jobTitle": job_title, "location": "India"})},
+                                 timeout=600)
+        timings.append(("upload_resume", time.perf_counter() - start, response.ok))
+        if not response.ok:
+            return timings
+        session_id = response.json()["session_id"]
+        for feature in features:
+            start = time.perf_counter()
+            response = session.post(f"{base}/analyze_feature", json={
+                "session_id": session_id, "feature_type": feature, "pipeline_mode": pipeline_mode,
+            }, timeout=600)
+            timings.append((feature, time.perf_counter() - start, response.ok))
+    return timings
+
+
+def run_level(base, features, resume, concurrency, rounds, warm, pipeline_mode, pid):
+    users = concurrency * rounds
+    titles = [ROLES[i % len(ROLES)] if warm else f"{ROLES[i % len(ROLES)]} {concurrency}-{i}"
+              for i in range(users)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        runs = list(pool.map(lambda title: run_user(base, features, resume, title, pipeline_mode), titles))
+    wall = time.perf_counter() - start
+
+    samples = {}
+    for timings in runs:
+        for endpoint, seconds, ok in timings:
+            samples.setdefault(endpoint, []).append((seconds, ok))
+    endpoints = {}
+    for endpoint, values in samples.items():
+        ms = [seconds * 1000 for seconds, _ in values]
+        endpoints[endpoint] = {
+            "count": len(values),
+            "errors": sum(not ok for _, ok in values),
+            "p50_ms": round(percentile(ms, 50), 1),
+            "p95_ms": round(percentile(ms, 95), 1),
+            "p99_ms": round(percentile(ms, 99), 1),
+            "mean_ms": round(sum(ms) / len(ms), 1),
+        }
+    requests_made = sum(e["count"] for e in endpoints.values())
+    rss, peak = memory_mb(pid)
+    return {
+        "concurrency": concurrency,
+        "users": users,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(requests_made / wall, 2),
+        "rss_mb": rss,
+        "peak_rss_mb": peak,
+        "endpoints": endpoints,
+    }
+
+
+def print_level(level):
+    print(f"\nconcurrency {level['concurrency']}: {level['users']} users in {level['wall_seconds']:.1f} s, "
+          f"{level['throughput_rps']:.1f} req/s, rss {level['rss_mb']} MiB (peak {level['peak_rss_mb']})")
+    for endpoint, s in level["endpoints"].items():
+        print(f"  {endpoint:<18} p50={s['p50_ms']:8.1f}  p95={s['p95_ms']:8.1f}  p99={s['p99_ms']:8.1f} ms"
+              f"  n={s['count']:<4} errors={s['errors']}")
+
+
+def compare(result, baseline, threshold):
+    """Print p95/throughput changes against `baseline`; True if p95 regressed."""
+    regressed = False
+    old_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\ncompared with the {baseline['config'].get('server', 'flask')} run of "
+          f"{baseline['config'].get('started_at')} (regression: p95 > +{threshold:g}%)")
+    for level in result["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if not old:
+            continue
+        change = 100 * (level["throughput_rps"] / old["throughput_rps"] - 1) if old["throughput_rps"] else 0
+        print(f"  concurrency {level['concurrency']}: throughput {change:+.1f}%")
+        for endpoint, stats in level["endpoints"].items():
+            before = old["endpoints"].get(endpoint)
+            if not before or not before["p95_ms"]:
+                continue
+            delta = 100 * (stats["p95_ms"] / before["p95_ms"] - 1)
+            flag = "  REGRESSION" if delta > threshold else ""
+            regressed |= bool(flag)
+            print(f"    {endpoint:<18} p95 {before['p95_ms']:8.1f} -> {stats['p95_ms']:8.1f} ms ({delta:+.1f}%){flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--backend", choices=("hf", "ollama", "stub"), default="hf")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels")
+    parser.add_argument("--rounds", type=int, default=4, help="users per worker at each level")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM seconds to first token")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="fake LLM tokens per second")
+    parser.add_argument("--features", default="", help="comma-separated feature types (default: all)")
+    parser.add_argument("--pipeline-mode", default=None)
+    parser.add_argument("--warm", action="store_true", help="repeat job titles so the LLM cache is hit")
+    parser.add_argument("--resume", default="Resume.pdf")
+    parser.add_argument("--out", default=os.path.join("cache", "bench_load.json"))
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="p95 regression threshold, percent")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve_app(args.serve, args.server)
+
+    import requests
+
+    llm = fake_llm_server.serve(latency=args.latency, token_rate=args.token_rate)
+    jobs = fake_job_server.serve()
+    llm_url = f"http://127.0.0.1:{llm.server_address[1]}"
+    jobs_url = f"http://127.0.0.1:{jobs.server_address[1]}"
+    scratch = tempfile.mkdtemp(prefix="bench_load_")
+    port = int(os.getenv("BENCH_APP_PORT", "0")) or 18000 + os.getpid() % 1000
+    env = dict(os.environ, LLM_BACKEND=args.backend, HF_BASE_URL=llm_url, OLLAMA_HOST=llm_url,
+               STUB_LATENCY_SECONDS=str(args.latency), SERPAPI_URL=f"{jobs_url}/search",
+               JOOBLE_URL=f"{jobs_url}/api", LLM_CACHE_PATH=os.path.join(scratch, "llm_cache.sqlite3"),
+               SESSION_DB_PATH=os.path.join(scratch, "sessions.sqlite3"),
+               JOBS_DB_PATH=os.path.join(scratch, "jobs.sqlite3"),
+               SEMANTIC_CACHE_PATH=os.path.join(scratch, "semantic_cache.sqlite3"),
+               ROLE_SKILLS_DB_PATH=os.path.join(scratch, "role_skills.sqlite3"),
+               UPLOAD_CACHE_DIR=os.path.join(scratch, "uploads"),
+               EMBEDDINGS_DIR=os.path.join(scratch, "embeddings"))
+    child = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_load", "--serve", str(port),
+                              "--server", args.server], env=env)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        with requests.Session() as session:
+            wait_ready(session, base)
+            declared = session.get(f"{base}/features").json()
+        features = [f for f in args.features.split(",") if f] or sorted(declared)
+        with open(args.resume, "rb") as f:
+            resume = f.read()
+
+        result = {
+            "config": {
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "server": args.server,
+                "backend": args.backend, "latency": args.latency, "token_rate": args.token_rate,
+                "rounds": args.rounds, "warm": args.warm, "pipeline_mode": args.pipeline_mode,
+                "features": features, "python": platform.python_version(), "cpus": os.cpu_count(),
+            },
+            "levels": [],
+        }
+        print(f"{args.server} server, {args.backend} backend, first token {args.latency:g} s, {args.token_rate:g} tokens/s; "
+              f"features: {', '.join(features)}")
+        for concurrency in [int(c) for c in args.concurrency.split(",") if c]:
+            level = run_level(base, features, resume, concurrency, args.rounds, args.warm,
+                              args.pipeline_mode, child.pid)
+            result["levels"].append(level)
+            print_level(level)
+        result["llm_requests"] = dict(llm.requests)
+        result["job_requests"] = dict(jobs.requests)
+    finally:
+        child.terminate()
+        child.wait()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nLLM server requests: {result['llm_requests']}; saved {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Overhead of the files.metrics instrumentation.
+
+Times a bare span and a histogram observation, then serves the same
+/analyze_feature requests through the Flask test client with metrics on
+and off (stub LLM backend, warm caches, so requests are as cheap as they
+get and the relative overhead is at its largest).
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics [--calls 100000] [--requests 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per feature and setting")
+    parser.add_argument("--resume", default="Resume.pdf")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_metrics_")
+    os.environ.update(LLM_BACKEND="stub", LLM_CACHE_PATH=":memory:", SESSION_DB_PATH=":memory:",
+                      JOBS_DB_PATH=":memory:", UPLOAD_CACHE_DIR=os.path.join(scratch, "uploads"),
+                      EMBEDDINGS_DIR=os.path.join(scratch, "embeddings"))
+    from files.metrics import metrics, span
+
+    def spanned():
+        with span("bench"):
+            pass
+
+    print(f"span: {per_call_us(spanned, args.calls):.2f} us/call, "
+          f"observe: {per_call_us(lambda: metrics.observe('bench_seconds', 0.01, stage='x'), args.calls):.2f} us/call")
+
+    import app
+    client = app.app.test_client()
+    with open(args.resume, "rb") as f:
+        response = client.post("/upload_resume", data={
+            "resume_file": (f, "Resume.pdf"),
+            "form_data": json.dumps({"jobTitle": "ML Engineer", "jobDescription": "Python, SQL, Docker"}),
+        }, content_type="multipart/form-data")
+    session_id = response.get_json()["session_id"]
+
+    features = ["analysis", "skills", "interview", "project_ideas", "full_report"]
+    for feature in features:
+        client.post("/analyze_feature", json={"session_id": session_id, "feature_type": feature})
+
+    print(f"{'feature':<14} {'off ms':>8} {'on ms':>8} {'overhead':>9}")
+    for feature in features:
+        samples = {True: [], False: []}
+        # Interleaved so drift affects both settings alike.
+        for i in range(2 * args.requests):
+            metrics.enabled = enabled = bool(i % 2)
+            start = time.perf_counter()
+            client.post("/analyze_feature", json={"session_id": session_id, "feature_type": feature})
+            samples[enabled].append(time.perf_counter() - start)
+        off, on = (statistics.median(samples[k]) * 1000 for k in (False, True))
+        print(f"{feature:<14} {off:8.3f} {on:8.3f} {100 * (on / off - 1):+8.1f}%")
+    metrics.enabled = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Per-page timings for each PDF extraction mode.
+
+Run from the repository root:
+    python -m benchmarks.bench_pdf [--repeat 5] [pdf ...]
+"""
+import argparse
+import statistics
+import time
+
+from files.pdf_extract import MODES, PDF_EXTRACT_WORKERS, extract_pages, extract_text
+
+
+DEFAULT_PDFS = ["Resume.pdf", "uploads/PS_2025.pdf"]
+
+
+def bench_file(path, repeat):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    print(f"\n{path} ({len(data) / 1024:.0f} KiB)")
+    for mode in MODES:
+        per_page = {}
+        for _ in range(repeat):
+            for page_no, _, seconds in extract_pages(data, mode, workers=1):
+                per_page.setdefault(page_no, []).append(seconds)
+
+        timings = [statistics.median(per_page[p]) * 1000 for p in sorted(per_page)]
+        print(f"  {mode:<7} pages={len(timings):<3} "
+              f"median/page={statistics.median(timings):7.2f} ms  "
+              f"max/page={max(timings):7.2f} ms  sum={sum(timings):8.2f} ms")
+        print("          " + " ".join(f"{t:.1f}" for t in timings))
+
+        for workers, label in ((1, "serial"), (PDF_EXTRACT_WORKERS, "parallel")):
+            # First parallel run warms up the shared process pool.
+            extract_text(data, mode, workers)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                extract_text(data, mode, workers)
+            wall = (time.perf_counter() - start) / repeat * 1000
+            print(f"          {label:<8} workers={workers:<2} wall={wall:8.2f} ms/document")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdfs", nargs="*", default=DEFAULT_PDFS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for path in args.pdfs:
+        bench_file(path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cold-start cost of the web app: import time and time to first request.
+
+Each run is a fresh interpreter with the stub LLM backend and in-memory
+stores, so nothing is shared between runs. `--register N` adds N extra
+handlers to the feature registry before the app is imported, to check
+that start-up does not grow with the number of features.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [--runs 5] [--register 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+STEPS = ["import", "first GET /", "first upload", "first analysis", "first skills"]
+
+
+def probe(register):
+    """Runs in the child process; prints one JSON line of timings."""
+    start = time.perf_counter()
+    from files.features import handlers
+    for i in range(register):
+        handlers.register(f"extra_{i}", "files.embeddings:embed")
+    import app
+
+    timings = {"import": time.perf_counter() - start}
+    client = app.app.test_client()
+
+    step = time.perf_counter()
+    client.get("/")
+    timings["first GET /"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    with open("Resume.pdf", "rb") as f:
+        response = client.post("/upload_resume", data={
+            "resume_file": (f, "Resume.pdf"),
+            "form_data": json.dumps({"jobTitle": "Data Scientist"}),
+        }, content_type="multipart/form-data")
+    session_id = response.get_json()["session_id"]
+    timings["first upload"] = time.perf_counter() - step
+
+    for name, feature in (("first analysis", "analysis"), ("first skills", "skills")):
+        step = time.perf_counter()
+        client.post("/analyze_feature", json={"session_id": session_id, "feature_type": feature})
+        timings[name] = time.perf_counter() - step
+
+    print(json.dumps({"timings": timings, "modules": len(sys.modules), "registry": handlers.stats()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--register", type=int, default=0, help="extra handlers to register")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        return probe(args.register)
+
+    scratch = tempfile.mkdtemp(prefix="bench_startup_")
+    env = dict(os.environ, LLM_BACKEND="stub", LLM_CACHE_PATH=":memory:", SESSION_DB_PATH=":memory:",
+               JOBS_DB_PATH=":memory:", UPLOAD_CACHE_DIR=os.path.join(scratch, "uploads"),
+               EMBEDDINGS_DIR=os.path.join(scratch, "embeddings"))
+    results = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--probe",
+                              "--register", str(args.register)],
+                             env=env, capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{args.runs} cold starts, {results[0]['registry']['registered']} registered handlers")
+    for step in STEPS:
+        timings = [r["timings"][step] * 1000 for r in results]
+        print(f"  {step:<16} median={statistics.median(timings):7.1f} ms  max={max(timings):7.1f} ms")
+    total = [sum(r["timings"].values()) * 1000 for r in results]
+    print(f"  {'total':<16} median={statistics.median(total):7.1f} ms")
+    print(f"  modules loaded after first requests: {results[-1]['modules']}")
+    for module, seconds in sorted(results[-1]["registry"]["import_seconds"].items()):
+        print(f"    {module:<28} imported on first use in {seconds * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
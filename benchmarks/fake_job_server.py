@@ -0,0 +1,156 @@
+"""
+Local stand-in for the SerpAPI Google Jobs and Jooble endpoints.
+
+Run from the repository root, then point the ingestion at it:
+    python -m benchmarks.fake_job_server --port 8765 [--latency 0.2]
+    SERPAPI_URL=http://127.0.0.1:8765/search JOOBLE_URL=http://127.0.0.1:8765/api \\
+        python -m files.job_listings "Data Scientist" --location India
+
+Postings are generated deterministically from the query. Both providers
+return some of the same postings (with different tracking URLs) so
+dedupe can be checked, and `--total` caps how many exist per query.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from files.skill_terms import alias_map
+
+
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises",
+             "Wonka", "Tyrell", "Cyberdyne", "Soylent", "Massive Dynamic"]
+CITIES = ["Bengaluru", "Hyderabad", "Pune", "Remote", "Chennai", "Mumbai", "Delhi"]
+LEVELS = ["Junior", "", "Senior", "Lead"]
+TYPES = ["Full-time", "Contract", "Part-time", "Internship"]
+SERP_PAGE_SIZE = 10
+JOOBLE_PAGE_SIZE = 20
+
+
+def postings(role, location, total):
+    seed = int(hashlib.sha256(f"{role}|{location}".lower().encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    skills = sorted(set(alias_map().values()))
+    jobs = []
+    for i in range(total):
+        required = rng.sample(skills, 6)
+        city = rng.choice(CITIES)
+        jobs.append({
+            "id": i,
+            "title": f"{rng.choice(LEVELS)} {role}".strip(),
+            "company": rng.choice(COMPANIES),
+            "location": city if city == "Remote" else f"{city}, {location or 'India'}",
+            "type": rng.choice(TYPES),
+            "salary": f"₹{rng.randint(5, 40)}L - ₹{rng.randint(41, 80)}L" if rng.random() < 0.6 else "",
+            "description": (f"We are hiring a {role} to build data products. Requirements: "
+                            f"{', '.join(required)}. Nice to have: {rng.choice(skills)}."),
+            "posted": f"{rng.randint(1, 30)} days ago",
+        })
+    return jobs
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "FakeJobs/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, name):
+        with self.server.lock:
+            self.server.requests[name] = self.server.requests.get(name, 0) + 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            return self._send(self.server.requests)
+        if url.path != "/search":
+            return self._send({"error": "not found"}, 404)
+        self._count("serpapi")
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        query = params.get("q", "")
+        role, _, location = query.partition(" jobs")
+        start = int(params.get("next_page_token") or 0)
+        jobs = postings(role.strip(), location.strip(), self.server.total)
+        page = jobs[start:start + SERP_PAGE_SIZE]
+        result = {"jobs_results": [{
+            "title": job["title"],
+            "company_name": job["company"],
+            "location": job["location"],
+            "description": job["description"],
+            "share_link": f"https://jobs.example.com/{job['id']}?utm_source=serp&hl=en",
+            "detected_extensions": {
+                "schedule_type": job["type"],
+                "work_from_home": job["location"] == "Remote",
+                "posted_at": job["posted"],
+                **({"salary": job["salary"]} if job["salary"] else {}),
+            },
+        } for job in page]}
+        if start + SERP_PAGE_SIZE < len(jobs):
+            result["serpapi_pagination"] = {"next_page_token": str(start + SERP_PAGE_SIZE)}
+        self._send(result)
+
+    def do_POST(self):
+        if not self.path.startswith("/api/"):
+            return self._send({"error": "not found"}, 404)
+        self._count("jooble")
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        page = int(body.get("page") or 1)
+        # Jooble sees an offset view of the same postings, so the two
+        # providers overlap.
+        jobs = postings(body.get("keywords", ""), body.get("location", ""), self.server.total)
+        jobs = jobs[len(jobs) // 3:] + jobs[:len(jobs) // 3]
+        chunk = jobs[(page - 1) * JOOBLE_PAGE_SIZE:page * JOOBLE_PAGE_SIZE]
+        self._send({"totalCount": len(jobs), "jobs": [{
+            "title": job["title"],
+            "company": job["company"],
+            "location": job["location"],
+            "snippet": f"<b>{job['title']}</b> {job['description']}",
+            "link": f"https://jobs.example.com/{job['id']}/?ref=jooble#apply",
+            "type": job["type"],
+            "salary": job["salary"],
+            "updated": job["posted"],
+        } for job in chunk]})
+
+
+def serve(port=0, latency=0.0, total=45):
+    """Start the server on a background thread; returns the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.latency = latency
+    server.total = total
+    server.requests = {}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--total", type=int, default=45, help="postings per query")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.total)
+    print(f"fake job server on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
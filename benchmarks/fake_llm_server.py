@@ -0,0 +1,152 @@
+"""
+Local stand-in for the chat-completion servers the LLM backends talk to.
+
+Serves the OpenAI-compatible route used by the Hugging Face backend
+(with HF_BASE_URL) and the Ollama chat route, streaming or not:
+    POST /v1/chat/completions   (HF / TGI / vLLM / OpenAI shape)
+    POST /api/chat              (Ollama shape, NDJSON when streaming)
+    GET  /stats                 request counts per route
+
+Replies are deterministic (the stub backend's: JSON output templates in
+the prompt come back filled with empty values). Each reply waits
+`--latency` seconds before its first token and then emits tokens at
+`--token-rate` per second, so a long answer costs what it would on a
+real server.
+
+Run from the repository root, then point the app at it:
+    python -m benchmarks.fake_llm_server --port 8766 --latency 0.5 --token-rate 50
+    LLM_BACKEND=hf HF_BASE_URL=http://127.0.0.1:8766 python app.py
+    LLM_BACKEND=ollama OLLAMA_HOST=http://127.0.0.1:8766 python app.py
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from files.llm_backend import StubBackend
+from files.prompt_budget import estimate_tokens
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "FakeLLM/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _count(self, name):
+        with self.server.lock:
+            self.server.requests[name] = self.server.requests.get(name, 0) + 1
+
+    def _tokens(self, messages):
+        # Time to first token, then one token per 1 / token_rate seconds.
+        text = StubBackend.respond(messages)
+        time.sleep(self.server.latency)
+        for token in re.findall(r"\s*\S+", text):
+            if self.server.token_rate:
+                time.sleep(1 / self.server.token_rate)
+            yield token
+
+    def do_GET(self):
+        if self.path == "/stats":
+            return self._send(self.server.requests)
+        self._send({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        messages = body.get("messages") or []
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        model = body.get("model") or "fake"
+
+        if self.path.rstrip("/").endswith("/v1/chat/completions"):
+            self._count("openai")
+            if body.get("stream"):
+                self._start_stream("text/event-stream")
+                for token in self._tokens(messages):
+                    chunk = {"object": "chat.completion.chunk", "model": model, "created": int(time.time()),
+                             "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                    self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                self._chunk(b"data: [DONE]\n\n")
+                return self._end_stream()
+            text = "".join(self._tokens(messages))
+            return self._send({
+                "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": estimate_tokens(text),
+                          "total_tokens": prompt_tokens + estimate_tokens(text)},
+            })
+
+        if self.path == "/api/chat":
+            self._count("ollama")
+            if body.get("stream", True):
+                self._start_stream("application/x-ndjson")
+                for token in self._tokens(messages):
+                    part = {"model": model, "message": {"role": "assistant", "content": token}, "done": False}
+                    self._chunk((json.dumps(part) + "\n").encode())
+                self._chunk((json.dumps({"model": model, "message": {"role": "assistant", "content": ""},
+                                         "done": True}) + "\n").encode())
+                return self._end_stream()
+            text = "".join(self._tokens(messages))
+            return self._send({
+                "model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "message": {"role": "assistant", "content": text}, "done": True,
+                "prompt_eval_count": prompt_tokens, "eval_count": estimate_tokens(text),
+            })
+
+        self._send({"error": "not found"}, 404)
+
+
+def serve(port=0, latency=0.0, token_rate=0.0):
+    """Start the server on a background thread; returns the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_rate = token_rate
+    server.requests = {}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="tokens per second after that (0: instant)")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.token_rate)
+    print(f"fake LLM server on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 import pdfplumber
-import ollama
+from files.llm_backend import get_backend
+from files.prompt_budget import budget_text, compact_prompt
+
+# Served by whichever backend LLM_BACKEND selects; the Ollama backend maps
+# it to OLLAMA_MODEL.
+MODEL = "meta-llama/Llama-3.3-70B-Instruct"
 
 def extract_ordered_text_pdf(file_path):
     text = ""
@@ -14,7 +19,7 @@ def extract_ordered_text_pdf(file_path):
 
 def send_text_to_llm(text):
     
-    prompt = """
+    prompt = f"""
 
 Organize the resume text into these sections:
 - Name and Contact Information
@@ -29,17 +34,17 @@ If a section uses a different title (e.g., "Profile", "Career Overview"), map it
 
 Return the result as JSON with only these exact section names.
 
-input text: {text}
+input text: {budget_text(text, 'structure', count=get_backend().count_tokens)}
 
 Output JSON:"""
 
     try:
-        response = ollama.chat(model="llama3", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": compact_prompt(prompt)}
         ])
 
-        return f"{response['message']['content']}"
+        return f"{response}"
 
 
     except Exception as e:
@@ -50,16 +55,16 @@ def extract_keywords(job_description):
     prompt = f"""
     You are an AI career assistant.
     Task: you are given a resume text. Extract and list all the keywords relevant for the job role.
-    Input: {job_description}
+    Input: {budget_text(job_description, count=get_backend().count_tokens)}
     Output: A list of keywords in JSON format.
     """
     try:
-        response = ollama.chat(model="llama3", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": compact_prompt(prompt)}
         ])
 
-        return f"{response['message']['content']}"
+        return f"{response}"
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
 
@@ -94,12 +99,12 @@ def generate_missing_skills(role, candidate_skills):
     """
 
     try:
-        response = ollama.chat(model="llama3", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": compact_prompt(prompt)}
         ])
 
-        return f"{response['message']['content']}"
+        return f"{response}"
 
 
     except Exception as e:
@@ -115,12 +120,12 @@ def retrieve_skills(text):
     Output: A list of skills in JSON format.
     """
     try:
-        response = ollama.chat(model="llama3", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": compact_prompt(prompt)}
         ])
 
-        return f"{response['message']['content']}"
+        return f"{response}"
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
 
@@ -137,8 +142,8 @@ def ats_score_generator(skills, job_description):
     5. Provide a brief explanation of the score.
 
     Input:
-    Resume Text: "{skills}"
-    Job Description: "{job_description}"
+    Resume Text: "{budget_text(skills, 'ats_score', count=get_backend().count_tokens)}"
+    Job Description: "{budget_text(job_description, count=get_backend().count_tokens)}"
 
     Output:
     {{
@@ -148,12 +153,12 @@ def ats_score_generator(skills, job_description):
     """
 
     try:
-        response = ollama.chat(model="llama3", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": compact_prompt(prompt)}
         ])
 
-        return f"{response['message']['content']}"
+        return f"{response}"
 
 
     except Exception as e:
@@ -168,7 +173,7 @@ def generate_project_ideas(role, job_description):
     You are an AI career assistant that helps candidates strengthen their resume by suggesting real-world project ideas.
 
     Job Role: {role}
-    Job Description: {job_description} 
+    Job Description: {budget_text(job_description, count=get_backend().count_tokens)}
 
     Your task:
     1. Analyze the role and job description.
@@ -187,12 +192,12 @@ def generate_project_ideas(role, job_description):
     """
 
     try:
-        response = ollama.chat(model="llama3", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": compact_prompt(prompt)}
         ])
 
-        return f"{response['message']['content']}"
+        return f"{response}"
 
 
     except Exception as e:
@@ -229,19 +234,20 @@ Return the output in JSON format with the following structure:
 
 """
     try:
-        response = ollama.chat(model="llama3", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": combined_prompt}
+            {"role": "user", "content": compact_prompt(combined_prompt)}
         ])
 
-        return f"{response['message']['content']}"  
+        return f"{response}"  
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
 
 
 
-ans = generate_interview_questions("Data Scientist", "Python, Machine Learning, Data Analysis")
-print(ans)
+if __name__ == "__main__":
+    ans = generate_interview_questions("Data Scientist", "Python, Machine Learning, Data Analysis")
+    print(ans)
 
 # ans = generate_project_ideas("Data Analyst", "")
 # print(ans)
@@ -1,10 +1,113 @@
-from huggingface_hub import InferenceClient
+import functools
 
+import numpy as np
 
-client = InferenceClient()
+from files.llm_backend import get_backend
+from files.metrics import timed
+from files.prompt_budget import budget_text, compact_prompt
+from files.single_flight import single_flight
+from files.skill_terms import extract_terms, skill_vocabulary
 
+MODEL = "meta-llama/Llama-3.3-70B-Instruct"
 
-def ats_score_generator(skills, job_description):
+# Known skills count this many times more than ordinary JD keywords.
+SKILL_WEIGHT = 3.0
+
+
+def _jd_weight_matrix(jd_terms):
+    """
+    Term weights for the job descriptions over their shared vocabulary:
+    sublinear TF, with known skills boosted. Each row depends only on its
+    own JD, so a pair scores the same alone or in any batch.
+    """
+    vocab = sorted(set().union(*jd_terms))
+    index = {term: i for i, term in enumerate(vocab)}
+    tf = np.zeros((len(jd_terms), len(vocab)), dtype=np.float32)
+    for row, terms in enumerate(jd_terms):
+        for term, count in terms.items():
+            tf[row, index[term]] = count
+
+    weights = np.zeros_like(tf)
+    np.log(tf, out=weights, where=tf > 0)
+    weights = np.where(tf > 0, 1 + weights, 0)
+
+    skills = skill_vocabulary()
+    skill_cols = np.array([term in skills for term in vocab], dtype=bool)
+    weights[:, skill_cols] *= SKILL_WEIGHT
+    return vocab, index, weights
+
+
+def _presence_matrix(resume_terms, index):
+    presence = np.zeros((len(resume_terms), len(index)), dtype=np.float32)
+    for row, terms in enumerate(resume_terms):
+        cols = [index[term] for term in terms if term in index]
+        presence[row, cols] = 1
+    return presence
+
+
+@functools.lru_cache(maxsize=32)
+def _jd_weights(job_descriptions):
+    """_jd_weight_matrix for a tuple of JD texts, reused across resume batches."""
+    return _jd_weight_matrix([extract_terms(jd) for jd in job_descriptions])
+
+
+def _scores(presence, weights):
+    totals = weights.sum(axis=1)
+    totals[totals == 0] = 1
+    return np.rint(100 * (presence @ weights.T) / totals).astype(int)
+
+
+def score_matrix(resume_texts, job_descriptions):
+    """
+    Batch ATS scores: a (resumes x job descriptions) array of 0-100
+    weighted keyword coverage. Every text is tokenized once and all pairs
+    are scored with a single matrix product.
+    """
+    _, index, weights = _jd_weights(tuple(job_descriptions))
+    presence = _presence_matrix([extract_terms(text) for text in resume_texts], index)
+    return _scores(presence, weights)
+
+
+def ats_scores(resume_texts, job_descriptions):
+    """
+    score_matrix with the matched and missing skills/keywords of every
+    pair: a (resumes x job descriptions) grid of ats_score results.
+    """
+    vocab, index, weights = _jd_weights(tuple(job_descriptions))
+    presence = _presence_matrix([extract_terms(text) for text in resume_texts], index)
+    scores = _scores(presence, weights)
+    skills = skill_vocabulary()
+    order = [np.argsort(-row, kind="stable") for row in weights]
+
+    grid = []
+    for i, row in enumerate(presence):
+        results = []
+        for j, cols in enumerate(order):
+            matched, missing = [], []
+            for col in cols:
+                if weights[j, col]:
+                    (matched if row[col] else missing).append(vocab[col])
+            results.append({
+                "ats_score": int(scores[i, j]),
+                "matched_skills": [t for t in matched if t in skills],
+                "missing_skills": [t for t in missing if t in skills],
+                "matched_keywords": [t for t in matched if t not in skills],
+                "missing_keywords": [t for t in missing if t not in skills],
+            })
+        grid.append(results)
+    return grid
+
+
+@timed("ats.score")
+def ats_score(resume_text, job_description):
+    """
+    Deterministic ATS score for one resume against one job description,
+    with the matched and missing skills/keywords ordered by weight.
+    """
+    return ats_scores([resume_text], [job_description])[0][0]
+
+
+def ats_score_messages(skills, job_description):
     prompt = f"""
     You are an expert in Applicant Tracking Systems (ATS) and resume optimization.
 
@@ -16,8 +119,8 @@ def ats_score_generator(skills, job_description):
     5. Provide a brief explanation of the score.
 
     Input:
-    Resume Text: "{skills}"
-    Job Description: "{job_description}"
+    Resume Text: "{budget_text(skills, 'ats_score', count=get_backend().count_tokens)}"
+    Job Description: "{budget_text(job_description, count=get_backend().count_tokens)}"
 
     Output:
     {{
@@ -26,16 +129,23 @@ def ats_score_generator(skills, job_description):
     }}
     """
 
-    messages = [
-        {"role": "user", "content": prompt}
+    return [
+        {"role": "user", "content": compact_prompt(prompt)}
     ]
 
+
+@timed("generate.ats_score")
+@single_flight("ats_score")
+def ats_score_generator(skills, job_description):
+    """LLM prose assessment; only used when an explanation is requested."""
+    messages = ats_score_messages(skills, job_description)
+
     try:
-        response = client.chat_completion(
+        response = get_backend().chat(
             messages=messages,
-            model="meta-llama/Llama-3.3-70B-Instruct"
+            model=MODEL
         )
 
-        return f"{response.choices[0].message.content}"  
+        return f"{response}"  
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
\ No newline at end of file
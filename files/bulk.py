@@ -0,0 +1,290 @@
+"""
+Bulk resume analysis.
+
+Usage (from the repository root):
+    python -m files.bulk resumes.zip --target "Data Scientist" \\
+        --target "ML Engineer=jds/ml_engineer.txt" --out results.jsonl
+
+Inputs are a directory or ZIP of PDFs and one or more targets, each a
+role with an optional job description file. Results are appended to a
+JSONL or CSV file as they finish; rerunning with the same output file
+skips (resume, target) pairs that are already there.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from files.ATS_score import ats_scores
+from files.llm_backend import get_backend
+from files.missing_skills import generate_missing_skills, resume_skills
+from files.pdf_extract import PDF_EXTRACT_WORKERS, PDF_MAX_BYTES, PDFRejected
+from files.structured_output import parse_feature_output
+from files.upload_cache import extract_with_cache
+
+
+CSV_FIELDS = ["key", "resume", "sha256", "role", "ats_score", "matched_skills",
+              "missing_skills", "missing_skills_llm", "error"]
+
+# Uncompressed-to-compressed size past which a ZIP member is treated as a
+# zip bomb; PDFs rarely compress better than 10:1.
+ZIP_MAX_RATIO = int(os.getenv("ZIP_MAX_RATIO", "100"))
+# Extraction jobs in flight per worker, so ZIP member bytes are read only
+# a few at a time.
+EXTRACT_WINDOW_PER_WORKER = 2
+# Analyses in flight per LLM slot before extraction pauses.
+ANALYSIS_WINDOW_PER_SLOT = 4
+
+
+def _check_member(info):
+    if PDF_MAX_BYTES and info.file_size > PDF_MAX_BYTES:
+        return PDFRejected(f"PDF is {info.file_size} bytes; the limit is {PDF_MAX_BYTES}")
+    if ZIP_MAX_RATIO and info.file_size > ZIP_MAX_RATIO * max(info.compress_size, 1):
+        return PDFRejected(f"compression ratio over {ZIP_MAX_RATIO}:1")
+    return None
+
+
+def iter_pdfs(path):
+    """
+    Yield (name, path-or-bytes) for every PDF in a directory or ZIP. ZIP
+    members over PDF_MAX_BYTES or ZIP_MAX_RATIO are not read; their
+    source is the PDFRejected error instead.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".pdf"):
+                    yield info.filename, _check_member(info) or archive.read(info)
+        return
+    for root, _, names in os.walk(path):
+        for name in sorted(names):
+            if name.lower().endswith(".pdf"):
+                full = os.path.join(root, name)
+                yield os.path.relpath(full, path), full
+
+
+def parse_target(spec):
+    """'Role' or 'Role=path/to/jd.txt' -> {"role", "job_description"}."""
+    role, _, jd_path = spec.partition("=")
+    job_description = ""
+    if jd_path:
+        with open(jd_path, encoding="utf-8") as f:
+            job_description = f.read()
+    return {"role": role.strip(), "job_description": job_description}
+
+
+def target_key(sha256, target):
+    jd_hash = hashlib.sha256(target["job_description"].encode("utf-8")).hexdigest()[:12]
+    return f"{sha256}:{target['role']}:{jd_hash}"
+
+
+def _extract(name, source):
+    start = time.perf_counter()
+    if isinstance(source, Exception):
+        raise source
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    record, cache_hit = extract_with_cache(source)
+    return name, record, cache_hit, time.perf_counter() - start
+
+
+def _decode(line):
+    """One JSONL row, or None for a blank or corrupt line."""
+    try:
+        return json.loads(line) if line.strip() else None
+    except ValueError:
+        return None
+
+
+class ResultWriter:
+    """Append-only JSONL/CSV writer that remembers which keys are done."""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._drop_partial_row()
+            with open(path, encoding="utf-8", newline="") as f:
+                rows = csv.DictReader(f) if self.is_csv else map(_decode, f)
+                self.done = {row["key"] for row in rows if row and row.get("key")}
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        if self.is_csv:
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if new_file:
+                self._csv.writeheader()
+
+    def _drop_partial_row(self):
+        """
+        Cut a row left half-written by a killed run. Rows are written and
+        flushed whole, so anything after the last newline is incomplete.
+        """
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if not size:
+                return
+            f.seek(max(size - 65536, 0))
+            while True:
+                start = f.tell()
+                chunk = f.read(65536)
+                end = chunk.rfind(b"\n")
+                if end >= 0 or start == 0:
+                    break
+                f.seek(max(start - 65536, 0))
+            last_newline = start + end + 1 if end >= 0 else 0
+            if last_newline < size:
+                f.truncate(last_newline)
+
+    def write(self, row):
+        with self._lock:
+            if self.is_csv:
+                flat = {k: "; ".join(v) if isinstance(v, list) else
+                        json.dumps(v) if isinstance(v, dict) else v
+                        for k, v in row.items()}
+                self._csv.writerow(flat)
+            else:
+                self._file.write(json.dumps(row) + "\n")
+            # Flushed per row so a crash loses at most the row in flight.
+            self._file.flush()
+            self.done.add(row["key"])
+
+    def close(self):
+        self._file.close()
+
+
+def run_bulk(source, targets, out_path, use_llm=True, workers=None, progress=None):
+    """
+    Analyze every PDF under `source` against every target and stream rows
+    to `out_path`. Returns a summary with throughput and stage timings.
+    """
+    workers = workers or PDF_EXTRACT_WORKERS
+    writer = ResultWriter(out_path)
+    timings = {"extract": 0.0, "ats_score": 0.0, "skills": 0.0, "missing_skills": 0.0}
+    timings_lock = threading.Lock()
+    counts = {"resumes": 0, "rows": 0, "skipped": 0, "errors": 0, "extract_cache_hits": 0}
+    start = time.perf_counter()
+
+    def timed(stage, fn, *args):
+        t = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with timings_lock:
+                timings[stage] += time.perf_counter() - t
+
+    # Every resume is scored against all targets in one batch; the targets'
+    # term weights are computed once for the whole run.
+    job_descriptions = [target["job_description"] or target["role"] for target in targets]
+
+    def analyze(name, record, target, score):
+        row = {"key": target_key(record["sha256"], target), "resume": name,
+               "sha256": record["sha256"], "role": target["role"], "error": None}
+        try:
+            if isinstance(score, Exception):
+                raise score
+            row.update(ats_score=score["ats_score"], matched_skills=score["matched_skills"],
+                       missing_skills=score["missing_skills"])
+            if use_llm:
+                # Skills come from the resume's Skills section when it has
+                # one; LLM fallbacks are cached per resume, so only the
+                # first target for a resume pays for them.
+                skills = timed("skills", lambda: resume_skills(record["text"])[0])
+                raw = timed("missing_skills", generate_missing_skills, target["role"], skills)
+                missing, errors = parse_feature_output("missing_skills", raw)
+                row["missing_skills_llm"] = missing if not errors else raw
+        except Exception as e:
+            row["error"] = str(e)
+        return row
+
+    llm_slots = get_backend().max_concurrency if use_llm else workers
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as extract_pool, \
+                ThreadPoolExecutor(max_workers=max(llm_slots, 1)) as analysis_pool:
+            # Bounded windows of extraction jobs and analyses in flight, so
+            # at most a few ZIP members and records are held in memory at
+            # once; finished rows are written as soon as they are ready.
+            sources = iter_pdfs(source)
+            extract_window = max(workers, 1) * EXTRACT_WINDOW_PER_WORKER
+            analysis_window = max(llm_slots, 1) * ANALYSIS_WINDOW_PER_SLOT
+            extracting, analyzing = set(), set()
+            exhausted = False
+            while True:
+                while not exhausted and len(extracting) < extract_window and len(analyzing) < analysis_window:
+                    item = next(sources, None)
+                    if item is None:
+                        exhausted = True
+                    else:
+                        extracting.add(extract_pool.submit(_extract, *item))
+                if not extracting and not analyzing:
+                    break
+                finished, _ = wait(extracting | analyzing, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in analyzing:
+                        analyzing.discard(future)
+                        row = future.result()
+                        writer.write(row)
+                        counts["rows"] += 1
+                        counts["errors"] += int(bool(row["error"]))
+                        if progress:
+                            progress(f"{row['resume']} / {row['role']}: {row.get('ats_score')}")
+                        continue
+                    extracting.discard(future)
+                    try:
+                        name, record, cache_hit, seconds = future.result()
+                    except Exception as e:
+                        counts["errors"] += 1
+                        if progress:
+                            progress(f"extraction failed: {e}")
+                        continue
+                    counts["resumes"] += 1
+                    counts["extract_cache_hits"] += int(cache_hit)
+                    timings["extract"] += seconds
+                    todo = [i for i, target in enumerate(targets)
+                            if target_key(record["sha256"], target) not in writer.done]
+                    counts["skipped"] += len(targets) - len(todo)
+                    if not todo:
+                        continue
+                    try:
+                        scores = timed("ats_score", ats_scores, [record["text"]], job_descriptions)[0]
+                    except Exception as e:
+                        scores = [e] * len(targets)
+                    for i in todo:
+                        analyzing.add(analysis_pool.submit(analyze, name, record, targets[i], scores[i]))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        **counts,
+        "output": out_path,
+        "elapsed_seconds": round(elapsed, 3),
+        "resumes_per_minute": round(counts["resumes"] / elapsed * 60, 2) if elapsed else 0.0,
+        "stage_seconds": {stage: round(total, 3) for stage, total in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk resume analysis")
+    parser.add_argument("source", help="directory or ZIP file of PDF resumes")
+    parser.add_argument("--target", action="append", required=True,
+                        help="'Role' or 'Role=path/to/jd.txt'; repeat for several")
+    parser.add_argument("--out", default="bulk_results.jsonl", help=".jsonl or .csv output file")
+    parser.add_argument("--no-llm", action="store_true", help="only run local ATS scoring")
+    parser.add_argument("--workers", type=int, default=None, help="PDF extraction processes")
+    args = parser.parse_args()
+
+    summary = run_bulk(args.source, [parse_target(t) for t in args.target], args.out,
+                       use_llm=not args.no_llm, workers=args.workers, progress=print)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
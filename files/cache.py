@@ -0,0 +1,214 @@
+import contextvars
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from files.metrics import metrics, trace_event
+
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("cache", "llm_cache.sqlite3"))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+ERROR_PREFIX = "⚠️ Error"
+
+_fresh = contextvars.ContextVar("fresh_responses", default=False)
+
+
+def normalize_text(value):
+    """
+    Normalize a stage input so cosmetic differences (case, spacing,
+    line breaks) map to the same cache key.
+    """
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return re.sub(r"\s+", " ", value).strip().lower()
+
+
+def make_key(*parts):
+    """Content hash over the already-normalized key parts."""
+    payload = json.dumps(parts, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def fresh(enabled=True):
+    """
+    Ask for newly generated output in this context (and threads started
+    from it): caches that serve similar rather than identical prompts
+    skip their lookups.
+    """
+    token = _fresh.set(bool(enabled))
+    try:
+        yield
+    finally:
+        _fresh.reset(token)
+
+
+def fresh_requested():
+    return _fresh.get()
+
+
+class LLMCache:
+    """
+    Persistent LRU/TTL cache for LLM stage outputs, stored in SQLite.
+
+    Entries are keyed by (stage, content hash) so each pipeline stage is
+    cached independently. Eviction drops expired rows first and then the
+    least recently used rows until both the entry and byte caps hold.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES,
+                 max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    stage TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (stage, key)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)"
+            )
+        return self._conn
+
+    def _count(self, stage, outcome, start):
+        counters = self._stats.setdefault(stage, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+        outcome = "hit" if outcome == "hits" else "miss"
+        metrics.inc("llm_cache_requests_total", stage=stage, outcome=outcome)
+        trace_event(f"cache.{stage}", start, time.perf_counter() - start, outcome=outcome)
+
+    def get(self, stage, key):
+        start = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE stage = ? AND key = ?",
+                (stage, key),
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM llm_cache WHERE stage = ? AND key = ?", (stage, key))
+                    conn.commit()
+                self._count(stage, "misses", start)
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE stage = ? AND key = ?",
+                (now, stage, key),
+            )
+            conn.commit()
+            self._count(stage, "hits", start)
+            return row[0]
+
+    def set(self, stage, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (stage, key, value, size, now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT stage, key, size FROM llm_cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        for stage, key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM llm_cache WHERE stage = ? AND key = ?", (stage, key))
+            count -= 1
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+            self._stats = {}
+
+    def stats(self):
+        """Hit/miss counters per stage plus current size of the store."""
+        with self._lock:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+            stages = {stage: dict(counters) for stage, counters in self._stats.items()}
+        return {"entries": count, "bytes": total, "stages": stages}
+
+
+llm_cache = LLMCache()
+
+
+def cached_stage(stage, model, prompt_version):
+    """
+    Cache a single LLM stage on the normalized content of its arguments,
+    the model name and the prompt template version. Error strings are
+    never stored, so a failed call is retried next time. Works on plain
+    and coroutine functions; both share the same entries.
+    """
+    def cache_key(*args):
+        return make_key(stage, model, prompt_version, *[normalize_text(a) for a in args])
+
+    def store(key, result):
+        if isinstance(result, str) and not result.startswith(ERROR_PREFIX):
+            llm_cache.set(stage, key, result)
+        return result
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args):
+                key = cache_key(*args)
+                cached = llm_cache.get(stage, key)
+                return cached if cached is not None else store(key, await fn(*args))
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args):
+                key = cache_key(*args)
+                cached = llm_cache.get(stage, key)
+                return cached if cached is not None else store(key, fn(*args))
+        # Exposed so streaming callers can read and fill the same entries.
+        wrapper.stage = stage
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorator
@@ -0,0 +1,285 @@
+"""
+Local text embeddings and top-k cosine search, no model or network calls.
+
+Texts are embedded with signed feature hashing over words, word bigrams
+and (for short texts such as skill names) character trigrams, after
+mapping known skill aliases to their canonical names. Indexes are a
+float32 matrix saved as .npy and opened memory-mapped, plus a JSON file
+of labels, so 100k+ rows search in milliseconds on one CPU.
+
+Build and query an index from the repository root:
+    python -m files.embeddings build jobs.jsonl --out cache/embeddings/jobs
+    python -m files.embeddings query cache/embeddings/jobs "python ml engineer" -k 5
+
+Input lines are plain text or JSON objects with "text" (or "title" and
+"description") and an optional "id" used as the label.
+"""
+import argparse
+import functools
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from files.skill_terms import ALIASES_PATH, alias_map, canonical_skill, tokenize
+
+
+EMBED_DIM = int(os.getenv("EMBED_DIM", "384"))
+EMBEDDINGS_DIR = os.getenv("EMBEDDINGS_DIR", os.path.join("cache", "embeddings"))
+SKILL_MATCH_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", "0.6"))
+
+# Character trigrams make short phrases match across spelling variants
+# ("postgres"/"postgresql"); long texts skip them to keep hashing cheap.
+CHAR_NGRAM_MAX_TOKENS = 8
+SKILL_FEATURE_WEIGHT = 2.0
+CHAR_FEATURE_WEIGHT = 0.5
+SEARCH_CHUNK_ROWS = 16384
+
+
+def _features(text):
+    tokens = tokenize(text)
+    features = [(token, 1.0) for token in tokens]
+    features += [(f"{a} {b}", 1.0) for a, b in zip(tokens, tokens[1:])]
+    canonical = canonical_skill(text)
+    if canonical:
+        features.append((f"skill:{canonical}", SKILL_FEATURE_WEIGHT))
+    else:
+        aliases = alias_map()
+        features += [(f"skill:{aliases[t]}", SKILL_FEATURE_WEIGHT) for t in tokens if t in aliases]
+    if len(tokens) <= CHAR_NGRAM_MAX_TOKENS:
+        for token in tokens:
+            padded = f"#{token}#"
+            features += [(padded[i:i + 3], CHAR_FEATURE_WEIGHT) for i in range(len(padded) - 2)]
+    return features
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def _bucket(feature, dim):
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, 1.0 if h & 0x80000000 else -1.0
+
+
+def embed(texts, dim=EMBED_DIM):
+    """L2-normalized hashed embeddings, one float32 row per text."""
+    rows, cols, values = [], [], []
+    for row, text in enumerate(texts):
+        features = _features(text or "")
+        buckets = [_bucket(feature, dim) for feature, _ in features]
+        rows.extend([row] * len(features))
+        cols.extend([col for col, _ in buckets])
+        values.extend([sign * weight for (_, sign), (_, weight) in zip(buckets, features)])
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    np.add.at(vectors, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)),
+              np.array(values, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _write_labels(path, labels, meta):
+    tmp = path + ".json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "labels": labels}, f)
+    os.replace(tmp, path + ".json")
+
+
+class EmbeddingIndex:
+    """
+    Labels plus a (rows x dim) matrix of unit vectors. Saved indexes are
+    reopened with mmap_mode="r", so only the pages a search touches are
+    read and several processes share one copy through the page cache.
+    """
+
+    def __init__(self, vectors, labels, meta=None):
+        self.vectors = vectors
+        self.labels = labels
+        self.meta = meta or {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    @classmethod
+    def build(cls, labels, texts=None, dim=EMBED_DIM, path=None, batch_size=4096):
+        """
+        Embed `texts` (default: the labels) in batches. With a `path` the
+        rows are written straight into a memory-mapped .npy file so the
+        full matrix never has to fit in memory.
+        """
+        texts = labels if texts is None else texts
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            vectors = np.lib.format.open_memmap(path + ".npy.tmp", mode="w+",
+                                                dtype=np.float32, shape=(len(texts), dim))
+        else:
+            vectors = np.zeros((len(texts), dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            vectors[start:start + batch_size] = embed(texts[start:start + batch_size], dim)
+        meta = {"dim": dim, "rows": len(texts)}
+        if not path:
+            return cls(vectors, list(labels), meta)
+        vectors.flush()
+        del vectors
+        _write_labels(path, list(labels), meta)
+        os.replace(path + ".npy.tmp", path + ".npy")
+        return cls.load(path)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".npy.tmp", "wb") as f:
+            np.save(f, np.asarray(self.vectors, dtype=np.float32))
+        _write_labels(path, self.labels, self.meta)
+        os.replace(path + ".npy.tmp", path + ".npy")
+
+    @classmethod
+    def load(cls, path):
+        with open(path + ".json", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(np.load(path + ".npy", mmap_mode="r"), data["labels"], data["meta"])
+
+    def search(self, queries, k=10):
+        """
+        Top-k cosine matches for each query text (or pre-embedded row):
+        a list per query of (label, score), best first. Rows are scanned
+        in chunks and only k candidates per query are kept between chunks.
+        """
+        if isinstance(queries, np.ndarray):
+            q = queries
+        else:
+            q = embed(queries, self.vectors.shape[1])
+        k = min(k, len(self))
+        if k == 0:
+            return [[] for _ in range(len(q))]
+
+        best_scores = np.full((len(q), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(q), k), dtype=np.int64)
+        for start in range(0, len(self), SEARCH_CHUNK_ROWS):
+            scores = q @ np.asarray(self.vectors[start:start + SEARCH_CHUNK_ROWS]).T
+            rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(self.labels[row], float(score)) for row, score in zip(rows, scores) if score > -np.inf]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+
+@functools.lru_cache(maxsize=1)
+def skill_index():
+    """
+    Index of the skill taxonomy (every canonical name and alias, labelled
+    with its canonical skill), rebuilt on disk when the alias file changes.
+    """
+    path = os.path.join(EMBEDDINGS_DIR, "skills")
+    version = f"{os.path.getmtime(ALIASES_PATH)}:{EMBED_DIM}"
+    try:
+        index = EmbeddingIndex.load(path)
+        if index.meta.get("version") == version:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    phrases = sorted(alias_map().items())
+    index = EmbeddingIndex.build([canonical for _, canonical in phrases], [alias for alias, _ in phrases])
+    index.meta["version"] = version
+    index.save(path)
+    return index
+
+
+def nearest_skills(phrases, threshold=SKILL_MATCH_THRESHOLD):
+    """Map free-text skill phrases to canonical skills, None below threshold."""
+    return [
+        hits[0][0] if hits and hits[0][1] >= threshold else None
+        for hits in skill_index().search(list(phrases), k=1)
+    ]
+
+
+def match_skills(candidate_skills, required_skills, threshold=SKILL_MATCH_THRESHOLD):
+    """
+    Compare a resume's skills with the skills a job asks for. Candidate
+    skills are first resolved against the precomputed skill index, so a
+    required skill is matched by any alias of it; the rest are compared
+    with the candidate skills directly by cosine similarity. Returns
+    {"matched": [{"required", "candidate", "score"}], "missing":
+    [required, ...]} in the order of `required_skills`.
+    """
+    required_skills = list(required_skills)
+    candidate_skills = list(candidate_skills)
+    matched, missing = [], []
+    if not candidate_skills:
+        return {"matched": matched, "missing": required_skills}
+    candidates = embed(candidate_skills)
+    resolved = {}
+    for candidate, hits in zip(candidate_skills, skill_index().search(candidates, k=1)):
+        if hits and hits[0][1] >= threshold and hits[0][1] > resolved.get(hits[0][0], ("", -1.0))[1]:
+            resolved[hits[0][0]] = (candidate, hits[0][1])
+
+    unresolved = [required for required in required_skills if canonical_skill(required) not in resolved]
+    similarity = embed(unresolved) @ candidates.T if unresolved else None
+    for required in required_skills:
+        if canonical_skill(required) in resolved:
+            candidate, score = resolved[canonical_skill(required)]
+        else:
+            row = similarity[unresolved.index(required)]
+            best = int(np.argmax(row))
+            candidate, score = candidate_skills[best], float(row[best])
+        if score >= threshold:
+            matched.append({"required": required, "candidate": candidate, "score": round(score, 3)})
+        else:
+            missing.append(required)
+    return {"matched": matched, "missing": missing}
+
+
+def _read_items(path):
+    labels, texts = [], []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                text = item.get("text") or f"{item.get('title', '')}\n{item.get('description', '')}"
+                labels.append(str(item.get("id", number)))
+            else:
+                text = line
+                labels.append(line)
+            texts.append(text)
+    return labels, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local embedding index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="embed a text or JSONL file into an index")
+    build.add_argument("source")
+    build.add_argument("--out", required=True, help="index path without extension")
+    query = sub.add_parser("query", help="top-k search against a saved index")
+    query.add_argument("index")
+    query.add_argument("text", nargs="+")
+    query.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "build":
+        labels, texts = _read_items(args.source)
+        index = EmbeddingIndex.build(labels, texts, path=args.out)
+        print(f"indexed {len(index)} rows in {time.perf_counter() - start:.2f}s -> {args.out}.npy")
+    else:
+        index = EmbeddingIndex.load(args.index)
+        for text, hits in zip(args.text, index.search(args.text, args.k)):
+            print(f"{text}:")
+            for label, score in hits:
+                print(f"  {score:.3f}  {label}")
+        print(f"searched {len(index)} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
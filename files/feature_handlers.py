@@ -0,0 +1,278 @@
+"""
+Stages and payload builders behind the features declared in
+files.features.
+
+A stage receives the request inputs plus the outputs of the stages it
+depends on and returns its own output; stages are shared, so the skills
+list is extracted once for every feature of a request that needs it. A
+builder turns those results into the JSON payload static/script.js
+renders and returns (payload, status). Model-backed modules are reached
+through the handler registry so this module stays cheap to import.
+Stages that call a model have an `a`-prefixed coroutine twin for
+handlers.arun (the ASGI server).
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from files.features import handlers
+from files.structured_output import parse_feature_output
+
+
+JOB_FEED_PAGE_SIZE = int(os.getenv("JOB_FEED_PAGE_SIZE", "20"))
+MAX_KEYWORDS = 15
+_PROJECT_START = re.compile(r"^\s*\d+[.)]\s+")
+
+
+def form_flag(value):
+    """A form boolean ("true", "1", "yes", or a JSON bool); None when not given."""
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes') if value else None
+    return None if value is None else bool(value)
+
+
+def structured(feature, raw):
+    """Schema-valid value for a raw completion, or the raw text with errors."""
+    value, errors = parse_feature_output(feature, raw)
+    if errors:
+        return {'raw': raw, 'errors': errors}
+    return value
+
+
+def skills_payload(skills_raw, missing_raw):
+    """Shape the skills chain output the way static/script.js renders it."""
+    skills, _ = parse_feature_output('skills', skills_raw)
+    missing, errors = parse_feature_output('missing_skills', missing_raw)
+    if errors:
+        return {'error': 'Could not parse missing skills', 'details': errors, 'raw': missing_raw}
+    return {
+        'existing_skills': skills or [],
+        'missing_skills': [skill for items in missing.values() for skill in items],
+        'missing_by_category': missing,
+    }
+
+
+# Stages ----------------------------------------------------------------
+
+def skills_stage(r):
+    start = time.perf_counter()
+    text, mode, llm_calls = handlers['resume_skills'](r['resume_text'], r['pipeline_mode'])
+    skills, _ = parse_feature_output('skills', text, repair=False)
+    return {
+        'text': text,
+        'list': skills or [],
+        'mode': mode,
+        'llm_calls': llm_calls,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def missing_skills_without_model(r):
+    skills = r['skills']
+    if skills['mode'] == 'local' and r['job_description']:
+        # Fully local: the JD's skills are matched against the resume's
+        # with the embedding index instead of asking the model.
+        missing = handlers['local_missing_skills'](skills['list'], r['job_description'])
+        return {'raw': None, 'by_category': {'Job Description': missing}, 'llm_calls': 0}
+    # Roles in the role knowledge base need no model call at all.
+    known = handlers['known_missing_skills'](r['job_title'], skills['text'], learn=False)
+    if known is not None:
+        return {'raw': known, 'llm_calls': 0}
+    return None
+
+
+def missing_skills_stage(r):
+    return missing_skills_without_model(r) or {
+        'raw': handlers['generate_missing_skills'](r['job_title'], r['skills']['text']), 'llm_calls': 1}
+
+
+async def amissing_skills_stage(r):
+    # The embedding match is CPU work, so it stays off the event loop.
+    return await asyncio.to_thread(missing_skills_without_model, r) or {
+        'raw': await handlers['agenerate_missing_skills'](r['job_title'], r['skills']['text']), 'llm_calls': 1}
+
+
+def ats_stage(r):
+    # The JD falls back to the job title when empty.
+    return handlers['ats_score'](r['resume_text'], r['job_description'] or r['job_title'] or '')
+
+
+def interview_stage(r):
+    return handlers['generate_interview_questions'](r['job_title'], ', '.join(r['skills']['list']))
+
+
+async def ainterview_stage(r):
+    return await handlers['agenerate_interview_questions'](r['job_title'], ', '.join(r['skills']['list']))
+
+
+def project_ideas_stage(r):
+    return handlers['generate_project_ideas'](r['job_title'], r['job_description'], r['skills']['list'])
+
+
+async def aproject_ideas_stage(r):
+    return await handlers['agenerate_project_ideas'](r['job_title'], r['job_description'], r['skills']['list'])
+
+
+def job_matches_stage(r):
+    # Providers are only called when this search is new or older than
+    # JOB_QUERY_TTL_SECONDS; ranking runs over every stored posting.
+    job_ingestor, job_index = job_search()
+    found = job_ingestor.search(r['job_title'] or '', r['location'] or '', limit=0)
+    page = max(int(r['page'] or 1), 1)
+    per_page = min(max(int(r['per_page'] or JOB_FEED_PAGE_SIZE), 1), 100)
+    remote = form_flag(r['remote'])
+    candidate_skills = handlers['extract_skills'](r['resume_text'])
+    result = job_index.search(candidate_skills, role=r['job_title'], location=r['location'], remote=remote,
+                              job_type=r['job_type'], limit=per_page, offset=(page - 1) * per_page)
+    result.update(page=page, per_page=per_page, refreshed=found['refreshed'], candidate_skills=candidate_skills)
+    return result
+
+
+_job_search = None
+_job_search_lock = threading.Lock()
+
+
+def job_search():
+    """(JobIngestor, JobSearchIndex), built by the first live_job_feed request."""
+    global _job_search
+    with _job_search_lock:
+        if _job_search is None:
+            ingestor = handlers['job_ingestor']()
+            _job_search = ingestor, handlers['job_index'](ingestor.store)
+    return _job_search
+
+
+# Builders --------------------------------------------------------------
+
+def analysis_payload(r, feature):
+    result = r['ats']
+    summary = (f"Matches {len(result['matched_skills'])} of "
+               f"{len(result['matched_skills']) + len(result['missing_skills'])} "
+               f"key skills from the job description.")
+    if form_flag(r['explain']):
+        summary = handlers['ats_score_generator'](r['resume_text'], r['job_description'] or r['job_title'])
+    return {
+        'ats_score': result['ats_score'],
+        'strengths': result['matched_skills'],
+        'improvements': [
+            {'area': skill, 'score': 0, 'description': f'Add evidence of {skill} to your resume.'}
+            for skill in result['missing_skills'][:5]
+        ],
+        'matched_keywords': result['matched_keywords'],
+        'missing_keywords': result['missing_keywords'],
+        'summary': summary
+    }, 200
+
+
+def skills_feature_payload(r, feature):
+    skills, missing = r['skills'], r['missing_skills']
+    if missing['raw'] is None:
+        payload = {
+            'existing_skills': skills['list'],
+            'missing_skills': missing['by_category']['Job Description'],
+            'missing_by_category': missing['by_category'],
+        }
+    else:
+        payload = skills_payload(skills['text'], missing['raw'])
+    payload['pipeline'] = {
+        'mode': skills['mode'],
+        'llm_calls': skills['llm_calls'] + missing['llm_calls'],
+        'seconds': round(skills['seconds'] + r['timings'].get('missing_skills', 0), 3),
+    }
+    return payload, 502 if 'error' in payload else 200
+
+
+def interview_payload(r, feature):
+    questions = structured(feature.schema, r['interview_questions'])
+    if 'errors' in questions:
+        return {'error': 'Could not parse interview questions', **questions}, 502
+    skills = r['skills']['list']
+    return {
+        'questions': [
+            {'question': question, 'category': category.replace(' questions', '').replace('_', ' ')}
+            for category, items in questions.items() for question in items
+        ],
+        'questions_by_category': questions,
+        'preparation_tips': [f'Be ready to walk through a project where you used {skill}.' for skill in skills[:3]]
+        + ['Research the company.', 'Practice common questions.'],
+    }, 200
+
+
+def project_ideas_payload(r, feature):
+    raw = r['project_ideas']
+    if raw.startswith('⚠️ Error'):
+        return {'error': raw}, 502
+    # One idea per numbered block, keeping its objective/tools lines.
+    ideas = []
+    for line in raw.splitlines():
+        if _PROJECT_START.match(line):
+            ideas.append(_PROJECT_START.sub('', line).strip())
+        elif ideas and line.strip():
+            ideas[-1] += f"\n{line.strip()}"
+    return {'ideas': ideas or [raw.strip()]}, 200
+
+
+def keyword_payload(r, feature):
+    # Missing JD terms first, heaviest first: what to add to the resume.
+    result = r['ats']
+    missing = result['missing_skills'] + result['missing_keywords']
+    return {
+        'keywords': missing[:MAX_KEYWORDS],
+        'present_keywords': (result['matched_skills'] + result['matched_keywords'])[:MAX_KEYWORDS],
+        'ats_score': result['ats_score'],
+    }, 200
+
+
+def live_job_feed_payload(r, feature):
+    result = r['job_matches']
+    have = set(result['candidate_skills'])
+    matches = []
+    for job in result['jobs']:
+        required = job['requirements']
+        missing = [skill for skill in required if skill not in have]
+        matches.append({
+            'title': job['title'],
+            'company': job['company'],
+            'location': job['location'],
+            'salary_range': job['salary'],
+            'job_type': job['job_type'],
+            'remote_option': job['remote'],
+            'match_score': round(100 * (len(required) - len(missing)) / len(required)) if required else 0,
+            'description': job['description'],
+            'url': job['url'],
+            'key_requirements': required,
+            'missing_requirements': missing,
+        })
+    demand = Counter(skill for match in matches for skill in match['key_requirements'])
+    return {
+        'matches': matches,
+        'page': result['page'],
+        'per_page': result['per_page'],
+        'has_more': result['has_more'],
+        'market_insights': {
+            'jobs_found': result['total'],
+            'top_skills_demand': [skill for skill, _ in demand.most_common(5)],
+        },
+        'refreshed': result['refreshed'],
+    }, 200
+
+
+def full_report_payload(r, feature):
+    # Every part is built from the same stage results, so the skills
+    # list is extracted once for skills, interview and project ideas.
+    report = {'results': {}, 'errors': dict(r['errors']), 'timings': r['timings']}
+    for name in feature.parts:
+        part = handlers.feature(name)
+        failed = [stage for stage in part.plan if stage in r['errors']]
+        if failed:
+            report['errors'].setdefault(name, f"skipped: stage failed ({', '.join(failed)})")
+            continue
+        payload, status = handlers[part.build](r, part)
+        if status == 200:
+            report['results'][name] = payload
+        else:
+            report['errors'][name] = payload.get('error', f'status {status}')
+    return report, 200
@@ -0,0 +1,378 @@
+"""
+Registry of feature handlers, imported on first use, and the features
+/analyze_feature dispatches to.
+
+The feature modules pull in pdfplumber, NumPy and the embedding index, so
+app.py registers them here by "module:attribute" path instead of
+importing them. A worker then starts with Flask and the stores only, and
+each module is imported once, by the first request that needs it, so
+start-up cost stays flat as features are added. `warm()` imports
+everything up front for servers that preload the app before forking.
+
+Each feature is declared once (see FEATURES below): the request inputs
+it reads, the shared stages it needs, how long its payload may be
+cached, its timeout and the schema of its model output. `handlers.run`
+looks the feature up by name, runs the stages it needs as one DAG and
+hands the results to its builder, so adding a feature means adding a
+declaration, a builder and maybe a stage - the route does not change.
+
+`handlers.arun` is the same for the ASGI server (asgi.py): stages that
+call a model have coroutine twins that await the backend, and the other
+stages and the builders run on the event loop's default executor.
+"""
+import asyncio
+import importlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from files.cache import fresh, llm_cache, make_key, normalize_text
+from files.metrics import in_context, metrics
+from files.pipeline import Stage, arun_stages, run_stages
+
+
+FEATURE_TIMEOUT_SECONDS = float(os.getenv("FEATURE_TIMEOUT_SECONDS", "180"))
+FEATURE_WORKERS = int(os.getenv("FEATURE_WORKERS", "16"))
+
+# Request inputs a feature may declare, and the form_data key each is read from.
+FORM_FIELDS = {
+    "job_title": "jobTitle",
+    "job_description": "jobDescription",
+    "experience_level": "experience",
+    "location": "location",
+    "explain": "explain",
+    "page": "page",
+    "per_page": "perPage",
+    "remote": "remote",
+    "job_type": "jobType",
+    "fresh": "fresh",
+}
+# Inputs that must be whole numbers when given.
+INTEGER_INPUTS = ("page", "per_page")
+
+
+class Feature:
+    """
+    Declaration of one analyze_feature type.
+
+    `build` and each name in `stages` are registry names; `inputs` are
+    FORM_FIELDS keys and, with the resume text, form the cache key.
+    `cache_seconds` of 0 means the payload is never reused (stages still
+    use their own caches). `schema` names the files.structured_output
+    schema the feature's model output is parsed against, if any. `parts`
+    lists the features a composite feature is assembled from.
+    """
+
+    def __init__(self, name, build, inputs=(), stages=(), cache_seconds=0,
+                 timeout=FEATURE_TIMEOUT_SECONDS, schema=None, parts=()):
+        self.name = name
+        self.build = build
+        self.inputs = tuple(inputs)
+        self.stages = tuple(stages)
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        self.schema = schema
+        self.parts = tuple(parts)
+        self.plan = ()
+
+    def to_dict(self):
+        return {
+            "inputs": list(self.inputs),
+            "stages": list(self.plan),
+            "cache_seconds": self.cache_seconds,
+            "timeout": self.timeout,
+            "schema": self.schema,
+        }
+
+
+class FeatureRegistry:
+    """
+    Name -> "module:attribute", resolved and cached on first lookup, plus
+    the shared stages and the feature declarations built on them.
+    """
+
+    def __init__(self):
+        self._targets = {}
+        self._resolved = {}
+        self._import_seconds = {}
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._features = {}
+        self._pool = None
+
+    def register(self, name, target):
+        if ":" not in target:
+            raise ValueError(f"Handler target must be 'module:attribute', got {target!r}")
+        self._targets[name] = target
+
+    def __contains__(self, name):
+        return name in self._targets
+
+    def __getitem__(self, name):
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        if name not in self._targets:
+            raise KeyError(f"Unknown feature handler: {name}")
+        with self._lock:
+            if name not in self._resolved:
+                module_name, attribute = self._targets[name].split(":", 1)
+                start = time.perf_counter()
+                module = importlib.import_module(module_name)
+                self._import_seconds.setdefault(module_name, round(time.perf_counter() - start, 4))
+                self._resolved[name] = getattr(module, attribute)
+        return self._resolved[name]
+
+    def names(self):
+        return sorted(self._targets)
+
+    def register_stage(self, name, target, deps=(), async_target=None):
+        """
+        A shared stage: fn(results) -> output, run after `deps`.
+        `async_target` is a coroutine function doing the same for arun.
+        """
+        self.register(f"stage:{name}", target)
+        if async_target:
+            self.register(f"astage:{name}", async_target)
+        self._stages[name] = tuple(deps)
+
+    def register_feature(self, feature):
+        for part in feature.parts:
+            feature.stages += self._features[part].stages
+            feature.inputs += self._features[part].inputs
+        feature.inputs = tuple(dict.fromkeys(feature.inputs))
+        # The transitive stage closure, in dependency order, is fixed at
+        # registration so a request only does a dict lookup.
+        plan = []
+
+        def visit(stage):
+            if stage not in plan:
+                for dep in self._stages[stage]:
+                    visit(dep)
+                plan.append(stage)
+
+        for stage in feature.stages:
+            visit(stage)
+        feature.plan = tuple(plan)
+        self._features[feature.name] = feature
+
+    def feature(self, name):
+        return self._features.get(name)
+
+    def features(self):
+        return {name: feature.to_dict() for name, feature in self._features.items()}
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=FEATURE_WORKERS)
+            return self._pool
+
+    def _execute(self, feature, inputs):
+        stages = [Stage(name, self[f"stage:{name}"], self._stages[name]) for name in feature.plan]
+        run = run_stages(stages, inputs)
+        if feature.parts:
+            results = dict(inputs, **run["results"], errors=run["errors"], timings=run["timings"])
+            return self[feature.build](results, feature)
+        if run["errors"]:
+            return {"error": f"{feature.name} failed", "details": run["errors"]}, 502
+        return self[feature.build](dict(inputs, **run["results"], timings=run["timings"]), feature)
+
+    async def _aexecute(self, feature, inputs):
+        stages = [Stage(name, self[f"astage:{name}"] if f"astage:{name}" in self else self[f"stage:{name}"],
+                        self._stages[name]) for name in feature.plan]
+        run = await arun_stages(stages, inputs)
+        build = self[feature.build]
+        if feature.parts:
+            results = dict(inputs, **run["results"], errors=run["errors"], timings=run["timings"])
+            return await asyncio.to_thread(build, results, feature)
+        if run["errors"]:
+            return {"error": f"{feature.name} failed", "details": run["errors"]}, 502
+        return await asyncio.to_thread(build, dict(inputs, **run["results"], timings=run["timings"]), feature)
+
+    def run(self, name, resume_text, form_data=None, pipeline_mode=None):
+        """Run the feature `name` for a resume and return (payload, status)."""
+        feature = self._features.get(name)
+        if feature is None:
+            return {"error": "Unknown feature type"}, 400
+        invalid = self._invalid(feature, form_data)
+        if invalid:
+            return {"error": invalid}, 400
+        start = time.perf_counter()
+        payload, status = self._run(feature, resume_text, form_data, pipeline_mode)
+        metrics.observe("feature_seconds", time.perf_counter() - start, feature=name, status=status)
+        return payload, status
+
+    async def arun(self, name, resume_text, form_data=None, pipeline_mode=None):
+        """`run` for callers on an event loop; nothing here blocks the loop on a model call."""
+        feature = self._features.get(name)
+        if feature is None:
+            return {"error": "Unknown feature type"}, 400
+        invalid = self._invalid(feature, form_data)
+        if invalid:
+            return {"error": invalid}, 400
+        start = time.perf_counter()
+        payload, status = await self._arun(feature, resume_text, form_data, pipeline_mode)
+        metrics.observe("feature_seconds", time.perf_counter() - start, feature=name, status=status)
+        return payload, status
+
+    def _invalid(self, feature, form_data):
+        """Error message for a malformed input the feature reads, else None."""
+        for name in INTEGER_INPUTS:
+            value = (form_data or {}).get(FORM_FIELDS[name])
+            if name in feature.inputs and value not in (None, ""):
+                try:
+                    int(value)
+                except (TypeError, ValueError):
+                    return f"{FORM_FIELDS[name]} must be an integer"
+        return None
+
+    def _inputs(self, feature, resume_text, form_data, pipeline_mode):
+        """(stage inputs, fresh requested, payload cache key or None)."""
+        form_data = form_data or {}
+        inputs = {key: form_data.get(field) for key, field in FORM_FIELDS.items()}
+        inputs.update(resume_text=resume_text, pipeline_mode=pipeline_mode)
+
+        # form_data "fresh" asks for newly generated output: no payload
+        # cache and no near-duplicate responses.
+        want_fresh = str(inputs["fresh"] or "").lower() in ("1", "true", "yes")
+        key = None
+        if feature.cache_seconds and not want_fresh:
+            key = make_key(feature.name, normalize_text(resume_text), pipeline_mode,
+                           *[normalize_text(inputs[k]) for k in feature.inputs])
+        return inputs, want_fresh, key
+
+    def _cached_payload(self, feature, key):
+        cached = llm_cache.get(f"feature:{feature.name}", key) if key else None
+        if cached is not None:
+            entry = json.loads(cached)
+            if time.time() - entry["at"] <= feature.cache_seconds:
+                return entry["payload"]
+        return None
+
+    def _store_payload(self, feature, key, payload, status):
+        if key and status == 200:
+            llm_cache.set(f"feature:{feature.name}", key, json.dumps({"at": time.time(), "payload": payload}))
+
+    def _run(self, feature, resume_text, form_data, pipeline_mode):
+        inputs, want_fresh, key = self._inputs(feature, resume_text, form_data, pipeline_mode)
+        cached = self._cached_payload(feature, key)
+        if cached is not None:
+            return cached, 200
+
+        with fresh(want_fresh):
+            future = self._get_pool().submit(in_context(self._execute), feature, inputs)
+        try:
+            payload, status = future.result(timeout=feature.timeout)
+        except FutureTimeout:
+            return {"error": f"{feature.name} timed out after {feature.timeout:g}s"}, 504
+        self._store_payload(feature, key, payload, status)
+        return payload, status
+
+    async def _arun(self, feature, resume_text, form_data, pipeline_mode):
+        inputs, want_fresh, key = self._inputs(feature, resume_text, form_data, pipeline_mode)
+        cached = self._cached_payload(feature, key)
+        if cached is not None:
+            return cached, 200
+
+        with fresh(want_fresh):
+            try:
+                payload, status = await asyncio.wait_for(self._aexecute(feature, inputs), feature.timeout)
+            except asyncio.TimeoutError:
+                return {"error": f"{feature.name} timed out after {feature.timeout:g}s"}, 504
+        self._store_payload(feature, key, payload, status)
+        return payload, status
+
+    def warm(self, names=None):
+        """Resolve `names` (default: all) now instead of on first use."""
+        for name in names or self._targets:
+            self[name]
+
+    def stats(self):
+        return {
+            "registered": len(self._targets),
+            "loaded": sorted(self._resolved),
+            "import_seconds": dict(self._import_seconds),
+        }
+
+
+handlers = FeatureRegistry()
+
+for _name, _target in {
+    "resume_skills": "files.missing_skills:resume_skills",
+    "generate_missing_skills": "files.missing_skills:generate_missing_skills",
+    "agenerate_missing_skills": "files.missing_skills:agenerate_missing_skills",
+    "compare_missing_skills": "files.missing_skills:compare_missing_skills",
+    "known_missing_skills": "files.missing_skills:known_missing_skills",
+    "local_missing_skills": "files.missing_skills:local_missing_skills",
+    "missing_skills_messages": "files.missing_skills:missing_skills_messages",
+    "skills_model": "files.missing_skills:MODEL",
+    "generate_interview_questions": "files.interview_prep:generate_interview_questions",
+    "agenerate_interview_questions": "files.interview_prep:agenerate_interview_questions",
+    "interview_questions_messages": "files.interview_prep:interview_questions_messages",
+    "interview_model": "files.interview_prep:MODEL",
+    "ats_score": "files.ATS_score:ats_score",
+    "ats_score_generator": "files.ATS_score:ats_score_generator",
+    "ats_score_messages": "files.ATS_score:ats_score_messages",
+    "ats_model": "files.ATS_score:MODEL",
+    "generate_project_ideas": "files.project_ideas:generate_project_ideas",
+    "agenerate_project_ideas": "files.project_ideas:agenerate_project_ideas",
+    "project_ideas_messages": "files.project_ideas:project_ideas_messages",
+    "project_ideas_model": "files.project_ideas:MODEL",
+    "extract_with_cache": "files.upload_cache:extract_with_cache",
+    "aextract_with_cache": "files.upload_cache:aextract_with_cache",
+    "pdf_rejected": "files.pdf_extract:PDFRejected",
+    "upload_stats": "files.upload_cache:stats",
+    "run_bulk": "files.bulk:run_bulk",
+    "job_ingestor": "files.job_listings:JobIngestor",
+    "job_index": "files.job_index:JobSearchIndex",
+    "extract_skills": "files.skill_terms:extract_skills",
+    "semantic_cache_stats": "files.semantic_cache:stats",
+}.items():
+    handlers.register(_name, _target)
+
+
+for _name, _target, _deps, _async_target in (
+    ("skills", "files.feature_handlers:skills_stage", (), None),
+    ("missing_skills", "files.feature_handlers:missing_skills_stage", ("skills",),
+     "files.feature_handlers:amissing_skills_stage"),
+    ("ats", "files.feature_handlers:ats_stage", (), None),
+    ("interview_questions", "files.feature_handlers:interview_stage", ("skills",),
+     "files.feature_handlers:ainterview_stage"),
+    ("project_ideas", "files.feature_handlers:project_ideas_stage", ("skills",),
+     "files.feature_handlers:aproject_ideas_stage"),
+    ("job_matches", "files.feature_handlers:job_matches_stage", (), None),
+):
+    handlers.register_stage(_name, _target, _deps, _async_target)
+
+for _name in ("analysis_payload", "skills_feature_payload", "interview_payload", "project_ideas_payload",
+              "keyword_payload", "live_job_feed_payload", "full_report_payload", "skills_payload", "structured",
+              "missing_skills_without_model", "form_flag"):
+    handlers.register(_name, f"files.feature_handlers:{_name}")
+
+FEATURES = [
+    Feature("analysis", "analysis_payload", inputs=("job_title", "job_description", "explain"),
+            stages=("ats",), cache_seconds=3600, timeout=60),
+    Feature("skills", "skills_feature_payload", inputs=("job_title", "job_description"),
+            stages=("skills", "missing_skills"), schema="missing_skills"),
+    # Not payload-cached: the prompt asks for variety, so near-duplicate
+    # requests rotate through several stored question sets instead.
+    Feature("interview", "interview_payload", inputs=("job_title",),
+            stages=("skills", "interview_questions"), schema="interview"),
+    Feature("project_ideas", "project_ideas_payload", inputs=("job_title", "job_description"),
+            stages=("skills", "project_ideas")),
+    Feature("keyword_optimizer", "keyword_payload", inputs=("job_title", "job_description"),
+            stages=("ats",), cache_seconds=3600, timeout=60),
+    # The job store has its own freshness window, so payloads are not cached.
+    Feature("live_job_feed", "live_job_feed_payload",
+            inputs=("job_title", "location", "page", "per_page", "remote", "job_type"),
+            stages=("job_matches",), timeout=60),
+]
+for _feature in FEATURES:
+    handlers.register_feature(_feature)
+handlers.register_feature(Feature("full_report", "full_report_payload",
+                                  parts=("analysis", "skills", "interview", "project_ideas", "keyword_optimizer")))
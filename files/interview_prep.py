@@ -1,9 +1,13 @@
-from huggingface_hub import InferenceClient
+from files.llm_backend import get_backend
+from files.metrics import timed
+from files.prompt_budget import compact_prompt
+from files.semantic_cache import SEMANTIC_CACHE_VARIANTS, semantic_cached
+from files.single_flight import single_flight
 
+MODEL = "meta-llama/Llama-3.3-70B-Instruct"
+INTERVIEW_PROMPT_VERSION = "2"
 
-client = InferenceClient()
-
-def generate_interview_questions(role, skills):
+def interview_questions_messages(role, skills):
 
     combined_prompt = """
 You are an expert AI interview question generator. Based on the given job role and technical skills, generate relevant interview questions in four categories.
@@ -38,17 +42,43 @@ Important:
 """
 
 
-    messages = [
-        {"role": "user", "content": combined_prompt}
+    combined_prompt += f"""
+Job Role: {role or 'not provided'}
+Technical Skills: {skills or 'not provided'}
+"""
+
+    return [
+        {"role": "user", "content": compact_prompt(combined_prompt)}
     ]
 
+
+@timed("generate.interview")
+# The prompt asks for different questions each time, so near-duplicate
+# roles rotate through a few stored sets instead of reusing one.
+@semantic_cached("interview", MODEL, INTERVIEW_PROMPT_VERSION, variants=SEMANTIC_CACHE_VARIANTS)
+@single_flight("interview")
+def generate_interview_questions(role, skills):
+    messages = interview_questions_messages(role, skills)
+
     try:
-        response = client.chat_completion(
+        response = get_backend().chat(
             messages=messages,
-            model="meta-llama/Llama-3.3-70B-Instruct"
+            model=MODEL
         )
 
-        return f"{response.choices[0].message.content}"  
+        return f"{response}"  
+    except Exception as e:
+        return f"⚠️ Error generating response: {str(e)}"
+
+
+@timed("generate.interview")
+@semantic_cached("interview", MODEL, INTERVIEW_PROMPT_VERSION, variants=SEMANTIC_CACHE_VARIANTS)
+@single_flight("interview")
+async def agenerate_interview_questions(role, skills):
+    """generate_interview_questions on the event loop, sharing its caches."""
+    try:
+        response = await get_backend().achat(messages=interview_questions_messages(role, skills), model=MODEL)
+        return f"{response}"
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
 
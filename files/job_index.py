@@ -0,0 +1,157 @@
+import re
+import threading
+
+import numpy as np
+
+
+# BM25 parameters. Every indexed term occurs at most once per posting, so
+# the term-frequency part reduces to a per-posting length factor.
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Role words matched in a title count this many times a required skill.
+TITLE_WEIGHT = 2.0
+
+TITLE_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+class JobSearchIndex:
+    """
+    In-memory BM25 inverted index over the postings in a JobStore.
+
+    Terms are the words of each title and the canonical skills its
+    requirements list. Postings lists are NumPy arrays, so scoring a query
+    is one weighted bincount over the lists of its terms, and filters are
+    boolean masks over per-posting columns. The index follows the store by
+    rowid: new postings are appended on the next search, and a prune in
+    the store (`generation` change) triggers a full rebuild.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._generation = None
+        self._reset()
+
+    def _reset(self):
+        self._max_rowid = 0
+        self._rowids = np.zeros(0, dtype=np.int64)
+        self._remote = np.zeros(0, dtype=bool)
+        self._type_codes = np.zeros(0, dtype=np.int32)
+        self._location_codes = np.zeros(0, dtype=np.int32)
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._terms = {}
+        self._job_types = {}
+        self._locations = {}
+        self._postings = []
+        self._location_masks = {}
+
+    def _code(self, table, value):
+        value = (value or "").strip().lower()
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    def _sync(self):
+        if self._generation != self.store.generation:
+            self._reset()
+            self._generation = self.store.generation
+        rows = self.store.rows_after(self._max_rowid)
+        if not rows:
+            return
+        start = len(self._rowids)
+        pending = {}
+        rowids, remote, type_codes, location_codes, lengths = [], [], [], [], []
+        for offset, (rowid, title, requirements, location, is_remote, job_type) in enumerate(rows):
+            doc = start + offset
+            terms = {f"t:{word}" for word in TITLE_TOKEN_RE.findall((title or "").lower())}
+            terms.update(f"s:{skill}" for skill in (requirements or "").split("|") if skill)
+            for term in terms:
+                pending.setdefault(term, []).append(doc)
+            rowids.append(rowid)
+            remote.append(bool(is_remote))
+            type_codes.append(self._code(self._job_types, job_type))
+            location_codes.append(self._code(self._locations, location))
+            lengths.append(len(terms))
+
+        for term, docs in pending.items():
+            term_id = self._terms.get(term)
+            if term_id is None:
+                self._terms[term] = len(self._postings)
+                self._postings.append(np.array(docs, dtype=np.int32))
+            else:
+                self._postings[term_id] = np.concatenate([self._postings[term_id], np.array(docs, dtype=np.int32)])
+        self._rowids = np.concatenate([self._rowids, np.array(rowids, dtype=np.int64)])
+        self._remote = np.concatenate([self._remote, np.array(remote, dtype=bool)])
+        self._type_codes = np.concatenate([self._type_codes, np.array(type_codes, dtype=np.int32)])
+        self._location_codes = np.concatenate([self._location_codes, np.array(location_codes, dtype=np.int32)])
+        self._lengths = np.concatenate([self._lengths, np.array(lengths, dtype=np.float32)])
+        self._max_rowid = rows[-1][0]
+        self._location_masks = {}
+
+    def _location_mask(self, location):
+        # Substring match over the distinct location strings, not rows.
+        key = location.strip().lower()
+        if key not in self._location_masks:
+            codes = [code for name, code in self._locations.items() if key in name]
+            self._location_masks[key] = np.isin(self._location_codes, codes)
+        return self._location_masks[key]
+
+    def __len__(self):
+        return len(self._rowids)
+
+    def search(self, skills, role=None, location=None, remote=None, job_type=None, limit=20, offset=0):
+        """
+        Rank postings against a resume's skills (and optional role words
+        in the title) by BM25. `location` keeps postings in that place or
+        remote ones; `remote` and `job_type` filter exactly. Returns
+        {"jobs", "has_more", "total"}, one page of stored postings each
+        with its `score`.
+        """
+        with self._lock:
+            self._sync()
+            n = len(self._rowids)
+            query = [(f"s:{skill.lower()}", 1.0) for skill in skills]
+            query += [(f"t:{word}", TITLE_WEIGHT) for word in TITLE_TOKEN_RE.findall((role or "").lower())]
+            lists, weights = [], []
+            for term, weight in dict(query).items():
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    continue
+                docs = self._postings[term_id]
+                idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                lists.append(docs)
+                weights.append(np.full(len(docs), weight * idf, dtype=np.float32))
+            if not lists:
+                return {"jobs": [], "has_more": False, "total": 0}
+
+            scores = np.bincount(np.concatenate(lists), weights=np.concatenate(weights), minlength=n)
+            average = self._lengths.mean()
+            scores *= (BM25_K1 + 1) / (1 + BM25_K1 * (1 - BM25_B + BM25_B * self._lengths / average))
+
+            mask = scores > 0
+            if remote is not None:
+                mask &= self._remote == bool(remote)
+            if job_type:
+                code = self._job_types.get(job_type.strip().lower())
+                mask &= self._type_codes == (code if code is not None else -1)
+            if location:
+                mask &= self._location_mask(location) | self._remote
+            candidates = np.flatnonzero(mask)
+
+            wanted = min(offset + limit + 1, len(candidates))
+            if wanted < len(candidates):
+                top = candidates[np.argpartition(-scores[candidates], wanted - 1)[:wanted]]
+            else:
+                top = candidates
+            top = top[np.lexsort((self._rowids[top], -scores[top]))]
+            page = top[offset:offset + limit]
+            page_rowids = [int(r) for r in self._rowids[page]]
+            page_scores = {int(self._rowids[d]): float(scores[d]) for d in page}
+
+        found = self.store.get_rows(page_rowids)
+        jobs = []
+        for rowid in page_rowids:
+            if rowid in found:
+                found[rowid]["score"] = round(page_scores[rowid], 3)
+                jobs.append(found[rowid])
+        return {"jobs": jobs, "has_more": len(top) > offset + limit, "total": int(len(candidates))}
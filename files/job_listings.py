@@ -0,0 +1,333 @@
+"""
+Job listing ingestion from SerpAPI (Google Jobs) and Jooble.
+
+Searches are fetched concurrently across providers and pages over pooled
+HTTP sessions, normalized into JobRecord, deduplicated and stored in
+files.job_store. A search is served from the store while it is fresh
+(JOB_QUERY_TTL_SECONDS); after that it is refreshed incrementally, page
+by page, stopping once a page brings no unseen postings.
+
+Fetch from the repository root:
+    python -m files.job_listings "Data Scientist" --location India
+
+Point SERPAPI_URL / JOOBLE_URL at `python -m benchmarks.fake_job_server`
+to run without API keys or network access.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from files.job_store import JobStore
+
+
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
+SERPAPI_API_KEY = os.getenv("serpapi_api_key") or os.getenv("SERPAPI_API_KEY")
+JOOBLE_URL = os.getenv("JOOBLE_URL", "https://jooble.org/api")
+JOOBLE_API_KEY = os.getenv("jobble_api_key") or os.getenv("JOOBLE_API_KEY")
+
+JOB_FETCH_WORKERS = int(os.getenv("JOB_FETCH_WORKERS", "8"))
+JOB_FETCH_TIMEOUT = float(os.getenv("JOB_FETCH_TIMEOUT_SECONDS", "15"))
+JOB_MAX_PAGES = int(os.getenv("JOB_MAX_PAGES", "3"))
+JOOBLE_PAGE_SIZE = 20
+
+TRACKING_PARAMS = re.compile(r"^(utm_.*|ref|refid|src|source|trk|tracking.*|fbclid|gclid|from)$", re.I)
+REMOTE_RE = re.compile(r"\b(remote|work from home|wfh|anywhere)\b", re.I)
+
+
+def canonical_url(url):
+    """Lowercased scheme/host, no fragment, tracking params or trailing slash."""
+    if not url or url == "#":
+        return ""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not TRACKING_PARAMS.match(k)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+
+def _norm(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+class JobRecord:
+    """
+    One job posting in provider-independent form. `job_id` hashes title,
+    company and location, so the same posting from two providers or under
+    two tracking URLs collapses to one record; `url_key` is kept for
+    dedupe within a batch when titles differ only cosmetically.
+    """
+
+    def __init__(self, source, title, company="", location="", description="", url="",
+                 remote=False, job_type=None, salary=None, posted_at=None, extra=None):
+        self.source = source
+        self.title = (title or "").strip()
+        self.company = (company or "").strip()
+        self.location = (location or "").strip()
+        self.description = description or ""
+        self.url = canonical_url(url) or None
+        self.remote = bool(remote) or bool(REMOTE_RE.search(f"{self.title} {self.location}"))
+        self.job_type = job_type
+        self.salary = salary
+        self.posted_at = posted_at
+        self.extra = extra or {}
+        identity = "|".join(_norm(part) for part in (self.title, self.company, self.location))
+        self.job_id = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:24]
+        self.url_key = hashlib.sha256(self.url.encode("utf-8")).hexdigest()[:24] if self.url else None
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "source": self.source,
+            "title": self.title,
+            "company": self.company,
+            "location": self.location,
+            "description": self.description,
+            "url": self.url,
+            "remote": self.remote,
+            "job_type": self.job_type,
+            "salary": self.salary,
+            "posted_at": self.posted_at,
+        }
+
+
+def dedupe(records):
+    """Drop repeats by job_id or canonical URL, keeping the longest description."""
+    by_id, by_url = {}, {}
+    for record in records:
+        existing = by_id.get(record.job_id) or (by_url.get(record.url_key) if record.url_key else None)
+        if existing is None:
+            by_id[record.job_id] = record
+            if record.url_key:
+                by_url[record.url_key] = record
+        elif len(record.description) > len(existing.description):
+            existing.description = record.description
+    return list(by_id.values())
+
+
+class JobProvider:
+    """
+    Base class for job search APIs. `fetch_page` returns (records, next)
+    where `next` is the cursor for the following page or None. Providers
+    with numbered pages set `numbered_pages` so pages can be requested
+    concurrently instead of following cursors one by one.
+    """
+
+    name = "base"
+    numbered_pages = False
+
+    def __init__(self, session_factory):
+        self._session_factory = session_factory
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # One pooled session per worker thread: requests.Session is not
+        # guaranteed thread-safe, but keep-alive connections are reused
+        # across every page that thread fetches.
+        if getattr(self._local, "session", None) is None:
+            self._local.session = self._session_factory()
+        return self._local.session
+
+    def enabled(self):
+        return True
+
+    def first_cursor(self):
+        return 1
+
+    def fetch_page(self, role, location, cursor):
+        raise NotImplementedError
+
+
+class SerpApiProvider(JobProvider):
+    """Google Jobs through SerpAPI; pages follow `next_page_token`."""
+
+    name = "serpapi"
+
+    def __init__(self, session_factory, url=SERPAPI_URL, api_key=SERPAPI_API_KEY):
+        super().__init__(session_factory)
+        self.url = url
+        self.api_key = api_key
+
+    def enabled(self):
+        return bool(self.api_key) or self.url != "https://serpapi.com/search"
+
+    def first_cursor(self):
+        return ""
+
+    def fetch_page(self, role, location, cursor):
+        params = {"engine": "google_jobs", "q": f"{role} jobs {location}".strip(), "hl": "en",
+                  "api_key": self.api_key or ""}
+        if cursor:
+            params["next_page_token"] = cursor
+        response = self.session.get(self.url, params=params, timeout=JOB_FETCH_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        records = []
+        for job in data.get("jobs_results", []):
+            ext = job.get("detected_extensions") or {}
+            link = job.get("share_link") or (job.get("apply_options") or [{}])[0].get("link")
+            records.append(JobRecord(
+                self.name, job.get("title"), job.get("company_name"), job.get("location"),
+                job.get("description"), link,
+                remote=ext.get("work_from_home"), job_type=ext.get("schedule_type"),
+                salary=ext.get("salary"), posted_at=ext.get("posted_at"),
+                extra={"highlights": job.get("job_highlights") or []},
+            ))
+        token = (data.get("serpapi_pagination") or {}).get("next_page_token")
+        return records, token
+
+
+class JoobleProvider(JobProvider):
+    """Jooble REST API; numbered pages."""
+
+    name = "jooble"
+    numbered_pages = True
+
+    def __init__(self, session_factory, url=JOOBLE_URL, api_key=JOOBLE_API_KEY):
+        super().__init__(session_factory)
+        self.url = url
+        self.api_key = api_key
+
+    def enabled(self):
+        return bool(self.api_key) or self.url != "https://jooble.org/api"
+
+    def fetch_page(self, role, location, cursor):
+        payload = {"keywords": role, "location": location or "", "page": cursor,
+                   "ResultOnPage": JOOBLE_PAGE_SIZE}
+        response = self.session.post(f"{self.url.rstrip('/')}/{self.api_key or 'key'}", json=payload,
+                                     timeout=JOB_FETCH_TIMEOUT)
+        response.raise_for_status()
+        jobs = response.json().get("jobs", [])
+        records = [
+            JobRecord(self.name, job.get("title"), job.get("company"), job.get("location"),
+                      " ".join(re.sub(r"<[^>]+>", " ", job.get("snippet") or "").split()), job.get("link"),
+                      job_type=job.get("type") or None, salary=job.get("salary") or None,
+                      posted_at=job.get("updated"))
+            for job in jobs
+        ]
+        return records, cursor + 1 if len(jobs) >= JOOBLE_PAGE_SIZE else None
+
+
+def pooled_session(pool_size=JOB_FETCH_WORKERS, retries=2):
+    """requests.Session with keep-alive pooling and retries on 429/5xx."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=Retry(
+        total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,
+    ))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class JobIngestor:
+    """
+    Serve job searches from the store and refresh them from the providers.
+
+    A first fetch requests up to `max_pages` pages per provider at once
+    (numbered-page providers in parallel, cursor providers as their
+    cursors arrive). Refreshing a stale search walks pages in order and
+    stops a provider as soon as a page contains nothing new.
+    """
+
+    def __init__(self, store=None, providers=None, workers=JOB_FETCH_WORKERS, max_pages=JOB_MAX_PAGES):
+        self.store = store or JobStore()
+        self.providers = providers if providers is not None else [
+            SerpApiProvider(pooled_session), JoobleProvider(pooled_session),
+        ]
+        self.workers = workers
+        self.max_pages = max_pages
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def refresh(self, role, location="", incremental=None):
+        """
+        Fetch a search from every enabled provider and store the results.
+        Returns {"fetched", "new", "pages", "errors"}.
+        """
+        providers = [p for p in self.providers if p.enabled()]
+        if incremental is None:
+            incremental = self.store.query_status(role, location)[0] is not None
+        pool = self._get_pool()
+        pending = {}
+
+        def submit(provider, cursor, page):
+            future = pool.submit(provider.fetch_page, role, location, cursor)
+            pending[future] = (provider, cursor, page)
+
+        for provider in providers:
+            if provider.numbered_pages and not incremental:
+                for page in range(1, self.max_pages + 1):
+                    submit(provider, page, page)
+            else:
+                submit(provider, provider.first_cursor(), 1)
+
+        records, errors, pages, new = [], [], 0, set()
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, cursor, page = pending.pop(future)
+                try:
+                    page_records, next_cursor = future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name} page {page}: {e}")
+                    continue
+                pages += 1
+                unseen = {r.job_id for r in page_records} - self.store.known_ids(r.job_id for r in page_records)
+                new |= unseen
+                records.extend(page_records)
+                follow = next_cursor is not None and page < self.max_pages
+                if provider.numbered_pages and not incremental:
+                    follow = False
+                if follow and (unseen or not incremental):
+                    submit(provider, next_cursor, page + 1)
+
+        records = dedupe(records)
+        if records or not errors:
+            self.store.save_query(role, location, records)
+        return {"fetched": len(records), "new": len(new), "pages": pages, "errors": errors}
+
+    def search(self, role, location="", limit=20, offset=0):
+        """Stored postings for a search, refreshing it first when stale."""
+        refreshed = None
+        if not self.store.query_status(role, location)[1]:
+            refreshed = self.refresh(role, location)
+        return {
+            "jobs": self.store.jobs_for_query(role, location, limit, offset),
+            "refreshed": refreshed,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch and cache job listings")
+    parser.add_argument("role")
+    parser.add_argument("--location", default="")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--refresh", action="store_true", help="fetch even if the cached search is fresh")
+    args = parser.parse_args()
+
+    ingestor = JobIngestor()
+    if args.refresh:
+        print(json.dumps(ingestor.refresh(args.role, args.location)))
+    result = ingestor.search(args.role, args.location, args.limit)
+    if result["refreshed"]:
+        print(json.dumps(result["refreshed"]))
+    for job in result["jobs"]:
+        print(f"{job['title']} - {job['company']} ({job['location']}) {job['url'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
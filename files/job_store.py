@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from files.skill_terms import extract_skills
+
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join("cache", "jobs.sqlite3"))
+JOB_QUERY_TTL_SECONDS = int(os.getenv("JOB_QUERY_TTL_SECONDS", str(6 * 3600)))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(30 * 24 * 3600)))
+
+JOB_COLUMNS = ("job_id", "source", "title", "company", "location", "description", "url",
+               "remote", "job_type", "salary", "posted_at")
+
+
+def requirements_text(title, description):
+    """Canonical skills a posting asks for, "|"-separated."""
+    return "|".join(extract_skills(f"{title}\n{description}"))
+
+
+def query_key(role, location):
+    return f"{' '.join((role or '').lower().split())}|{' '.join((location or '').lower().split())}"
+
+
+class JobStore:
+    """
+    SQLite store for normalized job postings and the searches that found
+    them. Postings are upserted by job_id, so the same job seen by several
+    searches or providers is stored once. Each (role, location) search
+    remembers when it was last fetched; it is fresh for `ttl` seconds.
+
+    The indexed fields of a posting (title, requirements, location,
+    remote, job_type) never change after insert, so search indexes can
+    follow the store by rowid and only rebuild when `generation` changes
+    (rows were pruned).
+    """
+
+    def __init__(self, path=JOBS_DB_PATH, ttl=JOB_QUERY_TTL_SECONDS, retention=JOB_RETENTION_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.retention = retention
+        self._conn = None
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    company TEXT,
+                    location TEXT,
+                    description TEXT,
+                    url TEXT,
+                    remote INTEGER NOT NULL DEFAULT 0,
+                    job_type TEXT,
+                    salary TEXT,
+                    posted_at TEXT,
+                    extra TEXT,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    requirements TEXT
+                );
+                CREATE INDEX IF NOT EXISTS jobs_last_seen ON jobs (last_seen);
+                CREATE TABLE IF NOT EXISTS job_queries (
+                    query_key TEXT PRIMARY KEY,
+                    role TEXT,
+                    location TEXT,
+                    fetched_at REAL NOT NULL,
+                    job_count INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS query_jobs (
+                    query_key TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    PRIMARY KEY (query_key, job_id)
+                );
+            """)
+            self._migrate(self._conn)
+        return self._conn
+
+    def _migrate(self, conn):
+        # Stores written before requirements were extracted get them once.
+        if "requirements" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN requirements TEXT")
+        rows = conn.execute("SELECT rowid, title, description FROM jobs WHERE requirements IS NULL").fetchall()
+        if rows:
+            conn.executemany("UPDATE jobs SET requirements = ? WHERE rowid = ?",
+                             [(requirements_text(title, description), rowid) for rowid, title, description in rows])
+            conn.commit()
+
+    def query_status(self, role, location):
+        """(fetched_at, is_fresh) for a search, or (None, False) if never run."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT fetched_at FROM job_queries WHERE query_key = ?", (query_key(role, location),)
+            ).fetchone()
+        if row is None:
+            return None, False
+        return row[0], time.time() - row[0] <= self.ttl
+
+    def known_ids(self, job_ids):
+        """Subset of `job_ids` already stored."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return set()
+        with self._lock:
+            conn = self._connect()
+            found = set()
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                found.update(row[0] for row in conn.execute(
+                    f"SELECT job_id FROM jobs WHERE job_id IN ({','.join('?' * len(chunk))})", chunk
+                ))
+        return found
+
+    def save_query(self, role, location, records):
+        """Upsert `records` and link them to the (role, location) search."""
+        now = time.time()
+        key = query_key(role, location)
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("""
+                INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    url = coalesce(jobs.url, excluded.url),
+                    salary = coalesce(excluded.salary, jobs.salary),
+                    last_seen = excluded.last_seen
+            """, [
+                (r.job_id, r.source, r.title, r.company, r.location, r.description, r.url,
+                 int(r.remote), r.job_type, r.salary, r.posted_at, json.dumps(r.extra), now, now,
+                 requirements_text(r.title, r.description))
+                for r in records
+            ])
+            conn.executemany("INSERT OR IGNORE INTO query_jobs VALUES (?, ?)",
+                             [(key, r.job_id) for r in records])
+            count = conn.execute("SELECT count(*) FROM query_jobs WHERE query_key = ?", (key,)).fetchone()[0]
+            conn.execute("INSERT OR REPLACE INTO job_queries VALUES (?, ?, ?, ?, ?)",
+                         (key, role, location, now, count))
+            self._prune(conn, now)
+            conn.commit()
+
+    def _prune(self, conn, now):
+        cutoff = now - self.retention
+        conn.execute("DELETE FROM query_jobs WHERE job_id IN (SELECT job_id FROM jobs WHERE last_seen < ?)",
+                     (cutoff,))
+        if conn.execute("DELETE FROM jobs WHERE last_seen < ?", (cutoff,)).rowcount:
+            self.generation += 1
+
+    def jobs_for_query(self, role, location, limit=50, offset=0):
+        """Stored postings for a search, most recently seen first."""
+        with self._lock:
+            rows = self._connect().execute(f"""
+                SELECT {', '.join('j.' + c for c in JOB_COLUMNS)}, j.extra FROM query_jobs q
+                JOIN jobs j ON j.job_id = q.job_id
+                WHERE q.query_key = ?
+                ORDER BY j.last_seen DESC, j.first_seen DESC
+                LIMIT ? OFFSET ?
+            """, (query_key(role, location), limit, offset)).fetchall()
+        return [_row_dict(row) for row in rows]
+
+    def rows_after(self, rowid):
+        """(rowid, title, requirements, location, remote, job_type) past `rowid`."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT rowid, title, requirements, location, remote, job_type FROM jobs "
+                "WHERE rowid > ? ORDER BY rowid", (rowid,)
+            ).fetchall()
+
+    def get_rows(self, rowids):
+        """{rowid: posting} for the given rowids that still exist."""
+        if not rowids:
+            return {}
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT rowid, {', '.join(JOB_COLUMNS)}, extra, requirements FROM jobs "
+                f"WHERE rowid IN ({','.join('?' * len(rowids))})", list(rowids)
+            ).fetchall()
+        by_rowid = {}
+        for row in rows:
+            job = _row_dict(row[1:-1])
+            job["requirements"] = row[-1].split("|") if row[-1] else []
+            by_rowid[row[0]] = job
+        return by_rowid
+
+    def stats(self):
+        with self._lock:
+            conn = self._connect()
+            return {
+                "jobs": conn.execute("SELECT count(*) FROM jobs").fetchone()[0],
+                "queries": conn.execute("SELECT count(*) FROM job_queries").fetchone()[0],
+            }
+
+
+def _row_dict(row):
+    job = dict(zip(JOB_COLUMNS, row))
+    job["remote"] = bool(job["remote"])
+    job["extra"] = json.loads(row[-1]) if row[-1] else {}
+    return job
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "thread")
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "32"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+
+
+class QueueFull(Exception):
+    """Raised by `JobQueue.submit` when the backlog is at capacity."""
+
+
+class Job:
+    def __init__(self, kind, meta=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    In-process job queue on top of a thread or process pool.
+
+    At most `workers + max_queued` jobs can be pending or running; beyond
+    that `submit` raises QueueFull so the caller can answer HTTP 429.
+    Finished jobs keep their result for `result_ttl` seconds. Queued jobs
+    are cancelled outright; a running job is marked cancelled and its
+    result discarded when it finishes, since pool workers cannot be
+    interrupted safely.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, executor=JOB_EXECUTOR,
+                 max_queued=JOB_MAX_QUEUED, result_ttl=JOB_RESULT_TTL_SECONDS):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown job executor: {executor}")
+        self.workers = workers
+        self.executor = executor
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self._pool = None
+        self._jobs = {}
+        self._lock = threading.RLock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            pool_cls = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+            self._pool = pool_cls(max_workers=self.workers)
+        return self._pool
+
+    def _expire(self, now):
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _active(self):
+        # Counts by future rather than status: a cancelled job that is still
+        # running keeps occupying a worker.
+        return sum(1 for job in self._jobs.values() if not job.future.done())
+
+    def submit(self, kind, fn, *args, meta=None, cleanup=()):
+        """
+        Queue `fn(*args)` and return the new job's id. `cleanup` paths
+        are deleted if the job is cancelled before it starts; once `fn`
+        runs they are its to remove.
+        """
+        with self._lock:
+            self._expire(time.time())
+            if self._active() >= self.workers + self.max_queued:
+                raise QueueFull("Job queue is full, try again later")
+            job = Job(kind, meta)
+            self._jobs[job.id] = job
+            job.future = self._get_pool().submit(fn, *args)
+            # Process pools give no "started" hook, so the status flips to
+            # running once the future reports it.
+            job.future.add_done_callback(lambda future, job=job: self._finish(job, future, cleanup))
+        return job.id
+
+    def _finish(self, job, future, cleanup=()):
+        if future.cancelled():
+            for path in cleanup:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._lock:
+            job.finished_at = time.time()
+            if job.status == "cancelled":
+                return
+            try:
+                job.result = future.result()
+                job.status = "finished"
+            except CancelledError:
+                job.status = "cancelled"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire(time.time())
+            job = self._jobs.get(job_id)
+            if job and job.status == "queued" and job.future.running():
+                job.status = "running"
+            return job
+
+    def cancel(self, job_id):
+        """Cancel a job; returns False if it is unknown or already done."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job.status not in ("queued", "running"):
+                return False
+            job.status = "cancelled"
+            job.result = None
+            if job.future.cancel():
+                job.finished_at = time.time()
+            return True
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {"workers": self.workers, "executor": self.executor,
+                    "capacity": self.workers + self.max_queued, "jobs": counts}
@@ -1,6 +1,8 @@
-from huggingface_hub import InferenceClient
+from files.llm_backend import get_backend
+from files.metrics import timed
+from files.single_flight import single_flight
 
-client = InferenceClient() 
+MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
 
 prompt = "DSA and Core CS Concepts: Generate a list of the most important and frequently asked Data Structures and Algorithms (DSA) questions along with core Computer Science fundamentals (like DBMS, Computer Networks, Operating Systems, and OOPs). The questions should be focused on efficiency, real-world problem solving, and conceptual depth. Make sure the questions are relevant to the role and suitable for interview preparation and no overlapping of concepts should be done."
 
@@ -8,9 +10,15 @@ messages = [
     {"role": "user", "content": prompt}
 ]
 
-response = client.chat_completion(
-    messages=messages,
-    model="mistralai/Mistral-7B-Instruct-v0.2"
-)
 
-# print(response.choices[0].message.content)
\ No newline at end of file
+@timed("generate.core_cs_questions")
+@single_flight("core_cs_questions")
+def generate_core_cs_questions():
+    return get_backend().chat(
+        messages=messages,
+        model=MODEL
+    )
+
+
+if __name__ == "__main__":
+    print(generate_core_cs_questions())
@@ -1,18 +1,17 @@
 
 import os
-# import json
+import sys
+
 import requests
 from dotenv import load_dotenv
-# from langchain.agents import initialize_agent, load_tools
-from langchain.agents.agent_types import AgentType
-from langchain_community.llms import Ollama
 from langchain.tools import tool
 
 load_dotenv()
 
 SERPAPI_API_KEY = os.getenv("serpapi_api_key")
-if not SERPAPI_API_KEY:
-    raise ValueError("Missing 'serpapi_api_key' in environment variables. Please check your .env file.")
+
+# Reused across calls so repeated searches keep the connection alive.
+session = requests.Session()
 
 @tool
 def fetch_jobs_from_google(role_location: str) -> list:
@@ -20,6 +19,8 @@ def fetch_jobs_from_google(role_location: str) -> list:
     Fetch job listings from Google Jobs via SerpAPI based on role and location.
     Returns a list of dicts with job titles, companies, locations, and links.
     """
+    if not SERPAPI_API_KEY:
+        raise ValueError("Missing 'serpapi_api_key' in environment variables. Please check your .env file.")
     if "," in role_location:
         role, location = [x.strip() for x in role_location.split(",", 1)]
     else:
@@ -34,7 +35,7 @@ def fetch_jobs_from_google(role_location: str) -> list:
         "api_key": SERPAPI_API_KEY
     }
 
-    response = requests.get("https://serpapi.com/search?engine=google_jobs", params=params)
+    response = session.get("https://serpapi.com/search?engine=google_jobs", params=params, timeout=15)
 
     if response.status_code != 200:
         return [{"error": f"{response.status_code} {response.reason}"}]
@@ -54,30 +55,30 @@ def fetch_jobs_from_google(role_location: str) -> list:
     return jobs_list
 
 
-# llm = Ollama(model="llama3")
-
-# tools = [fetch_jobs_from_google]
+if __name__ == "__main__":
+    role_location = "Data Scientist, India"
+    if "--agent" in sys.argv:
+        # The agent stack is only needed when run as a script with --agent.
+        from langchain.agents import initialize_agent
+        from langchain.agents.agent_types import AgentType
+        from langchain_community.llms import Ollama
 
-# agent = initialize_agent(
-#     tools,
-#     llm,
-#     agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-#     verbose=True,
-#     max_iterations=10,
-#     handle_parsing_errors=True
-# )
+        agent = initialize_agent(
+            [fetch_jobs_from_google],
+            Ollama(model="llama3"),
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            verbose=True,
+            max_iterations=10,
+            handle_parsing_errors=True
+        )
+        print(agent.invoke(role_location))
+        sys.exit()
 
-# # Run agent
-# role_location = "Data Scientist, India"
-# response = agent.invoke(role_location)
-# print(response)
-
-# Directly call the tool and print job listings in a readable format
-jobs = fetch_jobs_from_google("Data Scientist, India")
-if jobs:
-    print("\nJob Listings:")
-    for job in jobs:
-        print(f"🔹 {job['title']} – {job['company']}\n📍 {job['location']}\n🔗 {job['link']}\n")
-else:
-    print("No jobs found.")
-        # return result_text.strip()
+    # Directly call the tool and print job listings in a readable format
+    jobs = fetch_jobs_from_google(role_location)
+    if jobs:
+        print("\nJob Listings:")
+        for job in jobs:
+            print(f"🔹 {job['title']} – {job['company']}\n📍 {job['location']}\n🔗 {job['link']}\n")
+    else:
+        print("No jobs found.")
@@ -1,7 +1,4 @@
-from langchain.agents import initialize_agent
-from langchain.agents.agent_types import AgentType
 from langchain.tools import tool
-from langchain_community.llms import Ollama
 import requests
 from dotenv import load_dotenv
 import os
@@ -12,6 +9,9 @@ load_dotenv()
 
 JOOBLE_API_KEY = os.getenv("jobble_api_key")
 
+# Reused across calls so repeated searches keep the connection alive.
+session = requests.Session()
+
 @tool
 def fetch_jobs_from_jooble(role_location: str) -> str:
     """
@@ -29,7 +29,7 @@ def fetch_jobs_from_jooble(role_location: str) -> str:
     headers = {"Content-type": "application/json"}
     payload = {"keywords": role, "location": location, "page": 1, "jobs_per_page": 5}
     
-    response = requests.post(url, json=payload, headers=headers)
+    response = session.post(url, json=payload, headers=headers, timeout=15)
     if response.status_code != 200:
         return f"❌ Error: {response.status_code} {response.reason}"
     
@@ -48,31 +48,37 @@ def fetch_jobs_from_jooble(role_location: str) -> str:
     return result_text.strip()
 
 
-# Initialize LLM
-llm = Ollama(model="llama3")
+if __name__ == "__main__":
+    # The agent stack is only needed when run as a script.
+    from langchain.agents import initialize_agent
+    from langchain.agents.agent_types import AgentType
+    from langchain_community.llms import Ollama
+
+    # Initialize LLM
+    llm = Ollama(model="llama3")
 
-tools = [fetch_jobs_from_jooble]
+    tools = [fetch_jobs_from_jooble]
 
-agent = initialize_agent(
-    tools,
-    llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True,
-    max_iterations=3,
-    handle_parsing_errors=True
-)
+    agent = initialize_agent(
+        tools,
+        llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=True,
+        max_iterations=3,
+        handle_parsing_errors=True
+    )
 
-# Run agent
-role_location = "Software Developer, India"
-response = agent.invoke(role_location)
+    # Run agent
+    role_location = "Software Developer, India"
+    response = agent.invoke(role_location)
 
 
-# Extract and print only the job links from the output
-if isinstance(response, dict) and 'output' in response:
-    output_text = response['output']
-else:
-    output_text = str(response)
-links = re.findall(r'https?://[^\s]+', output_text)
-print("\nJob Links:")
-for link in links:
-    print(link)
+    # Extract and print only the job links from the output
+    if isinstance(response, dict) and 'output' in response:
+        output_text = response['output']
+    else:
+        output_text = str(response)
+    links = re.findall(r'https?://[^\s]+', output_text)
+    print("\nJob Links:")
+    for link in links:
+        print(link)
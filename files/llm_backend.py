@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+
+from files.metrics import metrics, trace_event
+from files.prompt_budget import estimate_tokens, token_usage
+
+
+DEFAULT_BACKEND = os.getenv("LLM_BACKEND", "hf")
+DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+DEFAULT_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+DEFAULT_BACKOFF = float(os.getenv("LLM_BACKOFF_SECONDS", "1.0"))
+# Prompt budgeting per backend: a Hugging Face tokenizer id for hf (needs
+# the optional `tokenizers` package), and the characters per token of the
+# Ollama model. Unset, both use prompt_budget.estimate_tokens.
+HF_TOKENIZER = os.getenv("HF_TOKENIZER")
+OLLAMA_CHARS_PER_TOKEN = float(os.getenv("OLLAMA_CHARS_PER_TOKEN", "0"))
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackendError(Exception):
+    """Raised when a backend call still fails after all retries."""
+
+
+class LLMBackend:
+    """
+    Base class for chat-completion backends.
+
+    Subclasses implement `_complete` (blocking), `_acomplete` (asyncio) and
+    optionally `_stream` (token chunks). The completion methods return
+    (text, usage) where usage is the server's (prompt, completion) token
+    counts or None. The base class adds a per-backend concurrency limit, a
+    timeout, retries with exponential backoff and token accounting, so
+    callers only see `chat()` / `achat()` returning the assistant message
+    text and `stream()` yielding it piece by piece.
+    """
+
+    name = "base"
+
+    def __init__(self, max_concurrency=4, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots = None
+
+    def _complete(self, messages, model):
+        raise NotImplementedError
+
+    async def _acomplete(self, messages, model):
+        # Backends without a native async client run the blocking call in
+        # the default executor so the event loop is never blocked.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._complete, messages, model)
+
+    def _stream(self, messages, model):
+        # Backends without token streaming emit the whole completion at once.
+        yield self._complete(messages, model)[0]
+
+    def count_tokens(self, text):
+        """Token count for budgeting prompts sent to this backend."""
+        return estimate_tokens(text)
+
+    def _record_usage(self, messages, model, text, usage, start):
+        if usage and all(n is not None for n in usage):
+            tokens_in, tokens_out = usage
+        else:
+            tokens_in = sum(self.count_tokens(m.get("content") or "") for m in messages)
+            tokens_out = self.count_tokens(text)
+            usage = None
+        seconds = time.perf_counter() - start
+        token_usage.record_call(self.name, model, tokens_in, tokens_out, seconds, reported=usage is not None)
+        metrics.observe("llm_request_seconds", seconds, backend=self.name, model=model)
+        metrics.inc("llm_tokens_total", tokens_in, backend=self.name, model=model, direction="in")
+        metrics.inc("llm_tokens_total", tokens_out, backend=self.name, model=model, direction="out")
+        trace_event(f"llm.{self.name}", start, seconds, model=model, tokens_in=tokens_in, tokens_out=tokens_out)
+
+    def _record_error(self, error):
+        metrics.inc("llm_errors_total", backend=self.name, error=type(error).__name__)
+
+    def _delay(self, attempt):
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def chat(self, messages, model):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            with self._slots:
+                try:
+                    start = time.perf_counter()
+                    text, usage = self._complete(messages, model)
+                    self._record_usage(messages, model, text, usage, start)
+                    return text
+                except Exception as e:
+                    self._record_error(e)
+                    last_error = e
+            if attempt < self.retries:
+                time.sleep(self._delay(attempt))
+        raise LLMBackendError(f"{self.name} backend failed: {last_error}") from last_error
+
+    def stream(self, messages, model):
+        """
+        Yield completion text chunks as the backend produces them. Retries
+        only happen before the first chunk; a stream that breaks midway
+        raises instead of replaying text the caller has already seen.
+        """
+        last_error = None
+        for attempt in range(self.retries + 1):
+            started = False
+            with self._slots:
+                try:
+                    start = time.perf_counter()
+                    chunks = []
+                    for chunk in self._stream(messages, model):
+                        if chunk:
+                            started = True
+                            chunks.append(chunk)
+                            yield chunk
+                    self._record_usage(messages, model, "".join(chunks), None, start)
+                    return
+                except Exception as e:
+                    self._record_error(e)
+                    if started:
+                        raise LLMBackendError(f"{self.name} stream interrupted: {e}") from e
+                    last_error = e
+            if attempt < self.retries:
+                time.sleep(self._delay(attempt))
+        raise LLMBackendError(f"{self.name} backend failed: {last_error}") from last_error
+
+    async def achat(self, messages, model):
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        last_error = None
+        for attempt in range(self.retries + 1):
+            async with self._async_slots:
+                try:
+                    start = time.perf_counter()
+                    text, usage = await asyncio.wait_for(self._acomplete(messages, model), self.timeout)
+                    self._record_usage(messages, model, text, usage, start)
+                    return text
+                except Exception as e:
+                    self._record_error(e)
+                    last_error = e
+            if attempt < self.retries:
+                await asyncio.sleep(self._delay(attempt))
+        raise LLMBackendError(f"{self.name} backend failed: {last_error}") from last_error
+
+
+class HFInferenceBackend(LLMBackend):
+    """
+    Hugging Face Inference API via `huggingface_hub`. `base_url` (default
+    $HF_BASE_URL) points it at any OpenAI-compatible chat server instead,
+    such as a TGI/vLLM deployment or benchmarks.fake_llm_server.
+    """
+
+    name = "hf"
+
+    def __init__(self, base_url=None, **kwargs):
+        kwargs.setdefault("max_concurrency", int(os.getenv("HF_MAX_CONCURRENCY", "8")))
+        super().__init__(**kwargs)
+        self.base_url = base_url or os.getenv("HF_BASE_URL") or None
+        self._client = None
+        self._async_client = None
+        self._tokenizer = None
+        self._tokenizer_lock = threading.Lock()
+
+    def _get_tokenizer(self):
+        with self._tokenizer_lock:
+            if self._tokenizer is None:
+                self._tokenizer = False
+                try:
+                    from tokenizers import Tokenizer
+                    self._tokenizer = Tokenizer.from_pretrained(HF_TOKENIZER)
+                except Exception as e:
+                    logger.warning(f"HF_TOKENIZER {HF_TOKENIZER!r} unavailable, estimating tokens: {e}")
+            return self._tokenizer
+
+    def count_tokens(self, text):
+        tokenizer = self._get_tokenizer() if HF_TOKENIZER else None
+        if not tokenizer:
+            return super().count_tokens(text)
+        return len(tokenizer.encode(text or "", add_special_tokens=False).ids)
+
+    def _sync_client(self):
+        if self._client is None:
+            from huggingface_hub import InferenceClient
+            self._client = InferenceClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    @staticmethod
+    def _result(response):
+        usage = getattr(response, "usage", None)
+        counts = (usage.prompt_tokens, usage.completion_tokens) if usage else None
+        return response.choices[0].message.content, counts
+
+    def _complete(self, messages, model):
+        response = self._sync_client().chat_completion(messages=messages, model=model)
+        return self._result(response)
+
+    def _stream(self, messages, model):
+        for chunk in self._sync_client().chat_completion(messages=messages, model=model, stream=True):
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    async def _acomplete(self, messages, model):
+        if self._async_client is None:
+            from huggingface_hub import AsyncInferenceClient
+            self._async_client = AsyncInferenceClient(base_url=self.base_url, timeout=self.timeout)
+        response = await self._async_client.chat_completion(messages=messages, model=model)
+        return self._result(response)
+
+
+class OllamaBackend(LLMBackend):
+    """
+    Local Ollama server. Hugging Face model ids are not valid Ollama tags,
+    so every request uses OLLAMA_MODEL unless the caller already passes a
+    bare Ollama tag such as "llama3".
+    """
+
+    name = "ollama"
+
+    def __init__(self, host=None, default_model=None, **kwargs):
+        kwargs.setdefault("max_concurrency", int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2")))
+        super().__init__(**kwargs)
+        self.host = host or os.getenv("OLLAMA_HOST")
+        self.default_model = default_model or os.getenv("OLLAMA_MODEL", "llama3")
+        self._client = None
+        self._async_client = None
+
+    def _model(self, model):
+        return model if model and "/" not in model else self.default_model
+
+    def count_tokens(self, text):
+        if OLLAMA_CHARS_PER_TOKEN <= 0:
+            return super().count_tokens(text)
+        return math.ceil(len(text or "") / OLLAMA_CHARS_PER_TOKEN)
+
+    def _sync_client(self):
+        if self._client is None:
+            import ollama
+            self._client = ollama.Client(host=self.host, timeout=self.timeout)
+        return self._client
+
+    @staticmethod
+    def _result(response):
+        counts = (response.get("prompt_eval_count"), response.get("eval_count"))
+        return response["message"]["content"], counts
+
+    def _complete(self, messages, model):
+        response = self._sync_client().chat(model=self._model(model), messages=messages)
+        return self._result(response)
+
+    def _stream(self, messages, model):
+        for part in self._sync_client().chat(model=self._model(model), messages=messages, stream=True):
+            yield part["message"]["content"]
+
+    async def _acomplete(self, messages, model):
+        if self._async_client is None:
+            import ollama
+            self._async_client = ollama.AsyncClient(host=self.host, timeout=self.timeout)
+        response = await self._async_client.chat(model=self._model(model), messages=messages)
+        return self._result(response)
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic offline backend for development and load tests.
+
+    The reply depends only on the prompt: if the prompt ends with a JSON
+    output template it is returned filled with empty values, otherwise a
+    short text keyed by the prompt hash. `latency` simulates time to the
+    first token and `token_latency` the gap between streamed tokens.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency=None, token_latency=None, **kwargs):
+        kwargs.setdefault("max_concurrency", int(os.getenv("STUB_MAX_CONCURRENCY", "64")))
+        super().__init__(**kwargs)
+        self.latency = float(os.getenv("STUB_LATENCY_SECONDS", "0")) if latency is None else latency
+        if token_latency is None:
+            token_latency = float(os.getenv("STUB_TOKEN_LATENCY_SECONDS", "0"))
+        self.token_latency = token_latency
+
+    @staticmethod
+    def respond(messages):
+        prompt = messages[-1]["content"] if messages else ""
+        template = re.findall(r"\{[^{}]*\}", prompt, re.S)
+        if template:
+            candidate = template[-1].replace("...", "").replace("<score>", "0")
+            candidate = re.sub(r"\[[^\]]*\]", "[]", candidate)
+            try:
+                return json.dumps(json.loads(candidate), indent=2)
+            except ValueError:
+                pass
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        return f"stub response {digest}"
+
+    def _complete(self, messages, model):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond(messages), None
+
+    async def _acomplete(self, messages, model):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.respond(messages), None
+
+    def _stream(self, messages, model):
+        if self.latency:
+            time.sleep(self.latency)
+        for token in re.findall(r"\s*\S+", self.respond(messages)):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield token
+
+
+BACKENDS = {
+    "hf": HFInferenceBackend,
+    "ollama": OllamaBackend,
+    "stub": StubBackend,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """Return the shared backend instance for `name` (default: $LLM_BACKEND)."""
+    name = name or DEFAULT_BACKEND
+    with _instances_lock:
+        if name not in _instances:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown LLM backend: {name}")
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
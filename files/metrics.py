@@ -0,0 +1,267 @@
+"""
+In-process latency, token and cache metrics, rendered in the Prometheus
+text format for GET /metrics.
+
+`span(name)` (or the `timed(name)` decorator) records how long a block
+took in the `span_seconds` histogram; PDF extraction, session reads and
+writes, feature stages and every model-backed generator are wrapped in
+one. The LLM backends, the caches and the HTTP layer add counters and
+histograms of their own through `metrics.inc` / `metrics.observe`.
+Series live in memory per process behind one lock, so recording costs a
+few microseconds (see benchmarks/bench_metrics.py); METRICS_ENABLED=false
+turns recording off.
+
+A request can also ask for its own trace. While a trace is active
+(`start_trace`) every span finished on its behalf, including stages run
+on worker threads started from the request's context, is appended to it,
+and `finish_trace` keeps the last TRACE_KEEP traces for /traces/<id>.
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() != "false"
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "200"))
+# Upper bounds in seconds; sub-millisecond for cache and session reads up
+# to minutes for slow model calls.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "span_seconds": "Duration of instrumented blocks (PDF extraction, sessions, stages, generators).",
+    "http_request_seconds": "Flask route handler duration.",
+    "feature_seconds": "analyze_feature duration per feature, including payload cache hits.",
+    "llm_request_seconds": "Duration of successful LLM backend calls.",
+    "llm_tokens_total": "Tokens sent to and received from LLM backends.",
+    "llm_errors_total": "Failed LLM backend attempts, before retries.",
+    "llm_cache_requests_total": "LLM and feature payload cache lookups.",
+    "single_flight_calls_total": "Generator calls that led or joined a coalesced flight.",
+    "upload_cache_requests_total": "Upload extractions served from or added to the upload cache.",
+    "semantic_cache_requests_total": "Near-duplicate cache lookups by outcome.",
+    "semantic_cache_similarity": "Best MinHash similarity found per near-duplicate cache lookup.",
+    "role_skills_lookups_total": "Role knowledge base lookups (hits, misses) and roles learned from the model.",
+}
+
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+def _label_key(labels):
+    if len(labels) == 1:
+        ((k, v),) = labels.items()
+        return ((k, str(v)),)
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Counters and fixed-bucket histograms keyed by name and label set."""
+
+    def __init__(self, buckets=BUCKETS, enabled=METRICS_ENABLED):
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._buckets = {}
+
+    def histogram(self, name, buckets):
+        """Use `buckets` instead of the latency buckets for histogram `name`."""
+        self._buckets[name] = tuple(buckets)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        buckets = self._buckets.get(name, self.buckets)
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                # One count per bucket plus +Inf, then the running sum.
+                entry = series[key] = [0] * (len(buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def render(self):
+        """All series in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: list(v) for k, v in series.items()}
+                          for name, series in self._histograms.items()}
+
+        lines = []
+        for name in sorted(counters):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+        for name in sorted(histograms):
+            bounds = self._buckets.get(name, self.buckets) + (math.inf,)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, entry in sorted(histograms[name].items()):
+                total = 0
+                for bound, count in zip(bounds, entry):
+                    total += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_number(bound)),))} {total}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(entry[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class Trace:
+    """Spans recorded for one request, offsets relative to its start."""
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+
+    def add(self, name, start, seconds, **attrs):
+        # list.append is atomic, so worker threads need no lock here.
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self.start) * 1000, 3),
+            "ms": round(seconds * 1000, 3),
+            "thread": threading.current_thread().name,
+            **attrs,
+        })
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "ms": round(self.seconds * 1000, 3) if self.seconds is not None else None,
+            "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+        }
+
+
+_traces = OrderedDict()
+_traces_lock = threading.Lock()
+
+
+def start_trace(name):
+    """Collect the spans of the current context (request) into a new Trace."""
+    trace = Trace(name)
+    _trace.set(trace)
+    return trace
+
+
+def finish_trace(trace):
+    """Close `trace`, detach it from the context and keep it for get_trace."""
+    trace.seconds = time.perf_counter() - trace.start
+    _trace.set(None)
+    with _traces_lock:
+        _traces[trace.id] = trace
+        while len(_traces) > TRACE_KEEP:
+            _traces.popitem(last=False)
+
+
+def get_trace(trace_id):
+    with _traces_lock:
+        trace = _traces.get(trace_id)
+    return trace.to_dict() if trace else None
+
+
+def trace_event(name, start, seconds, **attrs):
+    """Add an entry to the active trace, if any; no histogram is touched."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, start, seconds, **attrs)
+
+
+class span:
+    """
+    Time the enclosed block into span_seconds{span=name} and the active
+    trace. A class rather than a generator context manager: it runs on
+    every instrumented call, so it is kept to two clock reads and one
+    locked update.
+    """
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if not metrics.enabled:
+            return False
+        seconds = time.perf_counter() - self.start
+        metrics.observe("span_seconds", seconds, span=self.name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(self.name, self.start, seconds)
+        return False
+
+
+def timed(name):
+    """Decorator form of `span`; a coroutine function is timed until its result is ready."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def in_context(fn):
+    """`fn` bound to a copy of the caller's context, for thread pool submits."""
+    return functools.partial(contextvars.copy_context().run, fn)
@@ -1,37 +1,55 @@
-import io
-import pdfplumber
-from pdfminer.high_level import extract_text
-
-from huggingface_hub import InferenceClient
-
-client = InferenceClient()
-
-
-import io
-import pdfplumber
-
-def extract_ordered_text_pdf(file_input):
+import json
+import os
+import re
+
+from files.cache import cached_stage
+from files.embeddings import match_skills
+from files.llm_backend import get_backend
+from files.metrics import timed
+from files.pdf_extract import extract_text
+from files.prompt_budget import budget_text, compact_prompt
+from files.resume_sections import split_sections
+from files.role_skills import role_index
+from files.single_flight import single_flight
+from files.skill_terms import canonical_role, extract_skills
+from files.structured_output import parse_feature_output
+
+MODEL = "meta-llama/Llama-3.3-70B-Instruct"
+
+# "local" pulls the Skills section out with heading rules and calls no
+# model, "single_pass" asks for sections and skills in one completion and
+# "chain" is the original structure -> skills chain. Each mode falls back
+# to the next one when it cannot produce a skills list.
+PIPELINE_MODES = ("local", "single_pass", "chain")
+SKILLS_PIPELINE_MODE = os.getenv("SKILLS_PIPELINE_MODE", "local")
+MIN_LOCAL_SKILLS = 3
+
+# Bump a version whenever its prompt template changes so stale cache
+# entries for that stage stop matching.
+STRUCTURE_PROMPT_VERSION = "2"
+SKILLS_PROMPT_VERSION = "3"
+MISSING_SKILLS_PROMPT_VERSION = "2"
+SECTIONS_SKILLS_PROMPT_VERSION = "2"
+REQUIRED_SKILLS_PROMPT_VERSION = "1"
+
+SKILL_SPLIT_RE = re.compile(r"[,;|•·\n]")
+
+
+@timed("pdf.extract_ordered_text")
+def extract_ordered_text_pdf(file_input, mode=None):
     """
-    Extract text from PDF using pdfplumber.
+    Extract text from PDF via files.pdf_extract.
     Works with:
       - File path (string)
       - File-like object (Flask upload)
+    `mode` is "layout" (pdfplumber) or "fast" (text layer only);
+    defaults to PDF_EXTRACT_MODE.
     """
-    # If it's a file-like object (has .read)
-    if hasattr(file_input, "read"):
-        file_bytes = file_input.read()
+    # The parser reads the file object (or path) in place; copying the
+    # upload into memory first cost 2-3x its size per concurrent request.
+    text = extract_text(file_input, mode)
+    if hasattr(file_input, "seek"):
         file_input.seek(0)  # reset pointer
-        pdf_source = io.BytesIO(file_bytes)
-    else:
-        # Assume it's a file path (string)
-        pdf_source = file_input
-
-    text = ""
-    with pdfplumber.open(pdf_source) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
     return text
 
 
@@ -39,6 +57,9 @@ def extract_ordered_text_pdf(file_input):
 
 # print(extract_ordered_text_pdf("Resume.pdf"))
 
+@timed("generate.structure")
+@cached_stage("structure", MODEL, STRUCTURE_PROMPT_VERSION)
+@single_flight("structure")
 def send_text_to_llm(text):
     
     prompt = f"""
@@ -57,7 +78,7 @@ def send_text_to_llm(text):
     - If any section is missing, still include it with an empty string ("").
 
     Input Resume Text:
-    {text}
+    {budget_text(text, 'structure', count=get_backend().count_tokens)}
 
     Output:
     Return ONLY valid JSON in this format:
@@ -74,38 +95,163 @@ def send_text_to_llm(text):
 
 
     try:
-        response = client.chat_completion(model="meta-llama/Llama-3.3-70B-Instruct", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": compact_prompt(prompt)}
         ])
 
-        return f"{response.choices[0].message.content}"
+        return f"{response}"
 
 
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
     
 
+@timed("generate.skills")
+@cached_stage("skills", MODEL, SKILLS_PROMPT_VERSION)
+@single_flight("skills")
 def retrieve_skills(text):
     prompt = f"""
     You are an AI career assistant.
     Task: you are given a resume text. Extract and list all the skills mentioned in the resume in a correct order.
-    Input: {text}
+    Input: {budget_text(text, 'skills', count=get_backend().count_tokens)}
     Output: A list of skills in JSON format and do not seperate combine all types of skills into list with numbering without double quotes.
     """
     try:
-        response = client.chat_completion(model="meta-llama/Llama-3.3-70B-Instruct", messages=[
+        response = get_backend().chat(model=MODEL, messages=[
             {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": compact_prompt(prompt)}
         ])
 
-        return f"{response.choices[0].message.content}"
+        return f"{response}"
     
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
     
 
-def generate_missing_skills(role, candidate_skills):
+def extract_skills_section(resume_text):
+    """
+    Body of the resume's first Skills section ("Skills", "Technical
+    Skills", ...) without its heading, or "" when there is none.
+    """
+    for name, text in split_sections(resume_text):
+        if name == "skills":
+            return text.partition("\n")[2].strip()
+    return ""
+
+
+def local_skills(resume_text):
+    """
+    Skills listed in the resume's Skills section, without any model call.
+    "Category: a, b" labels are dropped and items are split on commas,
+    semicolons, pipes and bullets (not inside parentheses). Returns None
+    when the section is missing or too short to trust.
+    """
+    section = extract_skills_section(resume_text)
+    skills, seen = [], set()
+    for line in section.splitlines():
+        label, sep, rest = line.partition(":")
+        if sep and len(label.split()) <= 4:
+            line = rest
+        # Mask separators inside parentheses, e.g. "AWS (EC2, S3)".
+        depth, masked = 0, []
+        for ch in line:
+            depth += (ch == "(") - (ch == ")")
+            masked.append("\0" if depth > 0 and SKILL_SPLIT_RE.match(ch) else ch)
+        for item in SKILL_SPLIT_RE.split("".join(masked)):
+            item = item.replace("\0", ",").strip(" .-*\t")
+            if item and item.lower() not in seen:
+                seen.add(item.lower())
+                skills.append(item)
+    return skills if len(skills) >= MIN_LOCAL_SKILLS else None
+
+
+def sections_skills_messages(text):
+    prompt = f"""
+    You are an AI that organizes resume text into structured sections and lists its skills.
+
+    Task:
+    - Put the resume text into the sections below; use "" for a missing section.
+    - List every skill mentioned anywhere in the resume as a flat list of short names.
+
+    Input Resume Text:
+    {budget_text(text, 'structure', count=get_backend().count_tokens)}
+
+    Output:
+    Return ONLY valid JSON in this format:
+    {{
+      "sections": {{
+        "Name and Contact Information": "",
+        "Introduction/Summary": "",
+        "Experience": "",
+        "Projects": "",
+        "Education": "",
+        "Skills": "",
+        "Certifications": ""
+      }},
+      "skills": []
+    }}
+    """
+
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": compact_prompt(prompt)}
+    ]
+
+
+@timed("generate.sections_skills")
+@cached_stage("sections_skills", MODEL, SECTIONS_SKILLS_PROMPT_VERSION)
+@single_flight("sections_skills")
+def extract_sections_and_skills(text):
+    try:
+        response = get_backend().chat(model=MODEL, messages=sections_skills_messages(text))
+
+        return f"{response}"
+
+    except Exception as e:
+        return f"⚠️ Error generating response: {str(e)}"
+
+
+def _skill_list(skills):
+    # One bullet per skill so items containing commas stay whole when the
+    # text is parsed back into a list.
+    return "\n".join(f"- {skill}" for skill in skills)
+
+
+@timed("skills.resume_skills")
+def resume_skills(resume_text, mode=None):
+    """
+    Candidate skills for `generate_missing_skills` using one of
+    PIPELINE_MODES (default SKILLS_PIPELINE_MODE). Returns
+    (skills_text, mode_used, llm_calls); a mode that cannot produce a
+    list falls back to the next one.
+    """
+    mode = mode if mode in PIPELINE_MODES else SKILLS_PIPELINE_MODE
+    llm_calls = 0
+    if mode == "local":
+        skills = local_skills(resume_text)
+        if skills:
+            return _skill_list(skills), "local", llm_calls
+        mode = "single_pass"
+    if mode == "single_pass":
+        value, errors = parse_feature_output("sections_skills", extract_sections_and_skills(resume_text),
+                                             repair=False)
+        llm_calls += 1
+        if not errors and value["skills"]:
+            return _skill_list(value["skills"]), "single_pass", llm_calls
+    return retrieve_skills(send_text_to_llm(resume_text)), "chain", llm_calls + 2
+
+
+@timed("skills.local_missing_skills")
+def local_missing_skills(candidate_skills, job_description):
+    """
+    Skills named in the job description that none of the candidate's
+    skills match by embedding similarity; no model call.
+    """
+    return match_skills(candidate_skills, extract_skills(job_description))["missing"]
+
+
+def missing_skills_messages(role, candidate_skills):
     prompt = f"""
     You are an AI career assistant.
 
@@ -131,16 +277,139 @@ def generate_missing_skills(role, candidate_skills):
     }}
     """
 
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": compact_prompt(prompt)}
+    ]
+
+
+def required_skills_messages(role):
+    prompt = f"""
+    You are an AI career assistant.
+
+    Task:
+    1. List the essential skills required for the target job role (avoid adding unnecessary skills).
+    2. Give at most 8 skills per category, each as a short skill name.
+    3. Return them in JSON format under these categories:
+       - Core Technical Skills
+       - Programming Languages/Frameworks
+       - Tools & Platforms
 
+    Input:
+    Role: "{role}"
+
+    Output:
+    {{
+      "Core Technical Skills": [],
+      "Programming Languages/Frameworks": [],
+      "Tools & Platforms": []
+    }}
+    """
+
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": compact_prompt(prompt)}
+    ]
+
+
+@timed("generate.required_skills")
+@cached_stage("required_skills", MODEL, REQUIRED_SKILLS_PROMPT_VERSION)
+@single_flight("required_skills")
+def generate_required_skills(role):
     try:
-        response = client.chat_completion(model="meta-llama/Llama-3.3-70B-Instruct", messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ])
+        return get_backend().chat(model=MODEL, messages=required_skills_messages(role))
+    except Exception as e:
+        return f"⚠️ Error generating response: {str(e)}"
+
+
+@timed("generate.required_skills")
+@cached_stage("required_skills", MODEL, REQUIRED_SKILLS_PROMPT_VERSION)
+@single_flight("required_skills")
+async def agenerate_required_skills(role):
+    try:
+        return await get_backend().achat(model=MODEL, messages=required_skills_messages(role))
+    except Exception as e:
+        return f"⚠️ Error generating response: {str(e)}"
+
+
+def _learn(role, raw, index):
+    required, errors = parse_feature_output("missing_skills", raw)
+    if errors or not any(required.values()):
+        return False
+    index.learn(role, required, source="llm")
+    return True
+
 
-        return f"{response.choices[0].message.content}"
+def learn_role(role, index=role_index):
+    """Ask the model for `role`'s required skills and store them in `index`; False if that failed."""
+    return _learn(role, generate_required_skills(role), index)
 
 
+async def alearn_role(role, index=role_index):
+    return _learn(role, await agenerate_required_skills(role), index)
+
+
+def known_missing_skills(role, candidate_skills, learn=True):
+    """
+    Missing skills JSON from the role knowledge base (files.role_skills),
+    asking the model for an unknown role's required skills first when
+    `learn` is set. None if the role stays unknown.
+    """
+    if not canonical_role(role or ""):
+        return None
+    missing = role_index.missing(role, candidate_skills)
+    if missing is None and learn and learn_role(role):
+        missing = role_index.missing(role, candidate_skills)
+    return json.dumps(missing) if missing is not None else None
+
+
+async def aknown_missing_skills(role, candidate_skills):
+    """known_missing_skills(learn=True) with the model call awaited."""
+    known = known_missing_skills(role, candidate_skills, learn=False)
+    if known is None and canonical_role(role or "") and await alearn_role(role):
+        known = known_missing_skills(role, candidate_skills, learn=False)
+    return known
+
+
+@timed("generate.missing_skills")
+def generate_missing_skills(role, candidate_skills):
+    """
+    Skills the role needs that the candidate lacks, as the JSON text the
+    missing-skills prompt asks for. Known roles are a local set
+    difference; an unknown role costs one role-only completion, learned
+    for every later request. Without a role, or if that completion
+    fails, the model compares the skills itself.
+    """
+    return known_missing_skills(role, candidate_skills) or compare_missing_skills(role, candidate_skills)
+
+
+@timed("generate.missing_skills")
+async def agenerate_missing_skills(role, candidate_skills):
+    """generate_missing_skills on the event loop."""
+    return (await aknown_missing_skills(role, candidate_skills)
+            or await acompare_missing_skills(role, candidate_skills))
+
+
+@timed("generate.compare_missing_skills")
+@cached_stage("missing_skills", MODEL, MISSING_SKILLS_PROMPT_VERSION)
+@single_flight("missing_skills")
+def compare_missing_skills(role, candidate_skills):
+    try:
+        response = get_backend().chat(model=MODEL, messages=missing_skills_messages(role, candidate_skills))
+
+        return f"{response}"
+
+
+    except Exception as e:
+        return f"⚠️ Error generating response: {str(e)}"
+
+
+@timed("generate.compare_missing_skills")
+@cached_stage("missing_skills", MODEL, MISSING_SKILLS_PROMPT_VERSION)
+@single_flight("missing_skills")
+async def acompare_missing_skills(role, candidate_skills):
+    try:
+        return await get_backend().achat(model=MODEL, messages=missing_skills_messages(role, candidate_skills))
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
 
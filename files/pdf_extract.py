@@ -0,0 +1,257 @@
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+
+from files.metrics import timed
+
+
+PDF_EXTRACT_MODE = os.getenv("PDF_EXTRACT_MODE", "layout")
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Below this many pages the cost of starting worker processes outweighs
+# the parallel speed-up.
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+# Checked before any page is parsed; 0 disables a limit.
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+
+MODES = ("layout", "fast")
+
+_pool = None
+
+
+class PDFRejected(ValueError):
+    """A document refused before parsing; `status` is the HTTP status to answer with."""
+
+    status = 413
+
+
+class NotAPDF(PDFRejected):
+    status = 415
+
+
+def _get_pool():
+    # Shared across calls so worker start-up is paid once per process.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _pool
+
+
+class TextLayerDevice(PDFTextDevice):
+    """
+    Minimal pdfminer device that reads the text layer in content-stream
+    order. It skips the layout analysis pdfplumber and pdfminer's LAParams
+    do (no LTChar objects, no line/box grouping): each glyph only updates
+    a baseline and end position, a baseline jump starts a new line and a
+    horizontal gap becomes a space.
+    """
+
+    def __init__(self, rsrcmgr):
+        super().__init__(rsrcmgr)
+        self.parts = []
+        self._last_y = None
+        self._end_x = 0.0
+        self._last_char = ""
+
+    def begin_page(self, page, ctm):
+        self.parts = []
+        self._last_y = None
+        self._end_x = 0.0
+        self._last_char = ""
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, ncs, graphicstate):
+        adv = font.char_width(cid) * fontsize * scaling
+        a, _, _, d, x, y = matrix
+        size = abs(fontsize * d) or fontsize
+        try:
+            char = font.to_unichr(cid)
+        except PDFUnicodeNotDefined:
+            return adv
+
+        if self._last_y is not None:
+            if abs(y - self._last_y) > size * 0.5:
+                self.parts.append("\n")
+            elif x - self._end_x > size * 0.15 and not char.isspace() and not self._last_char.isspace():
+                self.parts.append(" ")
+        self.parts.append(char)
+        self._last_y = y
+        self._end_x = x + adv * a
+        self._last_char = char
+        return adv
+
+    def text(self):
+        return "".join(self.parts)
+
+
+def _open_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _fast_pages(source, page_numbers):
+    rsrcmgr = PDFResourceManager(caching=True)
+    device = TextLayerDevice(rsrcmgr)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    results = []
+    fp = _open_source(source)
+    own = isinstance(fp, str)
+    if own:
+        fp = open(fp, "rb")
+    try:
+        for page_no, page in enumerate(PDFPage.get_pages(fp, pagenos=set(page_numbers))):
+            start = time.perf_counter()
+            interpreter.process_page(page)
+            results.append((page_numbers[page_no], device.text(), time.perf_counter() - start))
+    finally:
+        if own:
+            fp.close()
+    return results
+
+
+def _layout_pages(source, page_numbers):
+    results = []
+    with pdfplumber.open(_open_source(source), pages=[n + 1 for n in page_numbers]) as pdf:
+        for page_no, page in zip(page_numbers, pdf.pages):
+            start = time.perf_counter()
+            text = page.extract_text() or ""
+            results.append((page_no, text, time.perf_counter() - start))
+    return results
+
+
+def extract_page_range(source, page_numbers, mode="layout"):
+    """
+    Extract the given 0-based pages. Returns [(page_no, text, seconds)].
+    Module-level so it can run inside worker processes.
+    """
+    if mode == "fast":
+        return _fast_pages(source, page_numbers)
+    if mode == "layout":
+        return _layout_pages(source, page_numbers)
+    raise ValueError(f"Unknown PDF extraction mode: {mode}")
+
+
+def disk_path(fp):
+    """Path of an open file that has one on disk (a NamedTemporaryFile), else None."""
+    name = getattr(fp, "name", None)
+    return name if isinstance(name, str) and os.path.isfile(name) else None
+
+
+def _size(source):
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+
+def check_limits(source, max_bytes=PDF_MAX_BYTES, max_pages=PDF_MAX_PAGES):
+    """
+    Page count of a PDF within `max_bytes` and `max_pages`, else raise
+    PDFRejected. Reads the header, cross-reference table and page tree
+    root only, so an oversized or non-PDF upload costs no page parsing.
+    """
+    size = _size(source)
+    if max_bytes and size > max_bytes:
+        raise PDFRejected(f"PDF is {size} bytes; the limit is {max_bytes}")
+    fp = _open_source(source)
+    if isinstance(fp, str):
+        with open(fp, "rb") as f:
+            return check_limits(f, 0, max_pages)
+    if b"%PDF-" not in fp.read(1024):
+        raise NotAPDF("Not a PDF file")
+    fp.seek(0)
+    try:
+        pages = resolve1(resolve1(PDFDocument(PDFParser(fp)).catalog["Pages"]).get("Count"))
+    except Exception:
+        pages = None
+    if not isinstance(pages, int):
+        # No usable /Count in the page tree: walk it instead.
+        pages = count_pages(fp)
+    if max_pages and pages > max_pages:
+        raise PDFRejected(f"PDF has {pages} pages; the limit is {max_pages}")
+    return pages
+
+
+def count_pages(source):
+    fp = _open_source(source)
+    if isinstance(fp, str):
+        with open(fp, "rb") as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+    return sum(1 for _ in PDFPage.get_pages(fp))
+
+
+@timed("pdf.extract_pages")
+def extract_pages(source, mode=None, workers=None):
+    """
+    Extract every page of a PDF given as a path, bytes or a seekable
+    binary file object.
+
+    Raises PDFRejected past PDF_MAX_BYTES or PDF_MAX_PAGES, before any
+    page is parsed; only the first /Count pages are ever read. Documents
+    with at least PDF_PARALLEL_MIN_PAGES pages are split into contiguous
+    page ranges processed in parallel worker processes.
+    Returns [(page_no, text, seconds)] ordered by page.
+    """
+    mode = mode or PDF_EXTRACT_MODE
+    workers = workers or PDF_EXTRACT_WORKERS
+    page_total = check_limits(source)
+    page_numbers = list(range(page_total))
+
+    if workers <= 1 or page_total < PDF_PARALLEL_MIN_PAGES:
+        return extract_page_range(source, page_numbers, mode)
+
+    chunk = -(-page_total // workers)
+    ranges = [page_numbers[i:i + chunk] for i in range(0, page_total, chunk)]
+    if isinstance(source, memoryview):
+        source = bytes(source)
+    elif hasattr(source, "read"):
+        # Open file handles cannot be sent to worker processes; a file
+        # on disk is sent by path instead of copied through the pipe.
+        source = disk_path(source) or _open_source(source).read()
+    futures = [_get_pool().submit(extract_page_range, source, r, mode) for r in ranges]
+    return [page for future in futures for page in future.result()]
+
+
+@timed("pdf.aextract_pages")
+async def aextract_pages(source, mode=None):
+    """
+    extract_pages for callers on an event loop: the whole document is
+    parsed in one process of the shared pool, so parsing never holds the
+    loop (or its GIL) and concurrent uploads use PDF_EXTRACT_WORKERS cores.
+    `source` is a path or bytes; file objects cannot cross processes, so
+    pass large uploads by path (see upload_cache.aextract_with_cache).
+    """
+    if isinstance(source, memoryview):
+        source = bytes(source)
+    return await asyncio.get_running_loop().run_in_executor(_get_pool(), extract_pages, source, mode, 1)
+
+
+def join_pages(pages):
+    """Join page texts into one newline-terminated block per non-empty page."""
+    texts = [text for _, text, _ in pages if text]
+    # Single join instead of repeated concatenation.
+    return "\n".join(texts) + "\n" if texts else ""
+
+
+def extract_text(source, mode=None, workers=None):
+    """Extract a PDF's text, one newline-terminated block per non-empty page."""
+    return join_pages(extract_pages(source, mode, workers))
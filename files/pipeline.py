@@ -0,0 +1,145 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from files.metrics import in_context, span
+
+
+class Stage:
+    """
+    One node of the pipeline DAG.
+
+    `fn` receives a dict with the pipeline inputs plus the outputs of every
+    finished stage (keyed by stage name) and returns this stage's output.
+    """
+
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+def _check_graph(stages, inputs):
+    names = set(inputs)
+    for stage in stages:
+        if stage.name in names:
+            raise ValueError(f"Duplicate stage name: {stage.name}")
+        names.add(stage.name)
+    for stage in stages:
+        unknown = [d for d in stage.deps if d not in names]
+        if unknown:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {unknown}")
+
+
+def run_stages(stages, inputs=None, max_workers=None):
+    """
+    Run a DAG of stages, starting every stage as soon as its dependencies
+    have finished so independent chains overlap. A failed stage does not
+    stop unrelated stages; its dependents are skipped and reported.
+
+    Returns {"results": {...}, "errors": {...}, "timings": {...}}.
+    """
+    inputs = dict(inputs or {})
+    _check_graph(stages, inputs)
+
+    results = dict(inputs)
+    errors = {}
+    timings = {}
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    def timed(stage, snapshot):
+        start = time.perf_counter()
+        try:
+            with span(f"stage.{stage.name}"):
+                return stage.fn(snapshot)
+        finally:
+            timings[stage.name] = round(time.perf_counter() - start, 4)
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(stages), 1)) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                failed = [d for d in stage.deps if d in errors]
+                if failed:
+                    errors[name] = f"skipped: dependency failed ({', '.join(failed)})"
+                    del pending[name]
+                elif all(d in results for d in stage.deps):
+                    running[pool.submit(in_context(timed), stage, dict(results))] = name
+                    del pending[name]
+
+            if not running:
+                # Only reachable when the remaining stages form a cycle.
+                for name in pending:
+                    errors[name] = "skipped: unresolved dependencies"
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = str(e)
+
+    for key in inputs:
+        results.pop(key, None)
+    return {"results": results, "errors": errors, "timings": timings}
+
+
+async def arun_stages(stages, inputs=None):
+    """
+    `run_stages` on the running event loop. Coroutine stages are awaited;
+    the others run on the loop's default executor, in the caller's
+    context. Same scheduling and result shape; stages still running when
+    the caller is cancelled (a timeout) are cancelled too.
+    """
+    inputs = dict(inputs or {})
+    _check_graph(stages, inputs)
+
+    results = dict(inputs)
+    errors = {}
+    timings = {}
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    async def timed(stage, snapshot):
+        start = time.perf_counter()
+        try:
+            with span(f"stage.{stage.name}"):
+                if inspect.iscoroutinefunction(stage.fn):
+                    return await stage.fn(snapshot)
+                return await asyncio.to_thread(stage.fn, snapshot)
+        finally:
+            timings[stage.name] = round(time.perf_counter() - start, 4)
+
+    try:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                failed = [d for d in stage.deps if d in errors]
+                if failed:
+                    errors[name] = f"skipped: dependency failed ({', '.join(failed)})"
+                    del pending[name]
+                elif all(d in results for d in stage.deps):
+                    running[asyncio.ensure_future(timed(stage, dict(results)))] = name
+                    del pending[name]
+
+            if not running:
+                for name in pending:
+                    errors[name] = "skipped: unresolved dependencies"
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                try:
+                    results[name] = task.result()
+                except Exception as e:
+                    errors[name] = str(e)
+    finally:
+        for task in running:
+            task.cancel()
+
+    for key in inputs:
+        results.pop(key, None)
+    return {"results": results, "errors": errors, "timings": timings}
@@ -1,20 +1,25 @@
-import ollama
-from huggingface_hub import InferenceClient
+from files.llm_backend import get_backend
+from files.metrics import timed
+from files.prompt_budget import budget_text, compact_prompt
+from files.semantic_cache import SEMANTIC_CACHE_VARIANTS, semantic_cached
+from files.single_flight import single_flight
 
-client = InferenceClient()
+MODEL = "openai/gpt-oss-120b"
+PROJECT_IDEAS_PROMPT_VERSION = "2"
 
-def generate_project_ideas(role, job_description):
+def project_ideas_messages(role, job_description, skills=None):
     prompt = f"""
     You are an AI career assistant that helps candidates strengthen their resume by suggesting real-world project ideas.
 
     Job Role: {role}
-    Job Description: {job_description} 
+    Job Description: {budget_text(job_description, count=get_backend().count_tokens)}
+    Candidate Skills: {', '.join(skills) if skills else 'not provided'}
 
     Your task:
     1. Analyze the role and job description.
     2. Identify the most critical skills and tools required for success in this role.
     3. Suggest 5 practical project ideas that a candidate can work on to demonstrate these skills.
-    4. For each time generate different project ideas.
+    4. For each time generate different project ideas, building on the candidate's skills where they fit the role.
     Note: if job description is not provided, infer the skills based on the job role.
     Note: use numbered list for project ideas and just give what i mentioned in the prompt and No extra explanations, no stars, no extra formatting
 
@@ -26,20 +31,42 @@ def generate_project_ideas(role, job_description):
 
     """
 
-    messages = [
-        {"role": "user", "content": prompt}
+    return [
+        {"role": "user", "content": compact_prompt(prompt)}
     ]
 
+
+@timed("generate.project_ideas")
+# The prompt asks for different ideas each time, so near-duplicate
+# requests rotate through several stored sets, as interview questions do.
+@semantic_cached("project_ideas", MODEL, PROJECT_IDEAS_PROMPT_VERSION, variants=SEMANTIC_CACHE_VARIANTS)
+@single_flight("project_ideas")
+def generate_project_ideas(role, job_description, skills=None):
+    messages = project_ideas_messages(role, job_description, skills)
+
     try:
-        response = client.chat_completion(
+        response = get_backend().chat(
             messages=messages,
-            model="openai/gpt-oss-120b"
+            model=MODEL
         )
 
-        return f"{response.choices[0].message.content}"
+        return f"{response}"
 
 
     except Exception as e:
         return f"⚠️ Error generating response: {str(e)}"
 
+
+@timed("generate.project_ideas")
+@semantic_cached("project_ideas", MODEL, PROJECT_IDEAS_PROMPT_VERSION, variants=SEMANTIC_CACHE_VARIANTS)
+@single_flight("project_ideas")
+async def agenerate_project_ideas(role, job_description, skills=None):
+    """generate_project_ideas on the event loop, sharing its caches."""
+    try:
+        response = await get_backend().achat(messages=project_ideas_messages(role, job_description, skills),
+                                             model=MODEL)
+        return f"{response}"
+    except Exception as e:
+        return f"⚠️ Error generating response: {str(e)}"
+
 # print(generate_project_ideas("Data Scientist", "Experience with Python, Machine Learning, Data Analysis, and statistical modeling."))
\ No newline at end of file
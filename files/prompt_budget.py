@@ -0,0 +1,177 @@
+import math
+import os
+import re
+import threading
+from collections import deque
+
+from files.resume_sections import split_sections
+
+
+# Token budgets for the document text pasted into a prompt (the resume or
+# a job description), not for the whole prompt.
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "1500"))
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "600"))
+
+# Resume sections each prompt needs, most important first. When a resume
+# is over budget, sections are kept in this order and anything not listed
+# only fills what budget is left; within the budget the text keeps its
+# original order.
+FEATURE_SECTIONS = {
+    "structure": ("contact", "summary", "experience", "projects", "skills",
+                  "education", "certifications", "achievements", "other"),
+    "skills": ("skills", "projects", "experience", "certifications", "summary"),
+    "ats_score": ("skills", "experience", "projects", "summary", "certifications",
+                  "education", "achievements"),
+}
+
+WORD_PIECE_RE = re.compile(r"\w+|[^\w\s]|\n| {2,}")
+PAGE_NUMBER_RE = re.compile(r"^(?:page\s*)?\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?$", re.IGNORECASE)
+# Shorter lines (a skill, a date) may legitimately repeat unless they
+# recur on most pages like a running header does.
+MIN_DEDUPE_CHARS = 12
+HEADER_REPEATS = 3
+
+
+def estimate_tokens(text):
+    """
+    Approximate BPE token count: one token per short word, punctuation
+    mark, line break or run of spaces, and one per four characters of
+    longer words and runs. Close to the Llama tokenizers for English
+    resume text.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in WORD_PIECE_RE.findall(text or ""))
+
+
+def compact_prompt(prompt):
+    """Strip indentation and trailing spaces and collapse blank-line runs."""
+    lines = [line.strip() for line in prompt.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def compact_text(text):
+    """
+    Squeeze extracted document text: collapse runs of spaces, drop blank
+    lines and page numbers, and keep only the first copy of repeated lines
+    (running headers and footers, text duplicated across pages).
+    """
+    lines = [re.sub(r"\s+", " ", line).strip() for line in (text or "").splitlines()]
+    lines = [line for line in lines if line and not PAGE_NUMBER_RE.match(line)]
+    counts = {}
+    for line in lines:
+        counts[line.lower()] = counts.get(line.lower(), 0) + 1
+    seen = set()
+    kept = []
+    for line in lines:
+        key = line.lower()
+        if key in seen and (len(line) >= MIN_DEDUPE_CHARS or counts[key] >= HEADER_REPEATS):
+            continue
+        seen.add(key)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def _truncate(text, budget, count):
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = count(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def fit_to_budget(text, budget, sections=None, count=estimate_tokens):
+    """
+    Compact `text` and trim it to `budget` tokens. With a `sections`
+    priority list the text is split at resume headings and whole sections
+    are kept in priority order, then unlisted sections in document order,
+    the first one that does not fit being cut line by line. Without one,
+    or when none of the listed sections is present, the text is cut from
+    the end.
+    """
+    text = compact_text(text)
+    if count(text) <= budget:
+        return text
+    if not sections:
+        return _truncate(text, budget, count)
+
+    parts = split_sections(text)
+    rank = {name: i for i, name in enumerate(sections)}
+    ranked = sorted((i for i, (name, _) in enumerate(parts) if name in rank),
+                    key=lambda i: (rank[parts[i][0]], i))
+    if not ranked:
+        return _truncate(text, budget, count)
+    unranked = [i for i, (name, _) in enumerate(parts) if name not in rank]
+
+    chosen, remaining = {}, budget
+    for index in ranked + unranked:
+        body = parts[index][1]
+        cost = count(body) + 1
+        if cost <= remaining:
+            chosen[index] = body
+            remaining -= cost
+        else:
+            partial = _truncate(body, remaining, count)
+            if partial:
+                chosen[index] = partial
+            break
+    return "\n".join(chosen[i] for i in sorted(chosen))
+
+
+def budget_text(text, feature=None, budget=None, count=estimate_tokens):
+    """
+    Prompt-ready document text for `feature` (a FEATURE_SECTIONS key, or
+    None for a job description) and record how many tokens were saved.
+    """
+    if budget is None:
+        budget = RESUME_TOKEN_BUDGET if feature else JD_TOKEN_BUDGET
+    fitted = fit_to_budget(text or "", budget, FEATURE_SECTIONS.get(feature), count)
+    token_usage.record_prompt(feature or "job_description", count(text or ""), count(fitted))
+    return fitted
+
+
+class TokenUsage:
+    """
+    In-process token accounting: per-feature prompt compaction savings and
+    per-backend/model tokens in and out, plus the most recent calls.
+    """
+
+    def __init__(self, max_recent=200):
+        self._lock = threading.Lock()
+        self._prompts = {}
+        self._calls = {}
+        self._recent = deque(maxlen=max_recent)
+
+    def record_prompt(self, feature, original_tokens, compacted_tokens):
+        with self._lock:
+            entry = self._prompts.setdefault(feature, {"prompts": 0, "original_tokens": 0, "sent_tokens": 0})
+            entry["prompts"] += 1
+            entry["original_tokens"] += original_tokens
+            entry["sent_tokens"] += compacted_tokens
+
+    def record_call(self, backend, model, tokens_in, tokens_out, seconds, reported):
+        with self._lock:
+            entry = self._calls.setdefault(f"{backend}:{model}", {
+                "calls": 0, "tokens_in": 0, "tokens_out": 0, "estimated_calls": 0,
+            })
+            entry["calls"] += 1
+            entry["tokens_in"] += tokens_in
+            entry["tokens_out"] += tokens_out
+            entry["estimated_calls"] += int(not reported)
+            self._recent.append({
+                "backend": backend, "model": model, "tokens_in": tokens_in,
+                "tokens_out": tokens_out, "seconds": round(seconds, 3), "estimated": not reported,
+            })
+
+    def stats(self):
+        with self._lock:
+            prompts = {
+                feature: {**entry, "saved_tokens": entry["original_tokens"] - entry["sent_tokens"]}
+                for feature, entry in self._prompts.items()
+            }
+            calls = {key: dict(entry) for key, entry in self._calls.items()}
+            return {"prompts": prompts, "calls": calls, "recent": list(self._recent)}
+
+
+token_usage = TokenUsage()
@@ -0,0 +1,49 @@
+import re
+
+
+# Heading text (lowercased, without a trailing colon) -> section name.
+SECTION_HEADINGS = {
+    "summary": "summary", "profile": "summary", "objective": "summary",
+    "introduction": "summary", "about me": "summary", "career overview": "summary",
+    "education": "education",
+    "experience": "experience", "work experience": "experience",
+    "professional experience": "experience", "employment": "experience",
+    "employment history": "experience", "internships": "experience",
+    "projects": "projects", "project": "projects", "academic projects": "projects",
+    "certifications": "certifications", "certificates": "certifications",
+    "achievements": "achievements", "awards": "achievements",
+    "publications": "other", "languages": "other", "interests": "other",
+    "hobbies": "other", "extracurricular activities": "other", "activities": "other",
+    "references": "other", "volunteering": "other",
+}
+SKILLS_HEADING_RE = re.compile(
+    r"^\s*(?:technical|key|core|professional)?\s*skills?(?:\s*(?:&|and)\s*\w+)?\s*:?\s*$",
+    re.IGNORECASE,
+)
+
+
+def section_name(line):
+    """Section a heading line opens, or None if the line is not a heading."""
+    if SKILLS_HEADING_RE.match(line):
+        return "skills"
+    return SECTION_HEADINGS.get(line.strip().rstrip(":").strip().lower())
+
+
+def split_sections(resume_text):
+    """
+    Split resume text at known headings into [(section, text)] in document
+    order. Lines before the first heading (name, contact details) form the
+    "contact" section; heading lines themselves are kept with their body.
+    """
+    sections = []
+    name, lines = "contact", []
+    for line in (resume_text or "").splitlines():
+        heading = section_name(line)
+        if heading:
+            if lines:
+                sections.append((name, "\n".join(lines)))
+            name, lines = heading, []
+        lines.append(line)
+    if lines:
+        sections.append((name, "\n".join(lines)))
+    return sections
@@ -0,0 +1,288 @@
+"""
+Role knowledge base: the skills each job role requires, so missing
+skills are a local set difference instead of a model call.
+
+Roles are canonicalized with files.skill_terms.canonical_role ("Sr. ML
+Engineer" -> "machine learning engineer"). Roles and skills have integer
+ids in SQLite, and a role's required skills are stored as a bitset over
+skill ids. The whole index is read into memory on first use (a few
+hundred roles are a few kilobytes), so a lookup is a dict access and an
+AND-NOT of two integers. An empty index is filled from the shipped seed,
+files/role_skills.json. files.missing_skills asks the model once for the
+required skills of a role the index does not know and writes them back
+here, for every worker sharing ROLE_SKILLS_DB_PATH.
+
+Build or extend the index offline from the repository root:
+    python -m files.role_skills build [--seed files/role_skills.json] [--jobs cache/jobs.sqlite3] [--roles roles.txt]
+    python -m files.role_skills missing "Sr. Data Scientist" "Python, SQL, Pandas"
+    python -m files.role_skills stats
+
+`--jobs` adds every role with at least ROLE_MIN_POSTINGS stored postings
+(see files.job_store), requiring the skills found in at least
+ROLE_SKILL_SHARE of them; `--roles` asks the model for each listed title
+(one per line) that is still unknown.
+"""
+import argparse
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from files.metrics import metrics
+from files.skill_terms import canonical_role, canonical_skill, extract_skills, tokenize
+from files.structured_output import SCHEMAS
+
+
+ROLE_SKILLS_DB_PATH = os.getenv("ROLE_SKILLS_DB_PATH", os.path.join("cache", "role_skills.sqlite3"))
+ROLE_SKILLS_SEED_PATH = os.path.join(os.path.dirname(__file__), "role_skills.json")
+ROLE_MIN_POSTINGS = int(os.getenv("ROLE_MIN_POSTINGS", "5"))
+ROLE_SKILL_SHARE = float(os.getenv("ROLE_SKILL_SHARE", "0.3"))
+
+# The output categories of the missing-skills prompt.
+CATEGORIES = tuple(SCHEMAS["missing_skills"]["properties"])
+_ITEM_SPLIT = re.compile(r"[,;|•·\n]")
+
+
+def skill_name(text):
+    """Canonical skill name, or the tokenized phrase for skills outside the vocabulary."""
+    return canonical_skill(text) or " ".join(tokenize(text))
+
+
+@functools.lru_cache(maxsize=1024)
+def candidate_names(text):
+    """Skill names in a candidate's skills list or free text (one resume's text recurs across requests)."""
+    names = {skill_name(item.strip(" -*")) for item in _ITEM_SPLIT.split(text)}
+    names.update(extract_skills(text))
+    return frozenset(names), f" {' '.join(tokenize(text))} "
+
+
+class RoleSkillIndex:
+    """
+    Required-skill bitsets per canonical role, stored in SQLite and held
+    in memory. `source` records where a role came from: seed, jobs or llm.
+    """
+
+    def __init__(self, path=ROLE_SKILLS_DB_PATH, seed_path=ROLE_SKILLS_SEED_PATH):
+        self.path = path
+        self.seed_path = seed_path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._skills = {}
+        self._skill_ids = {}
+        self._roles = {}
+        self._stats = {"hits": 0, "misses": 0, "learned": 0}
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS skills (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE,
+                    category TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS roles (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE,
+                    required BLOB NOT NULL,
+                    source TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+        return self._conn
+
+    def _load(self):
+        # Caller holds self._lock.
+        if self._loaded:
+            return
+        conn = self._connect()
+        if conn.execute("SELECT COUNT(*) FROM roles").fetchone()[0] == 0 and os.path.exists(self.seed_path):
+            with open(self.seed_path, encoding="utf-8") as f:
+                for role, by_category in json.load(f).items():
+                    self._add_role(conn, canonical_role(role), by_category, "seed")
+            conn.commit()
+        self._load_skills(conn)
+        for name, required in conn.execute("SELECT name, required FROM roles"):
+            self._roles[name] = int.from_bytes(required, "little")
+        self._loaded = True
+
+    def _load_skills(self, conn):
+        for skill_id, name, category in conn.execute(
+                "SELECT id, name, category FROM skills WHERE id > ?", (max(self._skills, default=0),)):
+            self._skills[skill_id] = (name, category)
+            self._skill_ids[name] = skill_id
+
+    def _skill_id(self, conn, name, category):
+        skill_id = self._skill_ids.get(name)
+        if skill_id is None:
+            conn.execute("INSERT OR IGNORE INTO skills (name, category) VALUES (?, ?)", (name, category))
+            skill_id, category = conn.execute("SELECT id, category FROM skills WHERE name = ?", (name,)).fetchone()
+            self._skills[skill_id] = (name, category)
+            self._skill_ids[name] = skill_id
+        return skill_id
+
+    def _add_role(self, conn, role, by_category, source):
+        bits = 0
+        for category, skills in by_category.items():
+            category = category if category in CATEGORIES else CATEGORIES[0]
+            for skill in skills:
+                name = skill_name(skill)
+                if name:
+                    bits |= 1 << self._skill_id(conn, name, category)
+        conn.execute("""
+            INSERT INTO roles (name, required, source, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET required = excluded.required, source = excluded.source,
+                                             updated_at = excluded.updated_at
+        """, (role, bits.to_bytes(max(1, (bits.bit_length() + 7) // 8), "little"), source, time.time()))
+        self._roles[role] = bits
+        return bits
+
+    def _count(self, outcome):
+        self._stats[outcome] += 1
+        metrics.inc("role_skills_lookups_total", outcome={"hits": "hit", "misses": "miss"}.get(outcome, outcome))
+
+    def required(self, role):
+        """Bitset of the skills `role` requires, or None if the role is unknown."""
+        name = canonical_role(role)
+        with self._lock:
+            self._load()
+            bits = self._roles.get(name)
+            if bits is None and name:
+                # Another worker may have learned the role since we loaded.
+                conn = self._connect()
+                row = conn.execute("SELECT required FROM roles WHERE name = ?", (name,)).fetchone()
+                if row:
+                    self._load_skills(conn)
+                    bits = self._roles[name] = int.from_bytes(row[0], "little")
+        return bits
+
+    def learn(self, role, by_category, source="llm"):
+        """Store `role`'s required skills ({category: [skill, ...]}) and return its bitset."""
+        with self._lock:
+            conn = self._connect()
+            self._load()
+            bits = self._add_role(conn, canonical_role(role), by_category, source)
+            conn.commit()
+            self._count("learned")
+        return bits
+
+    def _candidate_bits(self, candidate_skills):
+        if not isinstance(candidate_skills, str):
+            candidate_skills = "\n".join(candidate_skills or [])
+        names, text = candidate_names(candidate_skills)
+        bits = 0
+        for name in names:
+            skill_id = self._skill_ids.get(name)
+            if skill_id is not None:
+                bits |= 1 << skill_id
+        return bits, text
+
+    def missing(self, role, candidate_skills):
+        """
+        {category: [skill, ...]} that `role` requires and the candidate
+        skills (a list or free text) lack, or None if the role is unknown.
+        """
+        bits = self.required(role)
+        with self._lock:
+            if bits is None:
+                self._count("misses")
+                return None
+            self._count("hits")
+            have, text = self._candidate_bits(candidate_skills)
+            lacking = bits & ~have
+            result = {category: [] for category in CATEGORIES}
+            while lacking:
+                lowest = lacking & -lacking
+                lacking ^= lowest
+                name, category = self._skills[lowest.bit_length() - 1]
+                # Skills outside the vocabulary may still be named verbatim.
+                if f" {name} " not in text:
+                    result[category].append(name)
+        return result
+
+    def add_from_jobs(self, jobs_path, min_postings=ROLE_MIN_POSTINGS, share=ROLE_SKILL_SHARE):
+        """Learn roles from stored job postings; returns the roles added or updated."""
+        postings = Counter()
+        skills = {}
+        with sqlite3.connect(jobs_path) as jobs:
+            for title, requirements in jobs.execute("SELECT title, requirements FROM jobs"):
+                role = canonical_role(title)
+                if role and requirements:
+                    postings[role] += 1
+                    skills.setdefault(role, Counter()).update(requirements.split("|"))
+        added = []
+        with self._lock:
+            conn = self._connect()
+            self._load()
+            for role, count in postings.items():
+                if count < min_postings:
+                    continue
+                by_category = {}
+                for skill, seen in skills[role].items():
+                    if seen / count >= share:
+                        known = self._skill_ids.get(skill)
+                        category = self._skills[known][1] if known else CATEGORIES[0]
+                        by_category.setdefault(category, []).append(skill)
+                if by_category:
+                    self._add_role(conn, role, by_category, "jobs")
+                    added.append(role)
+            conn.commit()
+        return added
+
+    def stats(self):
+        with self._lock:
+            self._load()
+            sources = dict(self._connect().execute("SELECT source, COUNT(*) FROM roles GROUP BY source").fetchall())
+            return {"roles": len(self._roles), "skills": len(self._skills), "sources": sources, **self._stats}
+
+
+role_index = RoleSkillIndex()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Role knowledge base of required skills")
+    parser.add_argument("--db", default=ROLE_SKILLS_DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="load the seed, job postings and/or model answers into the index")
+    build.add_argument("--seed", default=ROLE_SKILLS_SEED_PATH)
+    build.add_argument("--jobs", help="jobs SQLite database (files.job_store) to learn roles from")
+    build.add_argument("--roles", help="file of role titles, one per line, to ask the model about")
+    missing = sub.add_parser("missing", help="missing skills of a candidate for a role")
+    missing.add_argument("role")
+    missing.add_argument("skills", help="comma-separated candidate skills")
+    sub.add_parser("stats", help="roles and skills in the index")
+    args = parser.parse_args()
+
+    index = RoleSkillIndex(args.db, seed_path=getattr(args, "seed", ROLE_SKILLS_SEED_PATH))
+    start = time.perf_counter()
+    if args.command == "build":
+        print(f"seed: {index.stats()['roles']} roles")
+        if args.jobs:
+            print(f"jobs: {len(index.add_from_jobs(args.jobs))} roles from {args.jobs}")
+        if args.roles:
+            from files.missing_skills import learn_role
+            with open(args.roles, encoding="utf-8") as f:
+                titles = [line.strip() for line in f if line.strip()]
+            unknown = [title for title in titles if index.required(title) is None]
+            learned = sum(learn_role(title, index) for title in unknown)
+            print(f"model: learned {learned} of {len(unknown)} unknown roles")
+        print(f"{index.stats()} in {time.perf_counter() - start:.2f}s -> {args.db}")
+    elif args.command == "missing":
+        result = index.missing(args.role, args.skills)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(json.dumps(result, indent=2) if result is not None else f"unknown role: {canonical_role(args.role)}")
+        print(f"{elapsed:.2f} ms (including loading the index)")
+    else:
+        print(json.dumps(index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Second-tier cache that serves a stored response to a near-duplicate
+prompt.
+
+The exact cache (files.cache) keys on the normalized arguments, so
+"Sr. Data Scientist" misses after "data scientist", and so does a skills
+list that differs by one entry. Here the role argument is canonicalized
+(case, punctuation, seniority words, abbreviations such as "ML" or
+"SDE") and must match, and the remaining arguments are compared by
+MinHash over word and word-bigram shingles: a stored response is served
+when the estimated Jaccard similarity reaches SEMANTIC_CACHE_THRESHOLD.
+Candidates are found through LSH band buckets, so a lookup reads only
+the few rows that share a band with the prompt.
+
+Stages whose prompt asks for variety (interview questions) pass
+`variants=N`: each group of near-duplicate prompts collects N different
+responses first, and only then are they served, picked at random. Inside
+files.cache.fresh() (a request sent with form_data "fresh") nothing is
+served from this cache, though new responses still go into groups that
+are not yet full.
+
+Hit rate and the distribution of best similarities are in `stats()`,
+GET /semantic_cache_stats and /metrics.
+"""
+import functools
+import inspect
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from files.cache import CACHE_TTL_SECONDS, ERROR_PREFIX, fresh_requested, make_key, normalize_text
+from files.metrics import metrics, trace_event
+from files.skill_terms import STOPWORDS, canonical_role, expand_words
+
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() != "false"
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", os.path.join("cache", "semantic_cache.sqlite3"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_VARIANTS = int(os.getenv("SEMANTIC_CACHE_VARIANTS", "3"))
+
+# 16 bands of 4 rows: pairs at 0.8 similarity share a band 99.9% of the
+# time, pairs at 0.4 about 34%, so few non-matches are scored.
+NUM_PERM = 64
+BANDS = 16
+_MERSENNE = (1 << 31) - 1
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, _MERSENNE, NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, _MERSENNE, NUM_PERM).astype(np.uint64)
+
+SIMILARITY_BINS = 10
+metrics.histogram("semantic_cache_similarity", (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0))
+
+
+def shingles(text):
+    """Word and word-bigram shingles of `text`."""
+    words = [word for word in expand_words(text) if word not in STOPWORDS]
+    found = set(words)
+    found.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return found or {""}
+
+
+def signature(text):
+    """NUM_PERM-value MinHash signature of `text`'s shingles."""
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+    hashes %= _MERSENNE
+    return ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE).min(axis=0).astype(np.uint32)
+
+
+def band_buckets(sig):
+    rows = NUM_PERM // BANDS
+    return [band << 32 | zlib.crc32(sig[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
+
+class SemanticCache:
+    """
+    Near-duplicate response store in SQLite: one row per response, with
+    its scope (stage, model and prompt version), canonical role and
+    MinHash signature, plus LSH band rows pointing at it. Rows expire
+    after `ttl` and the least recently used go first past `max_entries`.
+    """
+
+    def __init__(self, path=SEMANTIC_CACHE_PATH, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, enabled=SEMANTIC_CACHE_ENABLED):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS semantic_cache (
+                    id INTEGER PRIMARY KEY,
+                    scope TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS semantic_cache_accessed ON semantic_cache (accessed_at);
+                CREATE TABLE IF NOT EXISTS semantic_bands (
+                    scope TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    entry_id INTEGER NOT NULL REFERENCES semantic_cache (id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS semantic_bands_lookup ON semantic_bands (scope, role, bucket);
+                CREATE INDEX IF NOT EXISTS semantic_bands_entry ON semantic_bands (entry_id);
+            """)
+        return self._conn
+
+    def _record(self, stage, outcome, similarity=None):
+        with self._lock:
+            entry = self._stats.setdefault(stage, {
+                "lookups": 0, "hits": 0, "misses": 0, "fresh": 0, "stored": 0,
+                "similarity": [0] * SIMILARITY_BINS,
+            })
+            entry[outcome] += 1
+            if outcome != "stored":
+                entry["lookups"] += 1
+            if similarity is not None:
+                entry["similarity"][min(int(similarity * SIMILARITY_BINS), SIMILARITY_BINS - 1)] += 1
+        metrics.inc("semantic_cache_requests_total", stage=stage,
+                    outcome={"hits": "hit", "misses": "miss"}.get(outcome, outcome))
+        if similarity is not None:
+            metrics.observe("semantic_cache_similarity", similarity, stage=stage)
+
+    def lookup(self, stage, scope, role, sig, variants=1, serve=True):
+        """
+        (value, group_size): a stored response for a near-duplicate of
+        (role, sig), or None, and how many stored responses are within the
+        threshold. With `variants` > 1 a response is only served once the
+        group holds that many.
+        """
+        start = time.perf_counter()
+        buckets = band_buckets(sig)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(f"""
+                SELECT DISTINCT e.id, e.signature, e.value FROM semantic_bands b
+                JOIN semantic_cache e ON e.id = b.entry_id
+                WHERE b.scope = ? AND b.role = ? AND b.bucket IN ({",".join("?" * len(buckets))})
+                  AND e.created_at >= ?
+            """, (scope, role, *buckets, now - self.ttl)).fetchall()
+        similarity = 0.0
+        group = []
+        if rows:
+            stored = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint32).reshape(len(rows), NUM_PERM)
+            scores = (stored == sig).mean(axis=1)
+            similarity = float(scores.max())
+            group = [row for row, score in zip(rows, scores) if score >= self.threshold]
+
+        value = None
+        if not serve:
+            outcome = "fresh"
+        elif group and len(group) >= variants:
+            entry_id, _, value = random.choice(group)
+            outcome = "hits"
+            with self._lock:
+                conn = self._connect()
+                conn.execute("UPDATE semantic_cache SET accessed_at = ? WHERE id = ?", (now, entry_id))
+                conn.commit()
+        else:
+            outcome = "misses"
+        self._record(stage, outcome, similarity)
+        trace_event(f"semantic_cache.{stage}", start, time.perf_counter() - start,
+                    outcome=outcome, similarity=round(similarity, 3))
+        return value, len(group)
+
+    def store(self, stage, scope, role, sig, value):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            entry_id = conn.execute(
+                "INSERT INTO semantic_cache (scope, role, signature, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, role, sig.tobytes(), value, now, now),
+            ).lastrowid
+            conn.executemany("INSERT INTO semantic_bands VALUES (?, ?, ?, ?)",
+                             [(scope, role, bucket, entry_id) for bucket in band_buckets(sig)])
+            self._evict(conn, now)
+            conn.commit()
+        self._record(stage, "stored")
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM semantic_cache WHERE created_at < ?", (now - self.ttl,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM semantic_cache").fetchone()
+        if count > self.max_entries:
+            conn.execute("""
+                DELETE FROM semantic_cache WHERE id IN (
+                    SELECT id FROM semantic_cache ORDER BY accessed_at ASC LIMIT ?
+                )
+            """, (count - self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM semantic_cache")
+            conn.commit()
+            self._stats = {}
+
+    def stats(self):
+        """Per-stage lookups, hit rate and best-similarity histogram (bins of 0.1)."""
+        with self._lock:
+            (count,) = self._connect().execute("SELECT COUNT(*) FROM semantic_cache").fetchone()
+            stages = {}
+            for stage, entry in self._stats.items():
+                served = entry["lookups"] - entry["fresh"]
+                stages[stage] = {
+                    **{k: v for k, v in entry.items() if k != "similarity"},
+                    "hit_rate": round(entry["hits"] / served, 4) if served else 0.0,
+                    "similarity": {f"{i / SIMILARITY_BINS:.1f}-{(i + 1) / SIMILARITY_BINS:.1f}": n
+                                   for i, n in enumerate(entry["similarity"])},
+                }
+        return {"entries": count, "threshold": self.threshold, "enabled": self.enabled, "stages": stages}
+
+
+semantic_cache = SemanticCache()
+
+
+def stats():
+    return semantic_cache.stats()
+
+
+def semantic_cached(stage, model, prompt_version, role_arg=0, variants=1):
+    """
+    Serve near-duplicate calls of a generator from `semantic_cache`.
+    Argument `role_arg` is matched by canonical role, the others by
+    MinHash similarity. Error strings are never stored. Plain and
+    coroutine functions are both supported. The wrapper's
+    `semantic_lookup(*args)` and `semantic_store(found, result)` let a
+    streamed completion read and fill the same store.
+    """
+    scope = make_key(stage, model, prompt_version)
+
+    def lookup(args):
+        role = canonical_role(args[role_arg] if len(args) > role_arg else "")
+        sig = signature(" ".join(normalize_text(a) for i, a in enumerate(args) if i != role_arg and a))
+        value, group_size = semantic_cache.lookup(stage, scope, role, sig, variants, serve=not fresh_requested())
+        return value, (role, sig, group_size)
+
+    def store(found, result):
+        if found is None:
+            return result
+        role, sig, group_size = found
+        # A group only collects as many responses as it serves from.
+        if isinstance(result, str) and not result.startswith(ERROR_PREFIX) and group_size < variants:
+            semantic_cache.store(stage, scope, role, sig, result)
+        return result
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args):
+                if not semantic_cache.enabled:
+                    return await fn(*args)
+                value, found = lookup(args)
+                return value if value is not None else store(found, await fn(*args))
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args):
+                if not semantic_cache.enabled:
+                    return fn(*args)
+                value, found = lookup(args)
+                return value if value is not None else store(found, fn(*args))
+        wrapper.semantic_lookup = lambda *args: lookup(args) if semantic_cache.enabled else (None, None)
+        wrapper.semantic_store = store
+        return wrapper
+    return decorator
@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from files.metrics import timed
+
+
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join("cache", "sessions.sqlite3"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+SESSION_MAX_PER_USER = int(os.getenv("SESSION_MAX_PER_USER", "10"))
+
+
+class SessionStore:
+    """
+    Server-side store for uploaded resumes, one row per session_id.
+
+    The browser cookie only carries an owner id; each request loads just
+    the row it asks for, so request cost does not grow with upload
+    history. Rows expire after `ttl` seconds of inactivity and each owner
+    keeps at most `max_per_user` sessions (oldest dropped first).
+    """
+
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL_SECONDS,
+                 max_per_user=SESSION_MAX_PER_USER):
+        self.path = path
+        self.ttl = ttl
+        self.max_per_user = max_per_user
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS resume_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    sha256 TEXT,
+                    resume_text TEXT NOT NULL,
+                    form_data TEXT,
+                    pages TEXT,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS resume_sessions_owner "
+                "ON resume_sessions (owner, accessed_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS resume_sessions_accessed "
+                "ON resume_sessions (accessed_at)"
+            )
+        return self._conn
+
+    @timed("session.create")
+    def create(self, owner, resume_text, form_data=None, pages=None, sha256=None):
+        """
+        Store an upload and return its session_id. Re-uploading a file the
+        owner already has (same sha256) refreshes that session instead.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = None
+            if sha256:
+                row = conn.execute(
+                    "SELECT session_id FROM resume_sessions WHERE owner = ? AND sha256 = ? "
+                    "AND accessed_at >= ?",
+                    (owner, sha256, now - self.ttl),
+                ).fetchone()
+            session_id = row[0] if row else str(uuid.uuid4())
+            conn.execute(
+                "INSERT OR REPLACE INTO resume_sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, owner, sha256, resume_text, json.dumps(form_data),
+                 json.dumps(pages), now, now),
+            )
+            self._enforce_limits(conn, owner, now)
+            conn.commit()
+        return session_id
+
+    @timed("session.get")
+    def get(self, session_id, owner):
+        """Load one session for its owner, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT resume_text, form_data, pages, sha256, accessed_at FROM resume_sessions "
+                "WHERE session_id = ? AND owner = ?",
+                (session_id, owner),
+            ).fetchone()
+            if row is None or now - row[4] > self.ttl:
+                return None
+            conn.execute(
+                "UPDATE resume_sessions SET accessed_at = ? WHERE session_id = ?",
+                (now, session_id),
+            )
+            conn.commit()
+        return {
+            "resume_text": row[0],
+            "form_data": json.loads(row[1]) if row[1] else None,
+            "pages": json.loads(row[2]) if row[2] else None,
+            "sha256": row[3],
+        }
+
+    def _enforce_limits(self, conn, owner, now):
+        conn.execute("DELETE FROM resume_sessions WHERE accessed_at < ?", (now - self.ttl,))
+        conn.execute("""
+            DELETE FROM resume_sessions WHERE owner = ? AND session_id NOT IN (
+                SELECT session_id FROM resume_sessions WHERE owner = ?
+                ORDER BY accessed_at DESC LIMIT ?
+            )
+        """, (owner, owner, self.max_per_user))
+
+    @timed("session.delete")
+    def delete(self, session_id, owner):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "DELETE FROM resume_sessions WHERE session_id = ? AND owner = ?",
+                (session_id, owner),
+            )
+            conn.commit()
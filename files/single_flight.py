@@ -0,0 +1,210 @@
+"""
+Single-flight coalescing for LLM generators.
+
+Concurrent calls to a wrapped generator with the same normalized
+arguments share one completion: the first caller (the leader) runs it,
+the others wait for its result instead of sending the same prompt again.
+Only calls that overlap are coalesced; once the leader finishes, the next
+call runs afresh (result reuse is the cache's job, see files.cache).
+
+Within a process callers wait on a threading.Event. When
+SINGLE_FLIGHT_DB_PATH is set, flights are also claimed in a SQLite table
+there, so gunicorn workers (or any processes sharing the file) coalesce
+too; waiters in other processes poll the row until the leader stores its
+result. A leader that dies is taken over after SINGLE_FLIGHT_TIMEOUT_SECONDS.
+
+Coroutine generators (the ASGI server's) coalesce on an asyncio future
+per key instead, within their event loop only.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from files.cache import make_key, normalize_text
+from files.metrics import metrics
+
+
+SINGLE_FLIGHT_DB_PATH = os.getenv("SINGLE_FLIGHT_DB_PATH")
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "300"))
+POLL_SECONDS = (0.02, 0.5)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls per key. `path` enables the cross-process
+    mode; None keeps coalescing within this process only.
+    """
+
+    def __init__(self, path=SINGLE_FLIGHT_DB_PATH, timeout=SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.path = path
+        self.timeout = timeout
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}
+
+    def _connect(self):
+        # One connection per thread; BEGIN IMMEDIATE serializes the claim.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS flights (
+                    key TEXT PRIMARY KEY,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    value TEXT,
+                    error TEXT
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, stage, outcome):
+        with self._lock:
+            counters = self._stats.setdefault(stage, {"leader": 0, "waited": 0, "waited_remote": 0})
+            counters[outcome] += 1
+        metrics.inc("single_flight_calls_total", stage=stage, outcome=outcome)
+
+    def do(self, stage, key, fn):
+        """Return fn(), or the result of an identical call already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            self._count(stage, "waited")
+            call.done.wait()
+        else:
+            try:
+                call.value = self._run_shared(stage, key, fn) if self.path else fn()
+                if not self.path:
+                    self._count(stage, "leader")
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    async def ado(self, stage, key, fn):
+        """Return await fn(), or the result of an identical coroutine call already in flight."""
+        call = self._async_calls.get(key)
+        if call is not None:
+            self._count(stage, "waited")
+            # Shielded so a waiter that is cancelled does not cancel the leader.
+            return await asyncio.shield(call)
+        call = self._async_calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await fn()
+            self._count(stage, "leader")
+            call.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            call.exception()  # Retrieved here, so a flight without waiters logs nothing.
+            raise
+        finally:
+            self._async_calls.pop(key, None)
+
+    def _claim(self, key):
+        """(True, started_at) if this process leads the flight, else (False, started_at)."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT started_at, finished_at FROM flights WHERE key = ?", (key,)).fetchone()
+            if row and row[1] is None and now - row[0] < self.timeout:
+                return False, row[0]
+            conn.execute("INSERT OR REPLACE INTO flights VALUES (?, ?, NULL, NULL, NULL)", (key, now))
+            # Finished flights are only kept long enough for their waiters.
+            conn.execute("DELETE FROM flights WHERE finished_at < ?", (now - self.timeout,))
+            return True, now
+        finally:
+            conn.execute("COMMIT")
+
+    def _run_shared(self, stage, key, fn):
+        conn = self._connect()
+        while True:
+            leader, started_at = self._claim(key)
+            if leader:
+                self._count(stage, "leader")
+                try:
+                    value = fn()
+                except Exception as e:
+                    conn.execute("UPDATE flights SET finished_at = ?, error = ? WHERE key = ? AND started_at = ?",
+                                 (time.time(), f"{type(e).__name__}: {e}", key, started_at))
+                    raise
+                conn.execute("UPDATE flights SET finished_at = ?, value = ? WHERE key = ? AND started_at = ?",
+                             (time.time(), json.dumps(value), key, started_at))
+                return value
+
+            self._count(stage, "waited_remote")
+            delay = POLL_SECONDS[0]
+            while True:
+                time.sleep(delay)
+                delay = min(delay * 2, POLL_SECONDS[1])
+                row = conn.execute("SELECT started_at, finished_at, value, error FROM flights WHERE key = ?",
+                                   (key,)).fetchone()
+                if row is None or row[0] != started_at:
+                    break  # Leader was replaced; claim again.
+                if row[1] is not None:
+                    if row[3] is not None:
+                        raise RuntimeError(f"coalesced call failed: {row[3]}")
+                    return json.loads(row[2])
+                if time.time() - started_at >= self.timeout:
+                    break  # Leader presumed dead; take over.
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": "process" if self.path else "thread",
+                "in_flight": len(self._calls) + len(self._async_calls),
+                "stages": {stage: dict(counters) for stage, counters in self._stats.items()},
+            }
+
+
+flights = SingleFlight()
+
+
+def single_flight(stage):
+    """
+    Coalesce concurrent calls of a generator whose arguments normalize to
+    the same text (see files.cache.normalize_text).
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args):
+                key = make_key("flight", stage, *[normalize_text(a) for a in args])
+                return await flights.ado(stage, key, lambda: fn(*args))
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args):
+                key = make_key("flight", stage, *[normalize_text(a) for a in args])
+                return flights.do(stage, key, lambda: fn(*args))
+        return wrapper
+    return decorator
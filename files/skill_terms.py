@@ -0,0 +1,125 @@
+import functools
+import json
+import os
+import re
+from collections import Counter
+
+
+ALIASES_PATH = os.path.join(os.path.dirname(__file__), "skill_aliases.json")
+MAX_PHRASE_WORDS = 3
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+WORD_SEPARATORS = re.compile(r"[-/._]")
+
+SENIORITY_WORDS = frozenset("""
+sr senior jr junior lead principal staff associate intern internship trainee
+entry level mid i ii iii iv head chief
+""".split())
+ROLE_ALIASES = {
+    "sde": "software engineer",
+    "swe": "software engineer",
+    "dev": "developer",
+    "eng": "engineer",
+    "engg": "engineer",
+    "mgr": "manager",
+    "ds": "data scientist",
+    "de": "data engineer",
+}
+
+STOPWORDS = frozenset("""
+a about above across after again against all also am an and any are as at be because been
+before being below between both but by can could did do does doing down during each etc
+few for from further had has have having he her here hers him his how i if in into is it
+its itself just may me more most must my no nor not of off on once only or other our ours
+out over own per same she should so some such than that the their theirs them then there
+these they this those through to too under until up upon us use used using very via was
+we well were what when where which while who whom why will with within without would you
+your yours
+ability able candidate candidates company experience experienced year years role roles
+team teams work working job jobs position responsibilities responsibility requirement
+requirements required preferred plus strong good excellent knowledge understanding skills
+skill including include includes new looking join opportunity based etc familiarity
+familiar hands proficiency proficient solid degree related field fields across various
+""".split())
+
+
+@functools.lru_cache(maxsize=1)
+def alias_map():
+    """Map every alias phrase (and each canonical name) to its canonical skill."""
+    with open(ALIASES_PATH, encoding="utf-8") as f:
+        aliases = json.load(f)
+    mapping = {}
+    for canonical, names in aliases.items():
+        for name in [canonical] + names:
+            mapping[" ".join(tokenize(name))] = canonical
+    return mapping
+
+
+@functools.lru_cache(maxsize=1)
+def skill_vocabulary():
+    return frozenset(alias_map().values())
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def stem(token):
+    """Cheap plural folding so 'pipelines' and 'pipeline' match."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def canonical_skill(phrase):
+    """Canonical skill name for a free-text skill, or None if unknown."""
+    return alias_map().get(" ".join(tokenize(phrase)))
+
+
+def expand_words(text):
+    """Tokens of `text` with separators split and aliases expanded ('ML' -> 'machine', 'learning')."""
+    aliases = alias_map()
+    words = []
+    for token in tokenize(WORD_SEPARATORS.sub(" ", text or "")):
+        words.extend(ROLE_ALIASES.get(token, aliases.get(token, token)).split())
+    return words
+
+
+@functools.lru_cache(maxsize=4096)
+def canonical_role(role):
+    """'Sr. ML-Engineer' -> 'machine learning engineer'."""
+    words = [word for word in expand_words(role) if word not in SENIORITY_WORDS]
+    return " ".join(dict.fromkeys(words))
+
+
+def extract_terms(text):
+    """
+    Count the terms in a text: known skills (longest alias phrase first,
+    mapped to canonical names) plus remaining content keywords.
+    """
+    tokens = tokenize(text or "")
+    mapping = alias_map()
+    terms = Counter()
+    used = [False] * len(tokens)
+
+    for n in range(MAX_PHRASE_WORDS, 0, -1):
+        for i in range(len(tokens) - n + 1):
+            if any(used[i:i + n]):
+                continue
+            canonical = mapping.get(" ".join(tokens[i:i + n]))
+            if canonical:
+                terms[canonical] += 1
+                used[i:i + n] = [True] * n
+
+    for token, is_used in zip(tokens, used):
+        if not is_used and len(token) > 2 and token not in STOPWORDS and not token.isdigit():
+            terms[stem(token)] += 1
+    return terms
+
+
+def extract_skills(text):
+    """Canonical skills mentioned in a text, most frequent first."""
+    vocabulary = skill_vocabulary()
+    return [term for term, _ in extract_terms(text).most_common() if term in vocabulary]
@@ -0,0 +1,50 @@
+import json
+
+from files.cache import llm_cache
+from files.llm_backend import get_backend
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_completion(messages, model, cached_fn=None, cache_args=(), finalize=None, local_fn=None):
+    """
+    Yield SSE frames for one chat completion: a `token` event per chunk,
+    then a `result` event and a closing `done`. `finalize` turns the full
+    text into the result payload; without it the raw text is sent.
+
+    When `cached_fn` is a `cached_stage` and/or `semantic_cached`
+    generator, an answer from those caches for `cache_args` is sent as a
+    single token and a fresh answer is written back to them. `local_fn()`
+    may answer without the model (text, or None to stream); its answer is
+    sent the same way.
+    """
+    key = cached_fn.cache_key(*cache_args) if hasattr(cached_fn, "cache_key") else None
+    text = local_fn() if local_fn else None
+    if text is None and key is not None:
+        text = llm_cache.get(cached_fn.stage, key)
+    found = None
+    if text is None and hasattr(cached_fn, "semantic_lookup"):
+        text, found = cached_fn.semantic_lookup(*cache_args)
+
+    if text is not None:
+        yield sse_event("token", {"text": text})
+    else:
+        chunks = []
+        try:
+            for chunk in get_backend().stream(messages, model):
+                chunks.append(chunk)
+                yield sse_event("token", {"text": chunk})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+            return
+        text = "".join(chunks)
+        if key is not None:
+            llm_cache.set(cached_fn.stage, key, text)
+        if found is not None:
+            cached_fn.semantic_store(found, text)
+
+    yield sse_event("result", finalize(text) if finalize else {"text": text})
+    yield sse_event("done", {})
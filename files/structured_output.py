@@ -0,0 +1,257 @@
+import json
+import os
+import re
+
+from files.cache import ERROR_PREFIX
+from files.llm_backend import get_backend
+
+
+REPAIR_MODEL = os.getenv("REPAIR_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
+
+STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+SECTIONS = {
+    "type": "object",
+    "properties": {
+        name: {"type": "string"} for name in (
+            "Name and Contact Information", "Introduction/Summary", "Experience",
+            "Projects", "Education", "Skills", "Certifications",
+        )
+    },
+}
+
+SCHEMAS = {
+    "sections": SECTIONS,
+    "skills": STRING_LIST,
+    "sections_skills": {
+        "type": "object",
+        "properties": {"sections": SECTIONS, "skills": STRING_LIST},
+        "required": ["skills"],
+    },
+    "missing_skills": {
+        "type": "object",
+        "properties": {
+            "Core Technical Skills": STRING_LIST,
+            "Programming Languages/Frameworks": STRING_LIST,
+            "Tools & Platforms": STRING_LIST,
+        },
+        # Extra categories the model adds must be skill lists too.
+        "additionalProperties": STRING_LIST,
+    },
+    "ats_score": {
+        "type": "object",
+        "properties": {
+            "ATS Score": {"type": "integer", "minimum": 0, "maximum": 100},
+            "Explanation": {"type": "string"},
+        },
+        "required": ["ATS Score"],
+    },
+    "interview": {
+        "type": "object",
+        "properties": {
+            "DSA and Core CS questions": STRING_LIST,
+            "Technical_Skills questions": STRING_LIST,
+            "Role Specific questions": STRING_LIST,
+            "HR Round questions": STRING_LIST,
+        },
+    },
+}
+
+_TYPES = {
+    "object": dict, "array": list, "string": str,
+    "integer": int, "number": (int, float), "boolean": bool,
+}
+
+_CLOSERS = {"{": "}", "[": "]"}
+_NUMBERED_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+(.*\S)\s*$")
+
+
+def validate(value, schema, path="$"):
+    """Check `value` against the small JSON-schema subset used here."""
+    errors = []
+    expected = _TYPES[schema["type"]]
+    if not isinstance(value, expected) or (schema["type"] == "integer" and isinstance(value, bool)):
+        return [f"{path}: expected {schema['type']}"]
+    if schema["type"] == "object":
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}: missing {key!r}")
+        properties = schema.get("properties", {})
+        for key, sub in properties.items():
+            if key in value:
+                errors.extend(validate(value[key], sub, f"{path}.{key}"))
+        extra = schema.get("additionalProperties", True)
+        for key in value.keys() - properties.keys():
+            if extra is False:
+                errors.append(f"{path}: unexpected {key!r}")
+            elif extra is not True:
+                errors.extend(validate(value[key], extra, f"{path}.{key}"))
+    elif schema["type"] == "array":
+        for i, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    elif schema["type"] in ("integer", "number"):
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{path}: below {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{path}: above {schema['maximum']}")
+    return errors
+
+
+def extract_json(text):
+    """
+    Pull the first JSON value out of model output in a single pass:
+    skips prose and ``` fences, tracks strings and brackets, and closes
+    whatever is still open if the completion was cut off. Returns the
+    candidate JSON text or None.
+    """
+    start = next((i for i, ch in enumerate(text) if ch in "{["), None)
+    if start is None:
+        return None
+    stack = []
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            if stack and stack[-1] == ch:
+                stack.pop()
+            if not stack:
+                return text[start:i + 1]
+    # Truncated output: close the open string and brackets.
+    tail = '"' if in_string else ""
+    return text[start:].rstrip().rstrip(",") + tail + "".join(reversed(stack))
+
+
+def _local_fixes(candidate):
+    fixed = candidate.replace("“", '"').replace("”", '"').replace("’", "'")
+    fixed = re.sub(r",\s*([}\]])", r"\1", fixed)
+    fixed = re.sub(r"\bTrue\b", "true", re.sub(r"\bFalse\b", "false", re.sub(r"\bNone\b", "null", fixed)))
+    return fixed
+
+
+def _numbered_list(text):
+    items = [m.group(1) for m in map(_NUMBERED_ITEM.match, text.splitlines()) if m]
+    if not items and "," in text and "\n" not in text.strip():
+        items = [part.strip() for part in text.split(",") if part.strip()]
+    return items or None
+
+
+def _clean_item(item):
+    if isinstance(item, str):
+        match = _NUMBERED_ITEM.match(item)
+        return match.group(1) if match else item.strip()
+    return item if not isinstance(item, (dict, list)) else json.dumps(item)
+
+
+def coerce(value, schema):
+    """
+    Targeted local repair towards the schema: fill missing keys, strip
+    list numbering, parse numeric strings and wrap stray scalars.
+    """
+    kind = schema["type"]
+    if kind == "object":
+        if not isinstance(value, dict):
+            return value
+        result = dict(value)
+        properties = schema.get("properties", {})
+        for key, sub in properties.items():
+            if key in result:
+                result[key] = coerce(result[key], sub)
+            elif key not in schema.get("required", []):
+                result[key] = [] if sub["type"] == "array" else ""
+        extra = schema.get("additionalProperties", True)
+        if isinstance(extra, dict):
+            for key in result.keys() - properties.keys():
+                result[key] = coerce(result[key], extra)
+        return result
+    if kind == "array":
+        if isinstance(value, str):
+            value = _numbered_list(value) or [value]
+        if isinstance(value, dict):
+            # Categorised lists where a flat list was asked for.
+            value = [item for items in value.values() for item in (items if isinstance(items, list) else [items])]
+        if not isinstance(value, list):
+            return value
+        items = [coerce(_clean_item(item), schema["items"]) for item in value]
+        return [item for item in items if item not in ("", None)]
+    if kind == "string" and isinstance(value, (list, dict)):
+        return "\n".join(map(str, value)) if isinstance(value, list) else json.dumps(value)
+    if kind == "string" and value is None:
+        return ""
+    if kind in ("integer", "number") and isinstance(value, str):
+        match = re.search(r"-?\d+(?:\.\d+)?", value)
+        if match:
+            value = float(match.group())
+    if kind == "integer" and isinstance(value, float):
+        value = int(round(value))
+        if "maximum" in schema:
+            value = max(schema.get("minimum", value), min(schema["maximum"], value))
+    return value
+
+
+def parse_json_loose(text):
+    """Decode model output to a Python value, or None if nothing parses."""
+    candidate = extract_json(text)
+    if candidate is not None:
+        for attempt in (candidate, _local_fixes(candidate)):
+            try:
+                return json.loads(attempt)
+            except ValueError:
+                pass
+    return _numbered_list(text)
+
+
+def _repair_prompt(text, schema, errors):
+    return [{
+        "role": "user",
+        "content": (
+            "Fix this JSON so it matches the schema. Return only the JSON.\n"
+            f"Schema: {json.dumps(schema)}\n"
+            f"Problems: {'; '.join(errors[:5])}\n"
+            f"JSON:\n{text[:4000]}"
+        ),
+    }]
+
+
+def parse_feature_output(feature, text, repair=True):
+    """
+    Turn a raw completion into a schema-valid value for `feature`.
+
+    Local parsing and coercion come first; only if the result is still
+    invalid is a short "fix this JSON" prompt sent to REPAIR_MODEL, never
+    a rerun of the original generation. A generator error string is
+    returned as the error without a repair call. Returns (value, errors);
+    `errors` is empty when the value is valid.
+    """
+    if text and text.startswith(ERROR_PREFIX):
+        return None, [text]
+    schema = SCHEMAS[feature]
+    value = parse_json_loose(text or "")
+    if value is not None:
+        value = coerce(value, schema)
+        errors = validate(value, schema)
+    else:
+        errors = ["no JSON found in output"]
+    if not errors or not repair or not text:
+        return value, errors
+
+    try:
+        fixed = get_backend().chat(_repair_prompt(text, schema, errors), REPAIR_MODEL)
+    except Exception as e:
+        return value, errors + [f"repair failed: {e}"]
+    repaired = parse_json_loose(fixed)
+    if repaired is None:
+        return value, errors
+    repaired = coerce(repaired, schema)
+    repaired_errors = validate(repaired, schema)
+    return (repaired, repaired_errors) if len(repaired_errors) <= len(errors) else (value, errors)
@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from files.cache import CACHE_TTL_SECONDS
+from files.metrics import metrics, timed
+from files.pdf_extract import (PDF_EXTRACT_MODE, aextract_pages, check_limits, disk_path, extract_pages,
+                               join_pages)
+
+
+UPLOAD_CACHE_DIR = os.getenv("UPLOAD_CACHE_DIR", os.path.join("cache", "uploads"))
+# Uploads up to this size are handed to worker processes as bytes;
+# larger ones by path. app.py spools request bodies with the same limit.
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(512 * 1024)))
+HASH_CHUNK_SIZE = 64 * 1024
+# Records unused for the TTL are dropped, then the least recently used
+# past the entry cap. A hit refreshes the record's mtime.
+UPLOAD_CACHE_TTL_SECONDS = int(os.getenv("UPLOAD_CACHE_TTL_SECONDS", str(CACHE_TTL_SECONDS)))
+UPLOAD_CACHE_MAX_ENTRIES = int(os.getenv("UPLOAD_CACHE_MAX_ENTRIES", "5000"))
+# The directory is scanned for eviction once per this many stores.
+EVICT_EVERY_STORES = 64
+
+_stats = {"uploads": 0, "hits": 0, "bytes_saved": 0}
+_stats_lock = threading.Lock()
+_stores = 0
+_evict_lock = threading.Lock()
+
+
+def hash_upload(source):
+    """
+    SHA-256 and size of a path or binary file object, read in chunks so
+    the upload is never buffered whole. File objects are rewound.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fp = open(source, "rb") if isinstance(source, str) else source
+    try:
+        fp.seek(0)
+        for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    finally:
+        if fp is source:
+            fp.seek(0)
+        else:
+            fp.close()
+    return digest.hexdigest(), size
+
+
+def _cache_path(file_hash, mode):
+    return os.path.join(UPLOAD_CACHE_DIR, file_hash[:2], f"{file_hash}.{mode}.json")
+
+
+def _record(name, value=1):
+    with _stats_lock:
+        _stats[name] += value
+
+
+def _cached_record(file_hash, size, mode):
+    path = _cache_path(file_hash, mode)
+    _record("uploads")
+    if not os.path.exists(path):
+        metrics.inc("upload_cache_requests_total", outcome="miss")
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            record = json.load(f)
+        os.utime(path)
+    except (OSError, ValueError):
+        # Evicted between the check and the read.
+        metrics.inc("upload_cache_requests_total", outcome="miss")
+        return None
+    _record("hits")
+    _record("bytes_saved", size)
+    metrics.inc("upload_cache_requests_total", outcome="hit")
+    return record
+
+
+def _store_record(file_hash, size, mode, pages):
+    record = {
+        "sha256": file_hash,
+        "bytes": size,
+        "mode": mode,
+        "text": join_pages(pages),
+        "pages": [
+            {"page": page_no + 1, "chars": len(text), "seconds": round(seconds, 4)}
+            for page_no, text, seconds in pages
+        ],
+    }
+
+    path = _cache_path(file_hash, mode)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    # Atomic rename so concurrent uploads of the same file never read a
+    # half-written record.
+    os.replace(tmp_path, path)
+    _maybe_evict()
+    return record
+
+
+def _maybe_evict():
+    global _stores
+    with _stats_lock:
+        _stores += 1
+        due = _stores % EVICT_EVERY_STORES == 1
+    if due and _evict_lock.acquire(blocking=False):
+        try:
+            evict()
+        finally:
+            _evict_lock.release()
+
+
+def evict(now=None):
+    """
+    Drop records unused for UPLOAD_CACHE_TTL_SECONDS, then the least
+    recently used past UPLOAD_CACHE_MAX_ENTRIES. Returns how many went.
+    """
+    now = now or time.time()
+    entries = []
+    for root, _, names in os.walk(UPLOAD_CACHE_DIR):
+        for name in names:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+    entries.sort()
+    expired = [path for mtime, path in entries if now - mtime > UPLOAD_CACHE_TTL_SECONDS]
+    remaining = len(entries) - len(expired)
+    overflow = [path for _, path in entries[len(expired):len(expired) + max(remaining - UPLOAD_CACHE_MAX_ENTRIES, 0)]]
+    removed = 0
+    for path in expired + overflow:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+@timed("upload.extract_with_cache")
+def extract_with_cache(source, mode=None):
+    """
+    Extract text and page metadata for an upload, reusing the on-disk
+    record for identical bytes. Returns (record, cache_hit); `record` has
+    sha256, bytes, text and pages [{page, chars, seconds}].
+    """
+    mode = mode or PDF_EXTRACT_MODE
+    file_hash, size = hash_upload(source)
+    record = _cached_record(file_hash, size, mode)
+    if record is not None:
+        return record, True
+    return _store_record(file_hash, size, mode, extract_pages(source, mode)), False
+
+
+def _worker_source(source, size):
+    """
+    (source for a worker process, temporary path to delete or None): a
+    path as is, an open file by its path on disk, a small upload as
+    bytes, and any other file copied in chunks to a temporary file.
+    """
+    if isinstance(source, str):
+        return source, None
+    path = disk_path(source)
+    if path:
+        return path, None
+    source.seek(0)
+    if size <= UPLOAD_SPOOL_BYTES:
+        return source.read(), None
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(source, out, HASH_CHUNK_SIZE)
+    return path, path
+
+
+@timed("upload.aextract_with_cache")
+async def aextract_with_cache(source, mode=None):
+    """
+    extract_with_cache for callers on an event loop: file I/O runs on the
+    loop's default executor and a cache miss is parsed in a worker
+    process (pdf_extract.aextract_pages), after the size and page limits
+    are checked here.
+    """
+    mode = mode or PDF_EXTRACT_MODE
+    file_hash, size = await asyncio.to_thread(hash_upload, source)
+    record = await asyncio.to_thread(_cached_record, file_hash, size, mode)
+    if record is not None:
+        return record, True
+    await asyncio.to_thread(check_limits, source)
+    worker_source, temp_path = await asyncio.to_thread(_worker_source, source, size)
+    try:
+        pages = await aextract_pages(worker_source, mode)
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+    return await asyncio.to_thread(_store_record, file_hash, size, mode, pages), False
+
+
+def stats():
+    """Dedupe counters: uploads seen, cache hits, hit rate and bytes saved."""
+    with _stats_lock:
+        result = dict(_stats)
+    result["hit_rate"] = round(result["hits"] / result["uploads"], 4) if result["uploads"] else 0.0
+    return result
@@ -7,6 +7,8 @@ class ResumeAnalyzer {
         this.analysisResults = {};
         this.processingStatus = {};
         this.apiBaseUrl = 'http://localhost:5000';
+        // Features served token by token from /analyze_feature/stream
+        this.streamingFeatures = ['skills'];
 
         this.init();
     }
@@ -204,7 +206,9 @@ class ResumeAnalyzer {
 
 
             const analysisPromises = features.map(feature =>
-                this.analyzeFeature(feature)
+                this.streamingFeatures.includes(feature)
+                    ? this.analyzeFeatureStream(feature)
+                    : this.analyzeFeature(feature)
             );
 
             await Promise.allSettled(analysisPromises);
@@ -262,6 +266,86 @@ class ResumeAnalyzer {
     }
 
 
+    async analyzeFeatureStream(featureType) {
+        try {
+            this.setFeatureStatus(featureType, 'processing');
+
+            const response = await fetch(`${this.apiBaseUrl}/analyze_feature/stream`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    session_id: this.sessionId,
+                    feature_type: featureType,
+                    form_data: this.formData,
+                }),
+            });
+
+            if (!response.ok || !response.body) {
+                throw new Error(`Feature stream failed: ${response.status}`);
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let partialText = '';
+            let results = null;
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                // SSE frames are separated by a blank line
+                const frames = buffer.split('\n\n');
+                buffer = frames.pop();
+
+                for (const frame of frames) {
+                    const eventLine = frame.split('\n').find(line => line.startsWith('event: '));
+                    const dataLine = frame.split('\n').find(line => line.startsWith('data: '));
+                    if (!eventLine || !dataLine) continue;
+
+                    const event = eventLine.slice(7);
+                    const data = JSON.parse(dataLine.slice(6));
+
+                    if (event === 'token') {
+                        partialText += data.text;
+                        this.showPartialOutput(featureType, partialText);
+                    } else if (event === 'result') {
+                        results = data;
+                    } else if (event === 'error') {
+                        throw new Error(data.error);
+                    }
+                }
+            }
+
+            if (!results) {
+                throw new Error('Stream ended without a result');
+            }
+
+            this.analysisResults[featureType] = results;
+            this.updateFeatureUI(featureType, results);
+            this.setFeatureStatus(featureType, 'completed');
+
+        } catch (error) {
+            console.error(`Streaming ${featureType} failed, falling back:`, error);
+            await this.analyzeFeature(featureType);
+        }
+    }
+
+    showPartialOutput(featureType, text) {
+        const content = document.getElementById(featureType);
+        if (!content) return;
+
+        let pre = content.querySelector('.partial-output');
+        if (!pre) {
+            content.innerHTML = '<div class="analysis-card"><pre class="partial-output"></pre></div>';
+            pre = content.querySelector('.partial-output');
+        }
+        pre.textContent = text;
+    }
+
     updateFeatureUI(featureType, results) {
         switch (featureType) {
             case 'analysis':